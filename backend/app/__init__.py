@@ -1,22 +1,27 @@
 from flask import Flask, send_from_directory, jsonify
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from celery import Celery
+from app.ratelimit import SlidingWindowRedisStorage  # noqa: F401 registers sliding+redis://
+from app.static_assets import get_static_assets
+from app.compression import compress_response
+from app.json_provider import init_json_provider
+from app.table_versions import init_table_versions
+from app.db_routing import RoutingSession, configure_engines, init_db_routing
 import logging
 from logging.handlers import RotatingFileHandler
 import os
+import threading
 from datetime import datetime
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 limiter = Limiter(key_func=get_remote_address)
 
-celery = None  # initialized in create_app
+celery = None  # created on first use by get_celery_app()
+_celery_lock = threading.Lock()
 
 
 def create_app(config_class=None):
@@ -28,10 +33,20 @@ def create_app(config_class=None):
     app = Flask(__name__,
                 template_folder=frontend_path)
     app.config.from_object(config_class or 'app.config.Config')
+    init_json_provider(app)
 
     # Initialize extensions
+    configure_engines(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_db_routing(app, db)
+    from app.sqlite_tuning import init_sqlite
+    init_sqlite(app)
+    init_table_versions()
+    # Flask-Migrate pulls in alembic and only adds the `flask db` commands,
+    # so servers and workers skip it
+    if running_flask_cli():
+        from flask_migrate import Migrate
+        Migrate(app, db)
     jwt.init_app(app)
     limiter.init_app(app)
 
@@ -46,15 +61,26 @@ def create_app(config_class=None):
     from app.routes.devices import devices_bp
     from app.routes.cameras import cameras_bp
     from app.routes.alerts import alerts_bp
+    from app.routes.reports import reports_bp
+    from app.routes.tasks import tasks_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(devices_bp, url_prefix='/api/devices')
     app.register_blueprint(cameras_bp, url_prefix='/api/cameras')
     app.register_blueprint(alerts_bp, url_prefix='/api/alerts')
+    app.register_blueprint(reports_bp, url_prefix='/api/reports')
+    app.register_blueprint(tasks_bp, url_prefix='/api/tasks')
 
-    # Initialize Celery
-    global celery
-    celery = make_celery(app)
+    # Register CLI commands
+    from app.services.retention_cli import alerts_cli
+    app.cli.add_command(alerts_cli)
+    from app.frontend_build import frontend_cli
+    app.cli.add_command(frontend_cli)
+    from app.query_plans import queries_cli
+    app.cli.add_command(queries_cli)
+
+    # Compress API and frontend responses the client accepts compressed
+    app.after_request(compress_response)
 
     # Add security headers
     @app.after_request
@@ -90,15 +116,17 @@ def create_app(config_class=None):
         })
 
     # Serve frontend files
+    if not app.config.get('FRONTEND_DIR'):
+        app.config['FRONTEND_DIR'] = frontend_path
+    if not app.config.get('FRONTEND_BUILD_DIR'):
+        app.config['FRONTEND_BUILD_DIR'] = os.path.join(project_root, 'frontend', 'build')
+
     @app.route('/')
     def index():
-        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        project_root = os.path.dirname(backend_dir)
-        frontend_path = os.path.join(project_root, 'frontend', 'public')
-        index_path = os.path.join(frontend_path, 'index.html')
-        if os.path.exists(index_path):
-            with open(index_path, 'r', encoding='utf-8') as f:
-                return f.read()
+        assets = get_static_assets()
+        index_path = assets.resolve('index.html')
+        if index_path:
+            return assets.serve(index_path)
         return 'Index file not found. Please check if frontend is properly set up.', 404
 
     @app.route('/<path:path>')
@@ -109,35 +137,29 @@ def create_app(config_class=None):
         # Skip Flask's default static files
         if path.startswith('static/'):
             return {'error': 'Not found'}, 404
-        
-        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        project_root = os.path.dirname(backend_dir)
-        frontend_path = os.path.join(project_root, 'frontend', 'public')
-        file_path = os.path.join(frontend_path, path)
-        
-        if os.path.exists(file_path) and os.path.isfile(file_path):
-            with open(file_path, 'rb') as f:
-                content = f.read()
-            # Set appropriate content type
-            if path.endswith('.js'):
-                return content, 200, {'Content-Type': 'application/javascript'}
-            elif path.endswith('.css'):
-                return content, 200, {'Content-Type': 'text/css'}
-            elif path.endswith('.html'):
-                return content, 200, {'Content-Type': 'text/html'}
-            else:
-                return content
+
+        assets = get_static_assets()
+        file_path = assets.resolve(path)
+        if file_path:
+            return assets.serve(file_path)
         # For SPA routing, serve index.html for non-API routes
-        if not path.startswith('api/'):
-            index_path = os.path.join(frontend_path, 'index.html')
-            if os.path.exists(index_path):
-                with open(index_path, 'r', encoding='utf-8') as f:
-                    return f.read()
+        index_path = assets.resolve('index.html')
+        if index_path:
+            return assets.serve(index_path)
         return {'error': 'Not found'}, 404
 
     return app
 
 
+def running_flask_cli():
+    """True while the app is being loaded by the `flask` command"""
+    import click
+    from flask.cli import FlaskGroup
+
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and isinstance(ctx.find_root().command, FlaskGroup)
+
+
 def configure_logging(app):
     """Configure application logging"""
     if not app.debug and not app.testing:
@@ -174,11 +196,12 @@ def configure_logging(app):
 
 def make_celery(app):
     from celery import Celery
+    from app.celery_queues import DEFAULT_QUEUE, task_routes, task_annotations
 
     # Fallbacks to avoid None when Flask drops lowercase config keys
     default_broker = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
     default_backend = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
-    default_imports = ('app.services.poller', 'app.services.alerting')
+    default_imports = ('app.services.poller', 'app.services.alerting', 'app.services.retention', 'app.services.reporting')
 
     broker_url = app.config.get('broker_url') or default_broker
     result_backend = app.config.get('result_backend') or default_backend
@@ -192,7 +215,11 @@ def make_celery(app):
         timezone='UTC',
         task_serializer='json',
         result_serializer='json',
-        accept_content=['json']
+        accept_content=['json'],
+        result_expires=app.config.get('CELERY_RESULT_EXPIRES_SECONDS', 21600),
+        task_default_queue=DEFAULT_QUEUE,
+        task_routes=task_routes(),
+        task_annotations=task_annotations(app.config['CELERY_QUEUE_SETTINGS'])
     )
 
     class ContextTask(celery_app.Task):
@@ -201,10 +228,18 @@ def make_celery(app):
                 return self.run(*args, **kwargs)
 
     celery_app.Task = ContextTask
+    # Shared tasks resolve to this app in every thread, not only the creating one
+    celery_app.set_default()
     return celery_app
 
 
 # Export celery instance for external access
-def get_celery_app():
-    """Get the global celery app instance"""
+def get_celery_app(app=None):
+    """Get the global celery app instance, creating it for the Flask app on first use"""
+    global celery
+    if celery is None:
+        with _celery_lock:
+            if celery is None:
+                from flask import current_app
+                celery = make_celery(app or current_app._get_current_object())
     return celery
@@ -0,0 +1,40 @@
+import logging
+import threading
+import time
+import redis
+from flask import current_app
+
+# Seconds to stop using Redis after a connection error
+REDIS_RETRY_SECONDS = 30
+
+_clients = {}
+_clients_lock = threading.Lock()
+_down_until = 0.0
+
+
+def get_redis():
+    """Return a shared Redis client for REDIS_URL, or None while Redis is unavailable"""
+    url = current_app.config.get('REDIS_URL')
+    if not url or time.monotonic() < _down_until:
+        return None
+
+    client = _clients.get(url)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(url)
+            if client is None:
+                client = redis.Redis.from_url(
+                    url,
+                    socket_timeout=2,
+                    socket_connect_timeout=2,
+                    decode_responses=True
+                )
+                _clients[url] = client
+    return client
+
+
+def report_redis_error(error):
+    """Back off from Redis for a while after a failed call"""
+    global _down_until
+    _down_until = time.monotonic() + REDIS_RETRY_SECONDS
+    logging.warning(f"Redis unavailable, falling back for {REDIS_RETRY_SECONDS}s: {str(error)}")
@@ -0,0 +1,66 @@
+from kombu import Queue
+
+DEFAULT_QUEUE = 'celery'
+# Profile that also consumes the default queue when each queue has its own worker
+DEFAULT_QUEUE_PROFILE = 'polling'
+# Seconds between a task's soft time limit and the worker killing it
+HARD_TIME_LIMIT_GRACE = 30
+
+# Queue of every task; anything not listed stays on the default queue
+TASK_QUEUES = {
+    'app.services.poller.poll_all_devices': 'polling',
+    'app.services.poller.poll_device_task': 'polling',
+    'app.services.poller.poll_all_cameras': 'polling',
+    'app.services.poller.test_camera_connection_task': 'polling',
+    # Bulk polls are chunks of poll_device_task, run by these built-in tasks
+    'celery.chunks': 'polling',
+    'celery.starmap': 'polling',
+    'app.services.alerting.send_alert_notification': 'notifications',
+    'app.services.alerting.send_alert_notifications': 'notifications',
+    'app.services.alerting.drain_notification_outbox': 'notifications',
+    'app.services.alerting.flush_notification_digest': 'notifications',
+    'app.services.alerting.send_daily_summary': 'reporting',
+    'app.services.reporting.build_daily_rollups': 'reporting',
+    'app.services.retention.purge_expired_alerts': 'reporting',
+    'app.services.retention.maintain_alert_partitions': 'reporting',
+}
+
+
+def task_routes():
+    """Celery task_routes sending each task to its queue"""
+    return {name: {'queue': queue} for name, queue in TASK_QUEUES.items()}
+
+
+def task_annotations(queue_settings):
+    """Per-task acks_late and time limits from the settings of the task's queue"""
+    annotations = {}
+    for name, queue in TASK_QUEUES.items():
+        settings = queue_settings[queue]
+        annotations[name] = {
+            'acks_late': settings['acks_late'],
+            'soft_time_limit': settings['soft_time_limit'],
+            'time_limit': settings['soft_time_limit'] + HARD_TIME_LIMIT_GRACE,
+        }
+    return annotations
+
+
+def apply_worker_profile(celery_app, profile, queue_settings):
+    """Make this worker consume the profile's queues with that queue's concurrency and prefetch
+
+    'all' consumes every queue (development, single-worker setups) and
+    prefetches one task per process so no queue waits behind another. The
+    DEFAULT_QUEUE_PROFILE worker also takes tasks left on the default queue.
+    """
+    if profile == 'all':
+        queues = [DEFAULT_QUEUE] + sorted(queue_settings)
+        celery_app.conf.worker_prefetch_multiplier = 1
+    elif profile in queue_settings:
+        settings = queue_settings[profile]
+        queues = [profile] + ([DEFAULT_QUEUE] if profile == DEFAULT_QUEUE_PROFILE else [])
+        celery_app.conf.worker_concurrency = settings['concurrency']
+        celery_app.conf.worker_prefetch_multiplier = settings['prefetch_multiplier']
+    else:
+        raise ValueError(f"Unknown worker profile '{profile}', expected all or one of {', '.join(sorted(queue_settings))}")
+
+    celery_app.conf.task_queues = [Queue(name) for name in queues]
+    return queues
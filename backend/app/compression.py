@@ -0,0 +1,111 @@
+from flask import current_app, request
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Worth compressing; event streams and binary/precompressed types are left alone
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/html',
+    'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+    'image/svg+xml'
+}
+# Streamed responses are flushed to the client after this much input
+STREAM_FLUSH_BYTES = 64 * 1024
+
+
+class GzipEncoder:
+    def __init__(self, level):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, quality):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+def choose_encoding(accept_encodings):
+    """Preferred supported encoding in Accept-Encoding, brotli first on ties"""
+    supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = max(supported, key=lambda encoding: accept_encodings[encoding])
+    return best if accept_encodings[best] > 0 else None
+
+
+def make_encoder(encoding, config):
+    if encoding == 'br':
+        return BrotliEncoder(config.get('COMPRESS_BROTLI_QUALITY', 4))
+    return GzipEncoder(config.get('COMPRESS_LEVEL', 6))
+
+
+def _compress_stream(chunks, encoder, source):
+    pending = 0
+    try:
+        for chunk in chunks:
+            data = encoder.compress(chunk)
+            pending += len(chunk)
+            if pending >= STREAM_FLUSH_BYTES:
+                data += encoder.flush()
+                pending = 0
+            if data:
+                yield data
+        yield encoder.finish()
+    finally:
+        # Let the wrapped iterable clean up (e.g. stream_with_context's context)
+        if hasattr(source, 'close'):
+            source.close()
+
+
+def compress_response(response):
+    """after_request hook compressing text responses the client accepts compressed"""
+    config = current_app.config
+    if not config.get('COMPRESS_ENABLED', True):
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers:
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206, 304) or request.method == 'HEAD':
+        return response
+    if 'no-transform' in response.headers.get('Cache-Control', ''):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    # Files passed through (send_file) are served as they are
+    if encoding is None or response.direct_passthrough:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), make_encoder(encoding, config), response.response)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config.get('COMPRESS_MIN_SIZE', 500):
+            return response
+        encoder = make_encoder(encoding, config)
+        response.set_data(encoder.compress(data) + encoder.finish())
+
+    response.headers['Content-Encoding'] = encoding
+    # Compressed bytes are a different representation from the identity body
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f'{etag}-{encoding}')
+    return response
@@ -7,6 +7,42 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///devices.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool of each gunicorn/Celery process (pool options are not used for SQLite)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT_SECONDS = int(os.environ.get('DB_POOL_TIMEOUT_SECONDS', 30))
+    DB_POOL_RECYCLE_SECONDS = int(os.environ.get('DB_POOL_RECYCLE_SECONDS', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    # Optional read replica for list, summary, export and report requests;
+    # data written within DB_REPLICA_LAG_SECONDS is read from the primary
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    DB_REPLICA_LAG_SECONDS = int(os.environ.get('DB_REPLICA_LAG_SECONDS', 5))
+
+    # SQLite (when DATABASE_URL points at a file shared by the web and Celery
+    # processes): WAL journaling so reads never wait for a write, and a busy
+    # timeout so writers queue for the lock instead of failing
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', 'true').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # OFF, NORMAL, FULL or EXTRA
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16384))  # page cache per connection
+    # Poll results are written by one thread per process, batched into shared commits
+    SQLITE_WRITE_QUEUE = os.environ.get('SQLITE_WRITE_QUEUE', 'true').lower() == 'true'
+    SQLITE_WRITE_BATCH_SIZE = int(os.environ.get('SQLITE_WRITE_BATCH_SIZE', 50))
+    SQLITE_WRITE_TIMEOUT_SECONDS = int(os.environ.get('SQLITE_WRITE_TIMEOUT_SECONDS', 30))
+
+    # Gunicorn (python -m app.server): 'sync' workers for CRUD traffic, 'threaded'
+    # workers when many clients long-poll GET /api/tasks?wait= or stream exports
+    SERVER_PROFILE = os.environ.get('SERVER_PROFILE', 'sync')
+    SERVER_BIND = os.environ.get('SERVER_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', 0))  # 0: from the CPU count
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))  # per worker, threaded profile
+    SERVER_TIMEOUT_SECONDS = int(os.environ.get('SERVER_TIMEOUT_SECONDS', 60))
+    SERVER_GRACEFUL_TIMEOUT_SECONDS = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT_SECONDS', 40))
+    SERVER_KEEPALIVE_SECONDS = int(os.environ.get('SERVER_KEEPALIVE_SECONDS', 5))
+    # Workers restart after this many requests (plus up to the jitter), finishing in-flight requests first
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 1000))
+    SERVER_MAX_REQUESTS_JITTER = int(os.environ.get('SERVER_MAX_REQUESTS_JITTER', 100))
+
     # Generate secure JWT secret if not provided
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or secrets.token_hex(32)
 
@@ -18,22 +54,142 @@ class Config:
     # JWT configuration
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES = 60  # 1 hour
     JWT_REFRESH_TOKEN_EXPIRE_DAYS = 7
+    # Users looked up for role checks are cached per process this long
+    USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS', 60))
 
     # Celery (new-style config)
     broker_url = os.environ.get('CELERY_BROKER_URL', os.environ.get('broker_url', 'redis://localhost:6379/0'))
     result_backend = os.environ.get('CELERY_RESULT_BACKEND', os.environ.get('result_backend', 'redis://localhost:6379/0'))
+    # Task results are kept this long for GET /api/tasks/<id>
+    CELERY_RESULT_EXPIRES_SECONDS = int(os.environ.get('CELERY_RESULT_EXPIRES_SECONDS', 21600))
+    # Longest GET /api/tasks?wait= long poll; a sync worker is tied up for all of it
+    TASK_MAX_WAIT_SECONDS = int(os.environ.get('TASK_MAX_WAIT_SECONDS', 30 if SERVER_PROFILE == 'threaded' else 5))
     imports = (
         'app.services.poller',
         'app.services.alerting',
+        'app.services.retention',
+        'app.services.reporting',
     )
 
+    # Polling, notification and reporting tasks go to separate queues, each
+    # served by its own workers, so a long poll run or a slow SMTP server
+    # can't hold up the others. Time limits are soft; the hard limit is 30s later
+    CELERY_QUEUE_SETTINGS = {
+        'polling': {
+            'concurrency': int(os.environ.get('CELERY_POLLING_CONCURRENCY', 8)),
+            'prefetch_multiplier': 4,  # short, I/O-bound tasks
+            'acks_late': False,  # a lost poll is redone by the next scheduled run
+            'soft_time_limit': int(os.environ.get('CELERY_POLLING_TIME_LIMIT', 270)),
+        },
+        'notifications': {
+            'concurrency': int(os.environ.get('CELERY_NOTIFICATIONS_CONCURRENCY', 2)),
+            'prefetch_multiplier': 1,  # a slow send doesn't hold queued notifications
+            'acks_late': True,  # redelivered if the worker dies mid-send
+            'soft_time_limit': int(os.environ.get('CELERY_NOTIFICATIONS_TIME_LIMIT', 120)),
+        },
+        'reporting': {
+            'concurrency': int(os.environ.get('CELERY_REPORTING_CONCURRENCY', 1)),
+            'prefetch_multiplier': 1,
+            'acks_late': True,  # rollups and retention are safe to rerun
+            'soft_time_limit': int(os.environ.get('CELERY_REPORTING_TIME_LIMIT', 1800)),
+        },
+    }
+    # Queues a worker started from celery_worker.py consumes: all, polling, notifications or reporting
+    CELERY_WORKER_PROFILE = os.environ.get('CELERY_WORKER_PROFILE', 'all')
+
     POLL_INTERVAL_SECONDS = 60  # polling interval, configurable
+    # In-process executor for polls and camera tests while Celery is unavailable
+    PROBE_EXECUTOR_WORKERS = int(os.environ.get('PROBE_EXECUTOR_WORKERS', 4))
+    PROBE_EXECUTOR_MAX_QUEUE = int(os.environ.get('PROBE_EXECUTOR_MAX_QUEUE', 100))
+    PROBE_RESULT_FRESH_SECONDS = int(os.environ.get('PROBE_RESULT_FRESH_SECONDS', 30))
+    DEVICE_BULK_POLL_CHUNK_SIZE = int(os.environ.get('DEVICE_BULK_POLL_CHUNK_SIZE', 20))  # polls per Celery task
     ALERT_EMAIL_FROM = os.environ.get('ALERT_EMAIL_FROM', 'alerts@example.com')
     ALERT_EMAIL_TO = os.environ.get('ALERT_EMAIL_TO', 'admin@example.com')
 
-    # Rate limiting (can be implemented later)
+    # Shared Redis for coordination between workers (notification windows, caches)
+    REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+    # Notification coalescing: alerts arriving within a channel's window after a
+    # delivery, or while the burst threshold is exceeded, are sent as one digest
+    NOTIFY_COALESCE_SECONDS = {
+        'email': int(os.environ.get('NOTIFY_EMAIL_COALESCE_SECONDS', 300)),
+        'slack': int(os.environ.get('NOTIFY_SLACK_COALESCE_SECONDS', 60)),
+    }
+    NOTIFY_BURST_THRESHOLD = int(os.environ.get('NOTIFY_BURST_THRESHOLD', 10))
+    NOTIFY_BURST_WINDOW_SECONDS = int(os.environ.get('NOTIFY_BURST_WINDOW_SECONDS', 60))
+    NOTIFY_IMMEDIATE_SEVERITIES = ('critical',)
+
+    # Notification dispatcher (per worker process)
+    NOTIFY_RATE_LIMITS = {  # sends per second, per channel
+        'email': float(os.environ.get('NOTIFY_EMAIL_RATE_PER_SECOND', 2)),
+        'slack': float(os.environ.get('NOTIFY_SLACK_RATE_PER_SECOND', 1)),
+    }
+    NOTIFY_MAX_RETRIES = int(os.environ.get('NOTIFY_MAX_RETRIES', 3))
+    NOTIFY_RETRY_BACKOFF_SECONDS = float(os.environ.get('NOTIFY_RETRY_BACKOFF_SECONDS', 1))
+    # Total time a delivery may spend retrying; keep it well below the notifications
+    # queue's soft time limit (120s) since the backoff sleeps in the worker
+    NOTIFY_RETRY_BUDGET_SECONDS = float(os.environ.get('NOTIFY_RETRY_BUDGET_SECONDS', 60))
+    NOTIFY_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('NOTIFY_CIRCUIT_FAILURE_THRESHOLD', 5))
+    NOTIFY_CIRCUIT_RESET_SECONDS = int(os.environ.get('NOTIFY_CIRCUIT_RESET_SECONDS', 60))
+    NOTIFY_DISPATCH_WORKERS = int(os.environ.get('NOTIFY_DISPATCH_WORKERS', 4))
+    NOTIFY_SMTP_POOL_SIZE = int(os.environ.get('NOTIFY_SMTP_POOL_SIZE', 2))
+
+    # Transactional notification outbox
+    NOTIFY_OUTBOX_BATCH_SIZE = int(os.environ.get('NOTIFY_OUTBOX_BATCH_SIZE', 100))
+    NOTIFY_OUTBOX_MAX_BATCHES = int(os.environ.get('NOTIFY_OUTBOX_MAX_BATCHES', 10))
+    NOTIFY_OUTBOX_CLAIM_TIMEOUT_SECONDS = int(os.environ.get('NOTIFY_OUTBOX_CLAIM_TIMEOUT_SECONDS', 300))
+    NOTIFY_OUTBOX_RETENTION_DAYS = int(os.environ.get('NOTIFY_OUTBOX_RETENTION_DAYS', 7))
+
+    # Alert retention (0 days keeps alerts in that state forever)
+    ALERT_RETENTION_ENABLED = os.environ.get('ALERT_RETENTION_ENABLED', 'true').lower() == 'true'
+    ALERT_RETENTION_ACKNOWLEDGED_DAYS = int(os.environ.get('ALERT_RETENTION_ACKNOWLEDGED_DAYS', 30))
+    ALERT_RETENTION_UNACKNOWLEDGED_DAYS = int(os.environ.get('ALERT_RETENTION_UNACKNOWLEDGED_DAYS', 180))
+    ALERT_RETENTION_MODE = os.environ.get('ALERT_RETENTION_MODE', 'archive')  # archive or purge
+    ALERT_RETENTION_BATCH_SIZE = int(os.environ.get('ALERT_RETENTION_BATCH_SIZE', 500))
+    ALERT_RETENTION_MAX_BATCHES = int(os.environ.get('ALERT_RETENTION_MAX_BATCHES', 200))
+    ALERT_ARCHIVE_DIR = os.environ.get('ALERT_ARCHIVE_DIR')  # defaults to <instance>/alert_archive
+
+    # Nightly report rollups: days to backfill when the rollup tables are empty or behind
+    REPORT_ROLLUP_BACKFILL_DAYS = int(os.environ.get('REPORT_ROLLUP_BACKFILL_DAYS', 31))
+
+    # Monthly range partitioning of the alert table (PostgreSQL only)
+    ALERT_PARTITIONING_ENABLED = os.environ.get('ALERT_PARTITIONING_ENABLED', 'false').lower() == 'true'
+    ALERT_PARTITION_MONTHS_AHEAD = int(os.environ.get('ALERT_PARTITION_MONTHS_AHEAD', 3))
+
+    # Rate limiting: sliding-window counters in Redis shared by all workers,
+    # falling back to bounded per-process counters while Redis is down
+    # Only turn off for load tests against a scratch database
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
     RATELIMIT_DEFAULT = "100 per minute"
-    RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    RATELIMIT_STRATEGY = 'sliding-window-counter'
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'sliding+' + os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+    RATELIMIT_STORAGE_OPTIONS = {'max_local_keys': int(os.environ.get('RATELIMIT_LOCAL_MAX_KEYS', 10000))}
+    RATELIMIT_HEADERS_ENABLED = True
+    # Shared budget for polls and camera tests; a bulk poll costs one unit per device
+    PROBE_RATE_LIMIT = os.environ.get('PROBE_RATE_LIMIT', '300 per minute')
+
+    # Frontend files (defaults to frontend/public); served from memory with
+    # ETags. Fingerprinted names (app.<hash>.js) are cached for a year, HTML
+    # always revalidates and other files are cached for STATIC_MAX_AGE_SECONDS
+    FRONTEND_DIR = os.environ.get('FRONTEND_DIR')
+    # Output of `flask frontend build` (defaults to frontend/build)
+    FRONTEND_BUILD_DIR = os.environ.get('FRONTEND_BUILD_DIR')
+    STATIC_MAX_AGE_SECONDS = int(os.environ.get('STATIC_MAX_AGE_SECONDS', 300))
+    STATIC_CACHE_MAX_FILE_BYTES = int(os.environ.get('STATIC_CACHE_MAX_FILE_BYTES', 1024 * 1024))
+    # Re-read changed files; defaults to on in debug mode
+    STATIC_RELOAD = {'true': True, 'false': False}.get(os.environ.get('STATIC_RELOAD', '').lower())
+
+    # Weak ETags on list and summary endpoints from per-table versions in Redis
+    TABLE_VERSION_ETAGS = os.environ.get('TABLE_VERSION_ETAGS', 'true').lower() == 'true'
+
+    # JSON encoder: auto uses orjson when installed, else the stdlib encoder
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto')  # auto, orjson or stdlib
+
+    # Response compression (gzip, or brotli when the package is installed)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))  # bytes
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip, 1-9
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))  # 0-11
 
     # CORS settings (if needed for frontend)
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000,http://localhost:5000').split(',')
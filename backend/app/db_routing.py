@@ -0,0 +1,122 @@
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import make_url
+from sqlalchemy.sql.expression import SelectBase, UpdateBase
+import os
+import time
+
+# Bind key of the read replica in SQLALCHEMY_BINDS
+REPLICA_BIND = 'replica'
+# Set after a write; the client's reads stay on the primary until it expires
+PRIMARY_UNTIL_COOKIE = 'db_primary_until'
+
+_engines = []
+
+
+def engine_options(config, url):
+    """Engine options for url from the DB_POOL_* settings"""
+    options = {'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)}
+    if make_url(url).get_backend_name() != 'sqlite':
+        options.update(
+            pool_size=config.get('DB_POOL_SIZE', 5),
+            max_overflow=config.get('DB_MAX_OVERFLOW', 10),
+            pool_timeout=config.get('DB_POOL_TIMEOUT_SECONDS', 30),
+            pool_recycle=config.get('DB_POOL_RECYCLE_SECONDS', 1800)
+        )
+    return options
+
+
+def configure_engines(app):
+    """Fill in pool options for the primary and add the read replica bind, before db.init_app"""
+    config = app.config
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in config:
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(config, config['SQLALCHEMY_DATABASE_URI'])
+    replica_url = config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        binds = config.setdefault('SQLALCHEMY_BINDS', {})
+        binds.setdefault(REPLICA_BIND, {'url': replica_url, **engine_options(config, replica_url)})
+
+
+def init_db_routing(app, db):
+    """Remember writes for read-your-writes stickiness and reset pools in forked workers"""
+    with app.app_context():
+        _engines.extend(db.engines.values())
+    app.after_request(remember_writes)
+
+
+def dispose_pools():
+    """Drop pooled connections inherited from the parent process, leaving them open for it"""
+    for engine in _engines:
+        engine.dispose(close=False)
+
+if hasattr(os, 'register_at_fork'):
+    # Pooled connections opened before a fork belong to the parent process
+    os.register_at_fork(after_in_child=dispose_pools)
+
+
+def replica_lag_seconds():
+    return current_app.config.get('DB_REPLICA_LAG_SECONDS', 5)
+
+
+def use_primary():
+    """Send the rest of this request's reads to the primary"""
+    g.db_use_primary = True
+
+
+def prefer_primary_since(changed_at):
+    """Read from the primary if the data changed too recently to be on the replica"""
+    if changed_at is not None and time.time() - changed_at < replica_lag_seconds():
+        use_primary()
+
+
+def replica_reads(fn):
+    """Let the view's plain SELECTs go to the read replica, if one is configured
+
+    Clients that wrote within DB_REPLICA_LAG_SECONDS, and requests that have
+    written themselves, keep reading from the primary.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            primary_until = float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+        g.db_read_replica = primary_until <= time.time()
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def remember_writes(response):
+    """Keep the client that just wrote on the primary while the replica catches up"""
+    if g.get('db_wrote') and REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        lag = replica_lag_seconds()
+        response.set_cookie(
+            PRIMARY_UNTIL_COOKIE,
+            str(int(time.time() + lag)),
+            max_age=lag,
+            httponly=True,
+            secure=current_app.config.get('SESSION_COOKIE_SECURE', False),
+            samesite='Lax'
+        )
+    return response
+
+
+class RoutingSession(Session):
+    """Session sending reads of replica_reads views to the replica and everything else to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.db_wrote = True
+            elif (
+                isinstance(clause, SelectBase)
+                and getattr(clause, '_for_update_arg', None) is None
+                and g.get('db_read_replica')
+                and not g.get('db_use_primary')
+                and not g.get('db_wrote')
+            ):
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
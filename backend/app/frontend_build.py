@@ -0,0 +1,277 @@
+from flask import current_app
+from flask.cli import AppGroup
+import click
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip copies are written
+    brotli = None
+
+MANIFEST_FILE = 'manifest.json'
+HASH_LENGTH = 10
+
+# Local stylesheet and script tags as written in frontend/public pages
+ASSET_TAG_RE = re.compile(
+    r'<link\s+rel="stylesheet"\s+href="(?P<css>assets/[^"]+\.css)"\s*/?>'
+    r'|<script\s+src="(?P<js>assets/[^"]+\.js)"\s*></script>'
+)
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+CSS_SPACE_RE = re.compile(r'\s*([{};,>])\s*')
+# Characters and keywords after which a / starts a regex literal
+REGEX_AFTER = '(,=:[!&|?{};+-*%<>~^\n'
+REGEX_KEYWORD_RE = re.compile(
+    r'(?<![\w$.])(?:return|typeof|instanceof|in|of|new|delete|void|throw|case|do|else|yield|await)\s*$'
+)
+
+frontend_cli = AppGroup('frontend', help='Frontend asset build.')
+
+
+def find_asset_runs(html):
+    """Groups of adjacent same-kind asset tags: [(kind, start, end, [paths])]"""
+    runs = []
+    for match in ASSET_TAG_RE.finditer(html):
+        kind = 'css' if match.group('css') else 'js'
+        path = match.group(kind)
+        if runs and runs[-1][0] == kind and not html[runs[-1][2]:match.start()].strip():
+            runs[-1][2] = match.end()
+            runs[-1][3].append(path)
+        else:
+            runs.append([kind, match.start(), match.end(), [path]])
+    return runs
+
+
+def _tag(kind, path):
+    if kind == 'css':
+        return f'<link rel="stylesheet" href="{path}">'
+    return f'<script src="{path}"></script>'
+
+
+def rewrite_html(html, manifest):
+    """Point a page's asset tags at the bundles and fingerprinted files in manifest"""
+    files = manifest.get('files', {})
+    bundles = manifest.get('bundles', {})
+    parts = []
+    position = 0
+    for kind, start, end, paths in find_asset_runs(html):
+        parts.append(html[position:start])
+        bundle = bundles.get(','.join(paths))
+        if bundle:
+            parts.append(_tag(kind, bundle))
+        else:
+            parts.append(html[start:end])
+            for path in paths:
+                if path in files:
+                    parts[-1] = parts[-1].replace(f'"{path}"', f'"{files[path]}"')
+        position = end
+    parts.append(html[position:])
+    return ''.join(parts)
+
+
+def load_manifest(build_dir):
+    """The manifest written by ``flask frontend build``, or None if there is none"""
+    try:
+        with open(os.path.join(build_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def minify_css(source):
+    source = CSS_COMMENT_RE.sub('', source)
+    source = re.sub(r'\s+', ' ', source)
+    source = CSS_SPACE_RE.sub(r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+
+def _string_end(source, start):
+    """Index just past the string or template literal opening at start"""
+    quote = source[start]
+    i = start + 1
+    while i < len(source) and source[i] != quote:
+        if source[i] == '\\':
+            i += 2
+        elif quote == '`' and source.startswith('${', i):
+            # Skip the embedded expression, which may hold strings of its own
+            depth = 0
+            i += 1
+            while i < len(source):
+                if source[i] in '\'"`':
+                    i = _string_end(source, i)
+                    continue
+                if source[i] == '{':
+                    depth += 1
+                elif source[i] == '}':
+                    depth -= 1
+                    if not depth:
+                        break
+                i += 1
+            i += 1
+        else:
+            i += 1
+    return i + 1
+
+
+def _end_line(out, last):
+    """Close the current output line, dropping trailing whitespace and blank lines"""
+    while out and out[-1] in (' ', '\t', '\r'):
+        out.pop()
+    if out and out[-1] != '\n':
+        out.append('\n')
+    return last if last in ')]}_$' or last.isalnum() else '\n'
+
+
+def _regex_allowed(out, last):
+    """Whether a / here starts a regex literal rather than a division"""
+    if not last or last in REGEX_AFTER:
+        return True
+    return bool(REGEX_KEYWORD_RE.search(''.join(out[-12:])))
+
+
+def minify_js(source):
+    """Drop comments, indentation and blank lines; line breaks are kept for ASI
+
+    Strings, template literals and regex literals are copied untouched.
+    """
+    out = []
+    i = 0
+    length = len(source)
+    last = ''  # last significant character, to tell regex literals from division
+    while i < length:
+        char = source[i]
+        following = source[i + 1] if i + 1 < length else ''
+        if char in '\'"`':
+            end = _string_end(source, i)
+            out.append(source[i:end])
+            last = char
+            i = end
+        elif char == '/' and following == '/':
+            while i < length and source[i] != '\n':
+                i += 1
+        elif char == '/' and following == '*':
+            end = source.find('*/', i + 2)
+            end = length if end < 0 else end + 2
+            # A comment spanning lines still ends a line for ASI, and one
+            # between two words must not join them
+            if '\n' in source[i:end]:
+                last = _end_line(out, last)
+            elif out and not out[-1].isspace():
+                out.append(' ')
+            i = end
+        elif char == '/' and _regex_allowed(out, last):
+            end = i + 1
+            in_class = False
+            while end < length and source[end] != '\n':
+                if source[end] == '\\':
+                    end += 1
+                elif source[end] == '[':
+                    in_class = True
+                elif source[end] == ']':
+                    in_class = False
+                elif source[end] == '/' and not in_class:
+                    break
+                end += 1
+            out.append(source[i:end + 1])
+            last = '/'
+            i = end + 1
+        elif char == '\n':
+            last = _end_line(out, last)
+            i += 1
+        elif char.isspace() and (not out or out[-1] == '\n'):
+            # Indentation
+            i += 1
+        else:
+            out.append(char)
+            if not char.isspace():
+                last = char
+            i += 1
+
+    return ''.join(out).strip()
+
+
+MINIFIERS = {'css': minify_css, 'js': minify_js}
+
+
+def _fingerprint(path, content):
+    stem, ext = os.path.splitext(path)
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:HASH_LENGTH]
+    return f'{stem}.{digest}{ext}'
+
+
+def _write(build_dir, path, content):
+    data = content.encode('utf-8')
+    target = os.path.join(build_dir, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(data)
+    # Picked up by the static layer instead of compressing at load time
+    with open(target + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, 9, mtime=0))
+    if brotli is not None:
+        with open(target + '.br', 'wb') as f:
+            f.write(brotli.compress(data))
+    return len(data)
+
+
+def build_frontend(source_dir, build_dir, minify=True):
+    """Write minified, fingerprinted assets and per-page bundles to build_dir
+
+    Every asset referenced from a page gets a content-hashed copy. Each run
+    of adjacent stylesheet or script tags becomes one bundle. Earlier outputs
+    are left in place so pages already served keep working.
+    """
+    pages = sorted(name for name in os.listdir(source_dir) if name.endswith('.html'))
+    runs = []
+    for page in pages:
+        with open(os.path.join(source_dir, page), encoding='utf-8') as f:
+            runs.extend((kind, paths) for kind, _, _, paths in find_asset_runs(f.read()))
+
+    sources = {}
+    for kind, paths in runs:
+        for path in paths:
+            if path not in sources:
+                with open(os.path.join(source_dir, path), encoding='utf-8') as f:
+                    content = f.read()
+                sources[path] = MINIFIERS[kind](content) if minify else content
+
+    manifest = {'files': {}, 'bundles': {}}
+    sizes = {}
+    for path, content in sources.items():
+        output = _fingerprint(path, content)
+        manifest['files'][path] = output
+        sizes[output] = _write(build_dir, output, content)
+
+    for kind, paths in runs:
+        key = ','.join(paths)
+        if len(paths) < 2 or key in manifest['bundles']:
+            continue
+        # A semicolon between scripts guards against files without a trailing one
+        content = (';\n' if kind == 'js' else '\n').join(sources[path] for path in paths)
+        output = _fingerprint(f'assets/bundle.{kind}', content)
+        manifest['bundles'][key] = output
+        sizes[output] = _write(build_dir, output, content)
+
+    with open(os.path.join(build_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return {'pages': len(pages), 'outputs': sizes}
+
+
+@frontend_cli.command('build')
+@click.option('--clean', is_flag=True, help='Remove earlier build outputs first.')
+@click.option('--no-minify', is_flag=True, help='Fingerprint and bundle without minifying.')
+def build_command(clean, no_minify):
+    """Bundle, minify and fingerprint frontend assets."""
+    build_dir = current_app.config['FRONTEND_BUILD_DIR']
+    if clean and os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir, exist_ok=True)
+    result = build_frontend(current_app.config['FRONTEND_DIR'], build_dir, minify=not no_minify)
+    for output, size in sorted(result['outputs'].items()):
+        click.echo(f'{output}  {size} bytes')
+    click.echo(f"Built {len(result['outputs'])} files for {result['pages']} pages into {build_dir}")
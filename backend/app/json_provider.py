@@ -0,0 +1,60 @@
+from flask.json.provider import DefaultJSONProvider
+from datetime import date
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+
+class JSONProvider(DefaultJSONProvider):
+    """stdlib JSON provider writing dates and datetimes as ISO 8601"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider encoding with orjson
+
+    Calls with stdlib-only arguments (e.g. indent) and pretty-printed debug
+    responses go through the stdlib provider.
+    """
+
+    @property
+    def options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(obj)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.options | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype
+        )
+
+
+def init_json_provider(app):
+    """Install the provider chosen by JSON_PROVIDER: auto, orjson or stdlib"""
+    choice = app.config.get('JSON_PROVIDER', 'auto')
+    if choice == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_PROVIDER is orjson but orjson is not installed')
+    use_orjson = choice == 'orjson' or (choice == 'auto' and orjson is not None)
+    app.json = (OrjsonProvider if use_orjson else JSONProvider)(app)
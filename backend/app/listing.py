@@ -0,0 +1,154 @@
+from flask import Response, current_app, jsonify, request, stream_with_context
+from app import db
+from sqlalchemy import select
+import csv
+import io
+
+# Largest page a client can ask for; bigger listings should be streamed
+MAX_PAGE_SIZE = 1000
+# Rows fetched per round trip while streaming
+STREAM_BATCH_SIZE = 500
+
+MIMETYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+class ListingError(ValueError):
+    """Invalid listing query parameter"""
+
+
+class Listing:
+    """Paginated, filtered and field-projected listing of one model
+
+    Output fields come from the model's Serializer; filters maps query
+    parameters to the column they filter on.
+    """
+
+    def __init__(self, name, model, serializer, filters):
+        self.name = name
+        self.model = model
+        self.serializer = serializer
+        self.fields = serializer.fields
+        self.filters = filters
+
+    def get_fields(self):
+        requested = request.args.get('fields')
+        if not requested:
+            return list(self.fields)
+
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ListingError(f"Unknown fields: {', '.join(unknown)}")
+        return names
+
+    def build_query(self, names):
+        # id is always selected so rows can be ordered and paged by it
+        columns = [self.model.id.label('listing_id')] + [self.fields[name][0].label(name) for name in names]
+        query = select(*columns)
+
+        for param, column in self.filters.items():
+            value = request.args.get(param)
+            if value:
+                values = value.split(',')
+                query = query.where(column.in_(values) if len(values) > 1 else column == value)
+        return query.order_by(self.model.id)
+
+    def stream(self, rows, names, fmt='json'):
+        """Yield the listing as a JSON array, NDJSON or CSV while rows are fetched"""
+        dumps = current_app.json.dumps
+        serialize = self.serializer.dumper(names)
+
+        if fmt == 'ndjson':
+            for row in rows:
+                yield dumps(serialize(row)) + '\n'
+            return
+
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            for row in rows:
+                item = serialize(row)
+                # Nested values (e.g. meta) are written as JSON
+                writer.writerow([
+                    dumps(value) if isinstance(value, (dict, list)) else value
+                    for value in item.values()
+                ])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+            return
+
+        yield '['
+        first = True
+        for row in rows:
+            yield ('' if first else ',') + dumps(serialize(row))
+            first = False
+        yield ']\n'
+
+    def stream_response(self, query, names, fmt='json', filename=None):
+        """Stream every row of query; as a download when filename is given"""
+        # Run the query before streaming so database errors still get a 500
+        try:
+            rows = db.session.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        except Exception as e:
+            return jsonify({'msg': f'Failed to list {self.name}', 'error': str(e)}), 500
+
+        response = Response(stream_with_context(self.stream(rows, names, fmt)), mimetype=MIMETYPES[fmt])
+        if filename:
+            response.headers['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+        return response
+
+    def get_format(self, default='json'):
+        fmt = request.args.get('format', default)
+        if fmt not in MIMETYPES:
+            raise ListingError(f"format must be one of: {', '.join(MIMETYPES)}")
+        return fmt
+
+    def export(self):
+        """Stream the filtered listing as a CSV or NDJSON download"""
+        try:
+            names = self.get_fields()
+            query = self.build_query(names)
+            fmt = self.get_format(default='csv')
+        except ListingError as e:
+            return jsonify({'msg': str(e)}), 400
+        return self.stream_response(query, names, fmt, filename=self.name)
+
+    def respond(self):
+        """Build the response for the current request's listing parameters"""
+        try:
+            names = self.get_fields()
+            query = self.build_query(names)
+            limit = request.args.get('limit', type=int)
+            cursor = request.args.get('cursor', type=int)
+            if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+                raise ListingError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+            fmt = self.get_format()
+        except ListingError as e:
+            return jsonify({'msg': str(e)}), 400
+
+        if limit is None and cursor is None:
+            # Full listing: stream rows instead of building the whole list in memory
+            return self.stream_response(query, names, fmt)
+
+        limit = limit or 100
+        if cursor is not None:
+            query = query.where(self.model.id > cursor)
+        try:
+            rows = db.session.execute(query.limit(limit + 1)).all()
+        except Exception as e:
+            return jsonify({'msg': f'Failed to list {self.name}', 'error': str(e)}), 500
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return jsonify({
+            self.name: self.serializer.dump_many(rows, names),
+            'next_cursor': rows[-1][0] if has_more else None,
+            'limit': limit
+        })
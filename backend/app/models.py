@@ -26,6 +26,13 @@ class Device(db.Model):
     status = db.Column(db.String(20), default='unknown')  # online, offline, unknown
     meta = db.Column(db.JSON)
 
+    __table_args__ = (
+        # Duplicate-IP check on every create and update
+        db.Index('ix_device_ip_address', 'ip_address'),
+        # Status counts and status-filtered listings paged by id
+        db.Index('ix_device_status_id', 'status', 'id'),
+    )
+
 class Camera(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -37,6 +44,14 @@ class Camera(db.Model):
     status = db.Column(db.String(20), default='unknown')
     last_snapshot = db.Column(db.String(255))
 
+    __table_args__ = (
+        db.Index('ix_camera_ip_address', 'ip_address'),
+        db.Index('ix_camera_status_id', 'status', 'id'),
+    )
+
+# Alerts still open for notification and deduplication purposes
+OPEN_ALERT_PREDICATE = db.text('NOT acknowledged')
+
 class Alert(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.Integer, db.ForeignKey('device.id'), nullable=True)
@@ -45,3 +60,57 @@ class Alert(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     acknowledged = db.Column(db.Boolean, default=False)
     acknowledged_at = db.Column(db.DateTime)
+    dedup_key = db.Column(db.String(128))  # e.g. device:12:offline
+    occurrences = db.Column(db.Integer, default=1, server_default='1', nullable=False)
+    last_seen_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Range scans when rolling up a day of alerts; newest-first listing
+        db.Index('ix_alert_created_at', 'created_at'),
+        # Listing and summary counts filtered by acknowledged and/or severity
+        db.Index('ix_alert_acknowledged_created_at', 'acknowledged', 'created_at'),
+        db.Index('ix_alert_severity_acknowledged_created_at', 'severity', 'acknowledged', 'created_at'),
+        # Detaching alerts from deleted devices
+        db.Index('ix_alert_device_id', 'device_id'),
+        # At most one open alert per dedup key; repeats bump the counter instead
+        db.Index('ix_alert_open_dedup_key', 'dedup_key', unique=True,
+                 sqlite_where=OPEN_ALERT_PREDICATE, postgresql_where=OPEN_ALERT_PREDICATE),
+    )
+
+class NotificationOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # No foreign key: alerts can be purged or live in a partitioned table
+    alert_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, claimed, dispatched
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    dispatched_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_notification_outbox_status_id', 'status', 'id'),
+    )
+
+class AlertDailyRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    severity = db.Column(db.String(20))
+    # No foreign key: rollups outlive deleted devices and purged alerts
+    device_id = db.Column(db.Integer)
+    alert_count = db.Column(db.Integer, default=0, nullable=False)
+    occurrence_count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_alert_daily_rollup_day', 'day', 'severity'),
+    )
+
+class StatusSnapshot(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # device, camera
+    status = db.Column(db.String(20))
+    count = db.Column(db.Integer, default=0, nullable=False)
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_status_snapshot_day', 'day', 'kind'),
+    )
@@ -0,0 +1,282 @@
+from flask.cli import AppGroup
+from sqlalchemy import create_engine, func, insert, select, text, update, or_, and_
+from datetime import datetime, timedelta
+import click
+import json
+import os
+import random
+import re
+import tempfile
+
+# Rows seeded at scale 1
+SEED_ROWS = {'device': 20000, 'camera': 2000, 'alert': 200000, 'notification_outbox': 20000}
+SEED_DAYS = 90
+SEED_BATCH_SIZE = 5000
+
+# SQLite: a plain "SCAN table" reads every row; "SCAN table USING INDEX" walks an index in order
+SQLITE_FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+SQLITE_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+queries_cli = AppGroup('queries', help='Query plan checks for the hot queries.')
+
+
+class HotQuery:
+    """A query the routes or services run often, and the plan it must keep
+
+    index is the index (or tuple of acceptable indexes) the plan has to use;
+    allow_full_scan and allow_sort mark queries that read the whole table or
+    sort by design.
+    """
+
+    def __init__(self, name, statement, index=None, allow_full_scan=False, allow_sort=False):
+        self.name = name
+        self.statement = statement
+        self.index = index
+        self.allow_full_scan = allow_full_scan
+        self.allow_sort = allow_sort
+
+
+def get_hot_queries(now=None):
+    from app.models import Device, Camera, Alert, NotificationOutbox, AlertDailyRollup, StatusSnapshot, \
+        OPEN_ALERT_PREDICATE
+
+    now = now or datetime.utcnow()
+    today = now.date()
+    day_start = datetime(today.year, today.month, today.day) - timedelta(days=1)
+    open_alert = or_(Alert.acknowledged.is_(False), Alert.acknowledged.is_(None))
+
+    return [
+        # devices / cameras routes
+        HotQuery('device duplicate ip', select(Device.id).where(Device.ip_address == '10.0.1.1').limit(1),
+                 index='ix_device_ip_address'),
+        HotQuery('device status count', select(func.count(Device.id)).where(Device.status == 'offline'),
+                 index='ix_device_status_id'),
+        HotQuery('device listing by status',
+                 select(Device.id, Device.name, Device.status).where(Device.status == 'offline', Device.id > 100)
+                 .order_by(Device.id).limit(101), index='ix_device_status_id'),
+        HotQuery('device total', select(func.count(Device.id)), allow_full_scan=True),
+        HotQuery('device names for alerts', select(Device.id, Device.name).where(Device.id.in_([1, 2, 3]))),
+        HotQuery('camera duplicate ip', select(Camera.id).where(Camera.ip_address == '10.1.1.1').limit(1),
+                 index='ix_camera_ip_address'),
+        HotQuery('camera status count', select(func.count(Camera.id)).where(Camera.status == 'offline'),
+                 index='ix_camera_status_id'),
+        # alerts routes
+        HotQuery('alert list', select(Alert).order_by(Alert.created_at.desc()).limit(50),
+                 index='ix_alert_created_at'),
+        HotQuery('alert list unacknowledged',
+                 select(Alert).where(Alert.acknowledged.is_(False)).order_by(Alert.created_at.desc()).limit(50),
+                 index='ix_alert_acknowledged_created_at'),
+        HotQuery('alert list by severity',
+                 select(Alert).where(Alert.severity == 'critical', Alert.acknowledged.is_(False))
+                 .order_by(Alert.created_at.desc()).limit(50),
+                 index='ix_alert_severity_acknowledged_created_at'),
+        HotQuery('alert unacknowledged count', select(func.count(Alert.id)).where(Alert.acknowledged.is_(False)),
+                 index='ix_alert_acknowledged_created_at'),
+        HotQuery('alert critical count',
+                 select(func.count(Alert.id)).where(Alert.severity == 'critical', Alert.acknowledged.is_(False)),
+                 index='ix_alert_severity_acknowledged_created_at'),
+        HotQuery('alert total', select(func.count(Alert.id)), allow_full_scan=True),
+        # services
+        HotQuery('alert open dedup lookup',
+                 select(Alert).where(Alert.dedup_key == 'device:1:offline', OPEN_ALERT_PREDICATE),
+                 index='ix_alert_open_dedup_key'),
+        HotQuery('alert detach deleted devices',
+                 update(Alert).where(Alert.device_id.in_([1, 2, 3])).values(device_id=None),
+                 index='ix_alert_device_id'),
+        HotQuery('alert daily rollup',
+                 select(Alert.severity, Alert.device_id, func.count(Alert.id))
+                 .where(Alert.created_at >= day_start, Alert.created_at < day_start + timedelta(days=1))
+                 .group_by(Alert.severity, Alert.device_id),
+                 index=('ix_alert_created_at', 'ix_alert_severity_acknowledged_created_at')),
+        HotQuery('alert retention batch',
+                 select(Alert.id).where(or_(
+                     and_(Alert.acknowledged.is_(True), Alert.created_at < now - timedelta(days=30)),
+                     and_(open_alert, Alert.created_at < now - timedelta(days=180))
+                 )).order_by(Alert.id).limit(500), allow_full_scan=True),
+        HotQuery('outbox pending batch',
+                 select(NotificationOutbox.id).where(NotificationOutbox.status == 'pending')
+                 .order_by(NotificationOutbox.id).limit(100), index='ix_notification_outbox_status_id'),
+        HotQuery('status snapshot', select(Device.status, func.count(Device.id)).group_by(Device.status),
+                 allow_full_scan=True),
+        HotQuery('report by severity',
+                 select(AlertDailyRollup.severity, func.sum(AlertDailyRollup.alert_count))
+                 .where(AlertDailyRollup.day >= today - timedelta(days=7), AlertDailyRollup.day <= today)
+                 .group_by(AlertDailyRollup.severity), index='ix_alert_daily_rollup_day'),
+        HotQuery('report top devices',
+                 select(AlertDailyRollup.device_id, func.sum(AlertDailyRollup.alert_count).label('total'))
+                 .where(AlertDailyRollup.day >= today - timedelta(days=7), AlertDailyRollup.day <= today,
+                        AlertDailyRollup.device_id.isnot(None))
+                 .group_by(AlertDailyRollup.device_id).order_by(text('total DESC')).limit(10),
+                 index='ix_alert_daily_rollup_day', allow_sort=True),
+        HotQuery('report status snapshot',
+                 select(StatusSnapshot.kind, StatusSnapshot.status, StatusSnapshot.count)
+                 .where(StatusSnapshot.day == today), index='ix_status_snapshot_day'),
+    ]
+
+
+def _batched(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= SEED_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(engine, scale=1.0, now=None, rows=None):
+    """Create the schema in engine and fill it with a production-shaped dataset
+
+    rows overrides SEED_ROWS, the row counts at scale 1.
+    """
+    from app import db
+    from app.models import Device, Camera, Alert, NotificationOutbox, AlertDailyRollup, StatusSnapshot
+
+    now = now or datetime.utcnow()
+    rng = random.Random(42)
+    counts = {table: max(10, int(count * scale)) for table, count in (rows or SEED_ROWS).items()}
+    statuses = ['online'] * 90 + ['offline'] * 8 + ['unknown'] * 2
+    severities = ['info'] * 50 + ['low'] * 25 + ['medium'] * 15 + ['high'] * 8 + ['critical'] * 2
+
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for batch in _batched(
+            {'name': f'device-{i}', 'ip_address': f'10.{i // 65536}.{i // 256 % 256}.{i % 256}',
+             'vendor': rng.choice(['cisco', 'juniper', 'mikrotik']), 'device_type': rng.choice(['switch', 'router']),
+             'status': rng.choice(statuses), 'last_seen': now, 'meta': {}}
+            for i in range(counts['device'])
+        ):
+            conn.execute(insert(Device), batch)
+
+        for batch in _batched(
+            {'name': f'camera-{i}', 'ip_address': f'172.16.{i // 256 % 256}.{i % 256}',
+             'rtsp_url': f'rtsp://172.16.{i // 256 % 256}.{i % 256}/stream', 'location': f'site-{i % 20}',
+             'status': rng.choice(statuses)}
+            for i in range(counts['camera'])
+        ):
+            conn.execute(insert(Camera), batch)
+
+        def alerts():
+            for i in range(counts['alert']):
+                created_at = now - timedelta(seconds=rng.randrange(SEED_DAYS * 86400))
+                # Most alerts get acknowledged; open ones carry a unique dedup key
+                acknowledged = rng.random() < 0.95
+                yield {'device_id': rng.randrange(1, counts['device'] + 1) if rng.random() < 0.9 else None,
+                       'severity': rng.choice(severities), 'message': f'alert {i}', 'created_at': created_at,
+                       'acknowledged': acknowledged, 'acknowledged_at': created_at if acknowledged else None,
+                       'dedup_key': f'seed:{i}', 'occurrences': 1, 'last_seen_at': created_at}
+
+        for batch in _batched(alerts()):
+            conn.execute(insert(Alert), batch)
+
+        for batch in _batched(
+            {'alert_id': i + 1, 'status': 'pending' if rng.random() < 0.01 else 'dispatched', 'attempts': 1,
+             'created_at': now}
+            for i in range(counts['notification_outbox'])
+        ):
+            conn.execute(insert(NotificationOutbox), batch)
+
+        today = now.date()
+        for batch in _batched(
+            {'day': today - timedelta(days=d), 'severity': severity, 'device_id': device_id,
+             'alert_count': rng.randrange(1, 20), 'occurrence_count': rng.randrange(1, 40)}
+            for d in range(SEED_DAYS)
+            for severity in ('info', 'low', 'medium', 'high', 'critical')
+            for device_id in rng.sample(range(1, counts['device'] + 1), min(50, counts['device']))
+        ):
+            conn.execute(insert(AlertDailyRollup), batch)
+
+        conn.execute(insert(StatusSnapshot), [
+            {'day': today - timedelta(days=d), 'kind': kind, 'status': status, 'count': 1, 'taken_at': now}
+            for d in range(SEED_DAYS) for kind in ('device', 'camera') for status in ('online', 'offline', 'unknown')
+        ])
+
+        # Planner statistics, as production databases have
+        conn.execute(text('ANALYZE'))
+    return counts
+
+
+def explain(conn, statement):
+    """(plan lines, fully scanned tables, sorts, index names used) for one statement"""
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+
+    if conn.dialect.name == 'postgresql':
+        plan = conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}').scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        lines, scans, sorts, indexes = [], [], [], set()
+
+        def walk(node, depth=0):
+            lines.append('  ' * depth + node['Node Type'] + (f" on {node['Relation Name']}" if 'Relation Name' in node else '')
+                         + (f" using {node['Index Name']}" if 'Index Name' in node else ''))
+            if node['Node Type'] == 'Seq Scan':
+                scans.append(node['Relation Name'])
+            if node['Node Type'] in ('Sort', 'Incremental Sort'):
+                sorts.append(node['Node Type'])
+            if 'Index Name' in node:
+                indexes.add(node['Index Name'])
+            for child in node.get('Plans', []):
+                walk(child, depth + 1)
+
+        walk(plan[0]['Plan'])
+        return lines, scans, sorts, indexes
+
+    rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').all()
+    lines = [row[-1] for row in rows]
+    scans = [match.group(1) for match in map(SQLITE_FULL_SCAN_RE.match, lines) if match]
+    sorts = [line for line in lines if line.startswith(SQLITE_SORT)]
+    indexes = {index for line in lines for index in re.findall(r'INDEX (\w+)', line)}
+    return lines, scans, sorts, indexes
+
+
+def check_query_plans(engine, queries=None):
+    """EXPLAIN every hot query; returns one result per query with the problems found"""
+    results = []
+    with engine.connect() as conn:
+        for query in queries or get_hot_queries():
+            lines, scans, sorts, indexes = explain(conn, query.statement)
+            problems = []
+            if scans and not query.allow_full_scan:
+                problems.append(f"full scan of {', '.join(scans)}")
+            if sorts and not query.allow_sort:
+                problems.append('sorts rows instead of reading them in index order')
+            expected = (query.index,) if isinstance(query.index, str) else query.index or ()
+            if expected and not indexes.intersection(expected):
+                problems.append(f"does not use {' or '.join(expected)}")
+            results.append({'query': query.name, 'plan': lines, 'problems': problems})
+    return results
+
+
+@queries_cli.command('explain')
+@click.option('--database-url', help='Scratch database to seed (default: a temporary SQLite file).')
+@click.option('--scale', default=1.0, show_default=True, help='Fraction of the default seed size.')
+@click.option('--verbose', is_flag=True, help='Print every plan, not just the failing ones.')
+def explain_command(database_url, scale, verbose):
+    """Seed a scratch database and fail if a hot query's plan regresses."""
+    scratch = None
+    if not database_url:
+        fd, scratch = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        database_url = f'sqlite:///{scratch}'
+
+    engine = create_engine(database_url)
+    try:
+        counts = seed(engine, scale)
+        click.echo(f"Seeded {', '.join(f'{rows} {table}' for table, rows in counts.items())}")
+        results = check_query_plans(engine)
+    finally:
+        engine.dispose()
+        if scratch:
+            os.remove(scratch)
+
+    failed = [result for result in results if result['problems']]
+    for result in results:
+        if verbose or result['problems']:
+            status = 'FAIL' if result['problems'] else 'ok'
+            click.echo(f"{status:4}  {result['query']}: {'; '.join(result['problems'])}")
+            for line in result['plan']:
+                click.echo(f'      {line}')
+    click.echo(f'{len(results) - len(failed)}/{len(results)} hot queries keep their plans')
+    if failed:
+        raise SystemExit(1)
@@ -0,0 +1,266 @@
+from collections import OrderedDict
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport
+from flask import current_app, request
+import logging
+import threading
+import time
+import redis
+
+# Seconds to use the local counters after a Redis error
+REDIS_RETRY_SECONDS = 30
+# Most a single request can take from the probe budget
+MAX_PROBE_COST = 100
+
+# Weighted count of the previous and current windows; takes amount only if
+# the result stays within limit. Returns {acquired, previous, current}.
+ACQUIRE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local expiry = tonumber(ARGV[2])
+local amount = tonumber(ARGV[3])
+local previous_weight = tonumber(ARGV[4])
+local previous = tonumber(redis.call('GET', KEYS[1]) or '0')
+local current = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * previous_weight + current + amount > limit then
+    return {0, previous, current}
+end
+current = redis.call('INCRBY', KEYS[2], amount)
+if current == amount then
+    redis.call('EXPIRE', KEYS[2], expiry * 2)
+end
+return {1, previous, current}
+"""
+
+INCR_SCRIPT = """
+local current = redis.call('INCRBY', KEYS[1], ARGV[2])
+if current == tonumber(ARGV[2]) then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return current
+"""
+
+
+def window_keys(key, expiry, now):
+    """Keys of the previous and current window, and the time elapsed in the current one"""
+    index = int(now // expiry)
+    return f'{key}/{index - 1}', f'{key}/{index}', now - index * expiry
+
+
+class LocalCounters:
+    """Per-process counters holding at most max_keys keys, least recently used evicted first"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self.counters = OrderedDict()  # key -> (count, expires_at)
+        self.lock = threading.Lock()
+
+    def _get(self, key, now):
+        entry = self.counters.get(key)
+        if entry is None or entry[1] <= now:
+            return 0, now
+        self.counters.move_to_end(key)
+        return entry
+
+    def get(self, key):
+        with self.lock:
+            return self._get(key, time.time())[0]
+
+    def get_expiry(self, key):
+        with self.lock:
+            return self._get(key, time.time())[1]
+
+    def _incr(self, key, expiry, amount, now):
+        count, expires_at = self._get(key, now)
+        if not count:
+            expires_at = now + expiry
+        self.counters[key] = (count + amount, expires_at)
+        self.counters.move_to_end(key)
+        while len(self.counters) > self.max_keys:
+            self.counters.popitem(last=False)
+        return count + amount
+
+    def incr(self, key, expiry, amount=1):
+        with self.lock:
+            return self._incr(key, expiry, amount, time.time())
+
+    def acquire(self, key, limit, expiry, amount=1):
+        now = time.time()
+        previous_key, current_key, elapsed = window_keys(key, expiry, now)
+        with self.lock:
+            previous = self._get(previous_key, now)[0]
+            current = self._get(current_key, now)[0]
+            if previous * (expiry - elapsed) / expiry + current + amount > limit:
+                return False
+            self._incr(current_key, expiry * 2, amount, now)
+            return True
+
+    def clear(self, key):
+        with self.lock:
+            for stored in [k for k in self.counters if k == key or k.startswith(key + '/')]:
+                del self.counters[stored]
+
+    def reset(self):
+        with self.lock:
+            count = len(self.counters)
+            self.counters.clear()
+            return count
+
+
+class SlidingWindowCounter:
+    """Sliding-window counter over a Redis client, falling back to LocalCounters"""
+
+    def __init__(self, max_local_keys=10000):
+        self.local = LocalCounters(max_local_keys)
+        self.down_until = 0.0
+        self.scripts = {}
+
+    def _script(self, client, source):
+        script = self.scripts.get((id(client), source))
+        if script is None:
+            script = client.register_script(source)
+            self.scripts[(id(client), source)] = script
+        return script
+
+    def _usable(self, client):
+        return client is not None and time.monotonic() >= self.down_until
+
+    def _failed(self, error):
+        self.down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        logging.warning(f"Rate limit storage unavailable, using local counters for {REDIS_RETRY_SECONDS}s: {str(error)}")
+
+    def acquire(self, client, key, limit, expiry, amount=1):
+        """Take amount from key's budget of limit per expiry seconds if it fits"""
+        if self._usable(client):
+            previous_key, current_key, elapsed = window_keys(key, expiry, time.time())
+            try:
+                acquired, _, _ = self._script(client, ACQUIRE_SCRIPT)(
+                    keys=[previous_key, current_key],
+                    args=[limit, expiry, amount, (expiry - elapsed) / expiry]
+                )
+                return bool(acquired)
+            except redis.RedisError as e:
+                self._failed(e)
+        return self.local.acquire(key, limit, expiry, amount)
+
+    def get_window(self, client, key, expiry):
+        """(previous count, previous expires in, current count, current expires in)"""
+        previous_key, current_key, elapsed = window_keys(key, expiry, time.time())
+        if self._usable(client):
+            try:
+                previous, current = client.mget(previous_key, current_key)
+                return int(previous or 0), expiry - elapsed, int(current or 0), 2 * expiry - elapsed
+            except redis.RedisError as e:
+                self._failed(e)
+        return (self.local.get(previous_key), expiry - elapsed,
+                self.local.get(current_key), 2 * expiry - elapsed)
+
+    def incr(self, client, key, expiry, amount=1):
+        if self._usable(client):
+            try:
+                return int(self._script(client, INCR_SCRIPT)(keys=[key], args=[expiry, amount]))
+            except redis.RedisError as e:
+                self._failed(e)
+        return self.local.incr(key, expiry, amount)
+
+    def get(self, client, key):
+        if self._usable(client):
+            try:
+                return int(client.get(key) or 0)
+            except redis.RedisError as e:
+                self._failed(e)
+        return self.local.get(key)
+
+    def get_expiry(self, client, key):
+        if self._usable(client):
+            try:
+                return time.time() + max(client.pttl(key), 0) / 1000
+            except redis.RedisError as e:
+                self._failed(e)
+        return self.local.get_expiry(key)
+
+    def clear(self, client, key, expiry=None):
+        self.local.clear(key)
+        if self._usable(client):
+            try:
+                keys = [key]
+                if expiry:
+                    keys.extend(window_keys(key, expiry, time.time())[:2])
+                client.delete(*keys)
+            except redis.RedisError as e:
+                self._failed(e)
+
+
+class SlidingWindowRedisStorage(Storage, SlidingWindowCounterSupport):
+    """flask_limiter storage for ``sliding+redis://host:port/db`` URIs
+
+    Use with the ``sliding-window-counter`` strategy: each check is one
+    atomic Lua script over two fixed-window counters. Checks never fail
+    because Redis is down; they fall back to per-process counters bounded
+    by the ``max_local_keys`` storage option.
+    """
+
+    STORAGE_SCHEME = ['sliding+redis', 'sliding+rediss']
+
+    def __init__(self, uri, wrap_exceptions=False, max_local_keys=10000, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions)
+        self.client = redis.Redis.from_url(
+            uri.replace('sliding+', '', 1),
+            socket_timeout=options.get('socket_timeout', 1),
+            socket_connect_timeout=options.get('socket_connect_timeout', 1)
+        )
+        self.counter = SlidingWindowCounter(int(max_local_keys))
+
+    @property
+    def base_exceptions(self):
+        return redis.RedisError
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        return self.counter.acquire(self.client, key, limit, expiry, amount)
+
+    def get_sliding_window(self, key, expiry):
+        return self.counter.get_window(self.client, key, expiry)
+
+    def clear_sliding_window(self, key, expiry):
+        self.counter.clear(self.client, key, expiry)
+
+    def incr(self, key, expiry, amount=1):
+        return self.counter.incr(self.client, key, expiry, amount)
+
+    def get(self, key):
+        return self.counter.get(self.client, key)
+
+    def get_expiry(self, key):
+        return self.counter.get_expiry(self.client, key)
+
+    def check(self):
+        # Always usable thanks to the local fallback
+        return True
+
+    def reset(self):
+        count = self.counter.local.reset()
+        try:
+            keys = list(self.client.scan_iter('LIMITER*'))
+            if keys:
+                count += self.client.delete(*keys)
+        except redis.RedisError as e:
+            self.counter._failed(e)
+        return count
+
+    def clear(self, key):
+        self.counter.clear(self.client, key)
+
+
+def probe_limit():
+    return current_app.config.get('PROBE_RATE_LIMIT', '300 per minute')
+
+
+def probe_cost():
+    """Probe budget used by the current request: one per device a bulk poll selects"""
+    if request.endpoint != 'devices.bulk_device_action':
+        return 1
+    data = request.get_json(silent=True) or {}
+    if data.get('action') != 'poll':
+        return 0
+    ids = data.get('ids')
+    # Filters are charged the maximum rather than counting matches up front
+    return min(len(ids), MAX_PROBE_COST) if isinstance(ids, list) and ids else MAX_PROBE_COST
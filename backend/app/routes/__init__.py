@@ -2,10 +2,14 @@ from .auth import auth_bp
 from .devices import devices_bp
 from .cameras import cameras_bp
 from .alerts import alerts_bp
+from .reports import reports_bp
+from .tasks import tasks_bp
 
 def register_blueprints(app):
     """Register all blueprint routes"""
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(devices_bp, url_prefix='/api/devices')
     app.register_blueprint(cameras_bp, url_prefix='/api/cameras')
-    app.register_blueprint(alerts_bp, url_prefix='/api/alerts')
\ No newline at end of file
+    app.register_blueprint(alerts_bp, url_prefix='/api/alerts')
+    app.register_blueprint(reports_bp, url_prefix='/api/reports')
+    app.register_blueprint(tasks_bp, url_prefix='/api/tasks')
\ No newline at end of file
@@ -3,12 +3,26 @@ from app.models import Alert, Device
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.routes.auth import admin_required, operator_required
+from app.serializers import alert_serializer
+from app.table_versions import versioned
+from app.db_routing import replica_reads
 from datetime import datetime
 
 alerts_bp = Blueprint('alerts', __name__)
 
+def _with_device_names(alerts):
+    """Serialize alerts with their device's name, looking the names up in one query"""
+    device_ids = {alert.device_id for alert in alerts if alert.device_id}
+    names = dict(db.session.query(Device.id, Device.name).filter(Device.id.in_(device_ids))) if device_ids else {}
+    result = alert_serializer.dump_many(alerts)
+    for item in result:
+        item['device_name'] = names.get(item['device_id'])
+    return result
+
 @alerts_bp.route('/', methods=['GET'])
 @jwt_required()
+@replica_reads
+@versioned('alert', 'device')
 def list_alerts():
     try:
         page = request.args.get('page', 1, type=int)
@@ -29,23 +43,7 @@ def list_alerts():
             page=page, per_page=per_page, error_out=False
         )
         
-        result = []
-        for alert in alerts.items:
-            device_name = None
-            if alert.device_id:
-                device = Device.query.get(alert.device_id)
-                device_name = device.name if device else None
-            
-            result.append({
-                'id': alert.id,
-                'device_id': alert.device_id,
-                'device_name': device_name,
-                'severity': alert.severity,
-                'message': alert.message,
-                'created_at': alert.created_at.isoformat(),
-                'acknowledged': alert.acknowledged,
-                'acknowledged_at': alert.acknowledged_at.isoformat() if alert.acknowledged_at else None
-            })
+        result = _with_device_names(alerts.items)
         
         return jsonify({
             'alerts': result,
@@ -64,22 +62,7 @@ def list_alerts():
 def get_alert(alert_id):
     try:
         alert = Alert.query.get_or_404(alert_id)
-        
-        device_name = None
-        if alert.device_id:
-            device = Device.query.get(alert.device_id)
-            device_name = device.name if device else None
-        
-        return jsonify({
-            'id': alert.id,
-            'device_id': alert.device_id,
-            'device_name': device_name,
-            'severity': alert.severity,
-            'message': alert.message,
-            'created_at': alert.created_at.isoformat(),
-            'acknowledged': alert.acknowledged,
-            'acknowledged_at': alert.acknowledged_at.isoformat() if alert.acknowledged_at else None
-        })
+        return jsonify(_with_device_names([alert])[0])
     except Exception as e:
         return jsonify({'msg': 'Alert not found', 'error': str(e)}), 404
 
@@ -107,30 +90,24 @@ def create_alert():
             if not device:
                 return jsonify({'msg': 'Device not found'}), 404
         
-        alert = Alert(
+        from app.services.alerting import raise_alert, enqueue_notification
+        
+        # Alerts sharing an open dedup_key are counted on the existing alert
+        alert_id, created = raise_alert(
+            severity,
+            message,
             device_id=device_id,
-            severity=severity,
-            message=message,
-            created_at=datetime.utcnow(),
-            acknowledged=False
+            dedup_key=data.get('dedup_key')
         )
         
-        db.session.add(alert)
-        db.session.commit()
+        # Queue alert notification if severity is high
+        if created and severity in ['critical', 'high']:
+            enqueue_notification(alert_id)
         
-        # Trigger alert notification if severity is high
-        if severity in ['critical', 'high']:
-            from app.services.alerting import send_alert_notification
-            send_alert_notification.delay(alert.id)
+        db.session.commit()
         
-        return jsonify({
-            'id': alert.id,
-            'device_id': alert.device_id,
-            'severity': alert.severity,
-            'message': alert.message,
-            'created_at': alert.created_at.isoformat(),
-            'acknowledged': alert.acknowledged
-        }), 201
+        alert = Alert.query.get(alert_id)
+        return jsonify(alert_serializer.dump(alert)), 201 if created else 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'msg': 'Failed to create alert', 'error': str(e)}), 500
@@ -199,8 +176,42 @@ def delete_alert(alert_id):
         db.session.rollback()
         return jsonify({'msg': 'Failed to delete alert', 'error': str(e)}), 500
 
+@alerts_bp.route('/archive', methods=['GET'])
+@admin_required
+def list_archived_alerts():
+    try:
+        from app.services.retention import load_archived_alerts
+
+        start = request.args.get('start')
+        end = request.args.get('end')
+        device_id = request.args.get('device_id', type=int)
+        alert_id = request.args.get('alert_id', type=int)
+        limit = min(request.args.get('limit', 500, type=int), 5000)
+
+        try:
+            start = datetime.fromisoformat(start) if start else None
+            end = datetime.fromisoformat(end) if end else None
+        except ValueError:
+            return jsonify({'msg': 'start and end must be ISO 8601 timestamps'}), 400
+
+        result = []
+        for row in load_archived_alerts(start=start, end=end, device_id=device_id, alert_id=alert_id):
+            result.append(row)
+            if len(result) >= limit:
+                break
+
+        return jsonify({
+            'alerts': result,
+            'count': len(result),
+            'truncated': len(result) >= limit
+        })
+    except Exception as e:
+        return jsonify({'msg': 'Failed to read alert archive', 'error': str(e)}), 500
+
 @alerts_bp.route('/summary', methods=['GET'])
 @jwt_required()
+@replica_reads
+@versioned('alert', 'device')
 def alerts_summary():
     try:
         total_alerts = Alert.query.count()
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.models import User
 from app import db, limiter
+from app.user_cache import get_cached_user, changed_since, claims_trusted, invalidate_user
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, create_refresh_token, get_jwt
 from datetime import timedelta
 from functools import wraps
@@ -20,13 +21,27 @@ def validate_password(password):
         return False, "Password must contain at least one digit"
     return True, "Password is valid"
 
+def get_current_role():
+    """Role of the current token's user, read from its signed claim
+
+    The claim is only trusted while this process is sure to hear of role
+    changes (see claims_trusted). Otherwise, and for tokens without a role
+    claim or issued before the user's role changed or the user was deleted,
+    the role comes from the user row, cached for USER_CACHE_TTL_SECONDS.
+    """
+    claims = get_jwt()
+    user_id = get_jwt_identity()
+    role = claims.get('role')
+    if role is None or not claims_trusted() or changed_since(user_id, claims.get('iat', 0)):
+        user = get_cached_user(user_id)
+        return user['role'] if user else None
+    return role
+
 def admin_required(f):
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user or user.role != 'admin':
+        if get_current_role() != 'admin':
             return jsonify({'msg': 'Admin access required'}), 403
         return f(*args, **kwargs)
     return decorated_function
@@ -35,9 +50,7 @@ def operator_required(f):
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user or user.role not in ['admin', 'operator']:
+        if get_current_role() not in ['admin', 'operator']:
             return jsonify({'msg': 'Operator or admin access required'}), 403
         return f(*args, **kwargs)
     return decorated_function
@@ -185,6 +198,7 @@ def update_user(user_id):
         email = data.get('email')
         password = data.get('password')
         role = data.get('role')
+        role_changed = False
         # Check for username/email uniqueness if changed
         if username and username != user.username:
             if User.query.filter_by(username=username).first():
@@ -197,6 +211,7 @@ def update_user(user_id):
         if role:
             if role not in ['admin', 'operator', 'viewer']:
                 return jsonify({'msg': 'Invalid role'}), 400
+            role_changed = role != user.role
             user.role = role
         if password:
             # Validate password complexity
@@ -205,6 +220,9 @@ def update_user(user_id):
                 return jsonify({'msg': msg}), 400
             user.set_password(password)
         db.session.commit()
+        if role_changed:
+            # Tokens issued before now carry the old role claim
+            invalidate_user(user.id)
         return jsonify({
             'id': user.id,
             'username': user.username,
@@ -225,6 +243,7 @@ def delete_user(user_id):
             return jsonify({'msg': 'User not found'}), 404
         db.session.delete(user)
         db.session.commit()
+        invalidate_user(user_id)
         return jsonify({'msg': 'User deleted'})
     except Exception as e:
         db.session.rollback()
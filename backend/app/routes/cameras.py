@@ -1,48 +1,43 @@
 from flask import Blueprint, jsonify, request
 from app.models import Camera, Alert
-from app import db
+from app import db, limiter
+from app.ratelimit import probe_limit, probe_cost
+from app.listing import Listing
+from app.serializers import camera_serializer
+from app.table_versions import versioned
+from app.db_routing import replica_reads
 from flask_jwt_extended import jwt_required
 from app.routes.auth import admin_required, operator_required
 from datetime import datetime
 
 cameras_bp = Blueprint('cameras', __name__)
 
+# Camera tests share one budget per client with device polls
+probes_limit = limiter.shared_limit(probe_limit, scope='probes', cost=probe_cost)
+
+camera_listing = Listing(
+    'cameras',
+    Camera,
+    camera_serializer,
+    filters={
+        'status': Camera.status,
+        'location': Camera.location
+    }
+)
+
 @cameras_bp.route('/', methods=['GET'])
 @jwt_required()
+@replica_reads
+@versioned('camera')
 def list_cameras():
-    try:
-        cameras = Camera.query.all()
-        result = []
-        for c in cameras:
-            result.append({
-                'id': c.id,
-                'name': c.name,
-                'ip_address': c.ip_address,
-                'rtsp_url': c.rtsp_url,
-                'username': c.username,
-                'location': c.location,
-                'status': c.status,
-                'last_snapshot': c.last_snapshot
-            })
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'msg': 'Failed to list cameras', 'error': str(e)}), 500
+    return camera_listing.respond()
 
 @cameras_bp.route('/<int:camera_id>', methods=['GET'])
 @jwt_required()
 def get_camera(camera_id):
     try:
         camera = Camera.query.get_or_404(camera_id)
-        return jsonify({
-            'id': camera.id,
-            'name': camera.name,
-            'ip_address': camera.ip_address,
-            'rtsp_url': camera.rtsp_url,
-            'username': camera.username,
-            'location': camera.location,
-            'status': camera.status,
-            'last_snapshot': camera.last_snapshot
-        })
+        return jsonify(camera_serializer.dump(camera))
     except Exception as e:
         return jsonify({'msg': 'Camera not found', 'error': str(e)}), 404
 
@@ -81,15 +76,7 @@ def create_camera():
         db.session.add(camera)
         db.session.commit()
         
-        return jsonify({
-            'id': camera.id,
-            'name': camera.name,
-            'ip_address': camera.ip_address,
-            'rtsp_url': camera.rtsp_url,
-            'username': camera.username,
-            'location': camera.location,
-            'status': camera.status
-        }), 201
+        return jsonify(camera_serializer.dump(camera)), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'msg': 'Failed to create camera', 'error': str(e)}), 500
@@ -122,16 +109,7 @@ def update_camera(camera_id):
         
         db.session.commit()
         
-        return jsonify({
-            'id': camera.id,
-            'name': camera.name,
-            'ip_address': camera.ip_address,
-            'rtsp_url': camera.rtsp_url,
-            'username': camera.username,
-            'location': camera.location,
-            'status': camera.status,
-            'last_snapshot': camera.last_snapshot
-        })
+        return jsonify(camera_serializer.dump(camera))
     except Exception as e:
         db.session.rollback()
         return jsonify({'msg': 'Failed to update camera', 'error': str(e)}), 500
@@ -167,15 +145,18 @@ def get_camera_stream(camera_id):
 
 @cameras_bp.route('/<int:camera_id>/test', methods=['POST'])
 @operator_required
+@probes_limit
 def test_camera_connection(camera_id):
     try:
         camera = Camera.query.get_or_404(camera_id)
 
-        # Import here to avoid circular imports
-        from app.services.poller import test_camera_connection_task, test_camera_sync
+        # Import here to avoid circular imports; Celery is set up on first use
+        from app import get_celery_app
+        from app.services.poller import test_camera_connection_task
 
         # Try to queue async test task; if Celery/broker isn't available, fall back to sync test
         try:
+            get_celery_app()
             task = test_camera_connection_task.delay(camera_id)
             return jsonify({
                 'msg': 'Camera connection test initiated',
@@ -183,40 +164,35 @@ def test_camera_connection(camera_id):
                 'camera_id': camera_id
             })
         except Exception:
-            # Celery/broker unavailable — run the test in a background thread
-            # so the HTTP request returns immediately instead of blocking.
-            import threading
-            from flask import current_app
+            # Celery/broker unavailable — run the test on the shared bounded
+            # executor so the HTTP request returns immediately
+            from app.services.probes import submit_camera_test, ProbeQueueFull
 
-            def _bg_test(cam_id):
-                try:
-                    app = current_app._get_current_object()
-                    with app.app_context():
-                        res = test_camera_sync(cam_id)
-                        # Optionally log or store the result somewhere
-                        try:
-                            import logging
-                            logging.getLogger('app').info(f"Background camera test result for {cam_id}: {res}")
-                        except Exception:
-                            pass
-                except Exception as _e:
-                    try:
-                        import logging
-                        logging.getLogger('app').exception(f"Background camera test failed for {cam_id}: {_e}")
-                    except Exception:
-                        pass
+            try:
+                status, outcome = submit_camera_test(camera_id)
+            except ProbeQueueFull:
+                response = jsonify({'msg': 'Too many background tests queued, try again shortly'})
+                response.headers['Retry-After'] = '5'
+                return response, 503
 
-            t = threading.Thread(target=_bg_test, args=(camera_id,), daemon=True)
-            t.start()
+            if status == 'fresh':
+                return jsonify({
+                    'msg': 'Camera tested recently',
+                    'camera_id': camera_id,
+                    'result': outcome
+                })
             return jsonify({
                 'msg': 'Camera connection test initiated (background)',
-                'camera_id': camera_id
+                'camera_id': camera_id,
+                'shared': status == 'in_flight'
             }), 202
     except Exception as e:
         return jsonify({'msg': 'Failed to test camera connection', 'error': str(e)}), 500
 
 @cameras_bp.route('/status', methods=['GET'])
 @jwt_required()
+@replica_reads
+@versioned('camera:status')
 def cameras_status_summary():
     try:
         online_count = Camera.query.filter_by(status='online').count()
@@ -1,50 +1,69 @@
 from flask import Blueprint, jsonify, request
 from app.models import Device, Alert
-from app import db
+from app import db, limiter
+from app.ratelimit import probe_limit, probe_cost
+from app.listing import Listing
+from app.serializers import device_serializer
+from app.table_versions import versioned
+from app.db_routing import replica_reads
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.routes.auth import admin_required, operator_required
+from app.routes.auth import admin_required, operator_required, get_current_role
 from datetime import datetime
 
 devices_bp = Blueprint('devices', __name__)
 
+# Polls share one budget per client with camera tests
+probes_limit = limiter.shared_limit(probe_limit, scope='probes', cost=probe_cost)
+
+device_listing = Listing(
+    'devices',
+    Device,
+    device_serializer,
+    filters={
+        'status': Device.status,
+        'vendor': Device.vendor,
+        'type': Device.device_type
+    }
+)
+
 @devices_bp.route('/', methods=['GET'])
 @jwt_required()
+@replica_reads
+@versioned('device')
 def list_devices():
+    return device_listing.respond()
+
+@devices_bp.route('/export', methods=['GET'])
+@jwt_required()
+@replica_reads
+def export_devices():
+    return device_listing.export()
+
+@devices_bp.route('/import', methods=['POST'])
+@operator_required
+def import_devices():
     try:
-        devices = Device.query.all()
-        result = []
-        for d in devices:
-            result.append({
-                'id': d.id,
-                'name': d.name,
-                'ip_address': d.ip_address,
-                'vendor': d.vendor,
-                'device_type': d.device_type,
-                'snmp_community': d.snmp_community,
-                'last_seen': d.last_seen.isoformat() if d.last_seen else None,
-                'status': d.status,
-                'meta': d.meta
-            })
-        return jsonify(result)
+        from app.services.bulk import read_import_rows, import_devices as run_import
+        
+        fmt = request.args.get('format')
+        if not fmt:
+            fmt = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'ndjson'
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'msg': 'format must be csv or ndjson'}), 400
+        
+        # Rows are read from the request stream and inserted chunk by chunk
+        report = run_import(read_import_rows(request.stream, fmt))
+        return jsonify(report), 200 if report['imported'] or not report['failed'] else 400
     except Exception as e:
-        return jsonify({'msg': 'Failed to list devices', 'error': str(e)}), 500
+        db.session.rollback()
+        return jsonify({'msg': 'Failed to import devices', 'error': str(e)}), 500
 
 @devices_bp.route('/<int:device_id>', methods=['GET'])
 @jwt_required()
 def get_device(device_id):
     try:
         device = Device.query.get_or_404(device_id)
-        return jsonify({
-            'id': device.id,
-            'name': device.name,
-            'ip_address': device.ip_address,
-            'vendor': device.vendor,
-            'device_type': device.device_type,
-            'snmp_community': device.snmp_community,
-            'last_seen': device.last_seen.isoformat() if device.last_seen else None,
-            'status': device.status,
-            'meta': device.meta
-        })
+        return jsonify(device_serializer.dump(device))
     except Exception as e:
         return jsonify({'msg': 'Device not found', 'error': str(e)}), 404
 
@@ -83,16 +102,7 @@ def create_device():
         db.session.add(device)
         db.session.commit()
         
-        return jsonify({
-            'id': device.id,
-            'name': device.name,
-            'ip_address': device.ip_address,
-            'vendor': device.vendor,
-            'device_type': device.device_type,
-            'snmp_community': device.snmp_community,
-            'status': device.status,
-            'meta': device.meta
-        }), 201
+        return jsonify(device_serializer.dump(device)), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'msg': 'Failed to create device', 'error': str(e)}), 500
@@ -122,17 +132,7 @@ def update_device(device_id):
         
         db.session.commit()
         
-        return jsonify({
-            'id': device.id,
-            'name': device.name,
-            'ip_address': device.ip_address,
-            'vendor': device.vendor,
-            'device_type': device.device_type,
-            'snmp_community': device.snmp_community,
-            'last_seen': device.last_seen.isoformat() if device.last_seen else None,
-            'status': device.status,
-            'meta': device.meta
-        })
+        return jsonify(device_serializer.dump(device))
     except Exception as e:
         db.session.rollback()
         return jsonify({'msg': 'Failed to update device', 'error': str(e)}), 500
@@ -151,15 +151,18 @@ def delete_device(device_id):
 
 @devices_bp.route('/<int:device_id>/poll', methods=['POST'])
 @operator_required
+@probes_limit
 def poll_device(device_id):
     try:
         device = Device.query.get_or_404(device_id)
         
-        # Import here to avoid circular imports
-        from app.services.poller import poll_device_task, poll_device_sync
+        # Import here to avoid circular imports; Celery is set up on first use
+        from app import get_celery_app
+        from app.services.poller import poll_device_task
         
-        # Try to queue async polling task; if Celery/broker isn't available, fall back to background thread
+        # Try to queue async polling task; if Celery/broker isn't available, fall back to the background executor
         try:
+            get_celery_app()
             task = poll_device_task.delay(device_id)
             return jsonify({
                 'msg': 'Polling initiated',
@@ -167,40 +170,101 @@ def poll_device(device_id):
                 'device_id': device_id
             })
         except Exception:
-            # Celery/broker unavailable — run the poll in a background thread
-            # so the HTTP request returns immediately instead of blocking.
-            import threading
-            from flask import current_app
+            # Celery/broker unavailable — run the poll on the shared bounded
+            # executor so the HTTP request returns immediately
+            from app.services.probes import submit_device_poll, ProbeQueueFull
             
-            def _bg_poll(dev_id):
-                try:
-                    app = current_app._get_current_object()
-                    with app.app_context():
-                        res = poll_device_sync(dev_id)
-                        # Optionally log the result
-                        try:
-                            import logging
-                            logging.getLogger('app').info(f"Background device poll result for {dev_id}: {res}")
-                        except Exception:
-                            pass
-                except Exception as _e:
-                    try:
-                        import logging
-                        logging.getLogger('app').exception(f"Background device poll failed for {dev_id}: {_e}")
-                    except Exception:
-                        pass
+            try:
+                status, outcome = submit_device_poll(device_id)
+            except ProbeQueueFull:
+                response = jsonify({'msg': 'Too many background polls queued, try again shortly'})
+                response.headers['Retry-After'] = '5'
+                return response, 503
             
-            t = threading.Thread(target=_bg_poll, args=(device_id,), daemon=True)
-            t.start()
+            if status == 'fresh':
+                return jsonify({
+                    'msg': 'Device polled recently',
+                    'device_id': device_id,
+                    'result': outcome
+                })
             return jsonify({
                 'msg': 'Polling initiated (background)',
-                'device_id': device_id
+                'device_id': device_id,
+                'shared': status == 'in_flight'
             }), 202
     except Exception as e:
         return jsonify({'msg': 'Failed to initiate polling', 'error': str(e)}), 500
 
+@devices_bp.route('/bulk', methods=['POST'])
+@operator_required
+@probes_limit
+def bulk_device_action():
+    try:
+        from app.services import bulk
+        
+        data = request.get_json()
+        if not data:
+            return jsonify({'msg': 'No input data provided'}), 400
+        
+        action = data.get('action')
+        if action not in bulk.BULK_ACTIONS:
+            return jsonify({'msg': f"action must be one of: {', '.join(bulk.BULK_ACTIONS)}"}), 400
+        
+        if action == 'delete':
+            if get_current_role() != 'admin':
+                return jsonify({'msg': 'Admin access required'}), 403
+        
+        try:
+            selection = bulk.get_bulk_selection(data)
+            values = bulk.validate_bulk_values(data.get('values')) if action == 'update' else None
+        except ValueError as e:
+            return jsonify({'msg': str(e)}), 400
+        
+        if action == 'update':
+            count = bulk.bulk_update_devices(selection, values)
+            return jsonify({'msg': f'Updated {count} devices', 'action': action, 'count': count})
+        
+        if action == 'delete':
+            count = bulk.bulk_delete_devices(selection)
+            return jsonify({'msg': f'Deleted {count} devices', 'action': action, 'count': count})
+        
+        device_ids = db.session.execute(
+            db.select(Device.id).where(selection).order_by(Device.id)
+        ).scalars().all()
+        if not device_ids:
+            return jsonify({'msg': 'No devices matched', 'action': action, 'count': 0, 'job_id': None})
+        
+        try:
+            job_id = bulk.enqueue_bulk_poll(device_ids)
+        except Exception:
+            # Celery/broker unavailable — poll on the bounded background executor
+            queued, rejected = bulk.start_background_poll(device_ids)
+            if not queued:
+                response = jsonify({'msg': 'Too many background polls queued, try again shortly'})
+                response.headers['Retry-After'] = '5'
+                return response, 503
+            return jsonify({
+                'msg': 'Polling initiated (background)',
+                'action': action,
+                'count': queued,
+                'rejected': rejected,
+                'job_id': None
+            }), 202
+        
+        return jsonify({
+            'msg': 'Polling initiated',
+            'action': action,
+            'count': len(device_ids),
+            'job_id': job_id
+        }), 202
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'msg': 'Bulk action failed', 'error': str(e)}), 500
+
 @devices_bp.route('/status', methods=['GET'])
 @jwt_required()
+@replica_reads
+@versioned('device:status')
 def devices_status_summary():
     try:
         online_count = Device.query.filter_by(status='online').count()
@@ -0,0 +1,80 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+from app.db_routing import replica_reads
+from datetime import datetime, date, timedelta
+
+reports_bp = Blueprint('reports', __name__)
+
+# Longest range a single report may cover
+MAX_REPORT_DAYS = 366
+
+def _parse_day(value, default):
+    return date.fromisoformat(value) if value else default
+
+@reports_bp.route('/daily', methods=['GET'])
+@jwt_required()
+@replica_reads
+def daily_report():
+    try:
+        # Imported on use so the web app starts without loading Celery
+        from app.services.reporting import get_daily_report
+
+        yesterday = datetime.utcnow().date() - timedelta(days=1)
+        try:
+            if request.args.get('date'):
+                start = end = date.fromisoformat(request.args['date'])
+            else:
+                end = _parse_day(request.args.get('end'), yesterday)
+                start = _parse_day(request.args.get('start'), end)
+        except ValueError:
+            return jsonify({'msg': 'Dates must be in YYYY-MM-DD format'}), 400
+
+        if start > end:
+            return jsonify({'msg': 'start must not be after end'}), 400
+        if (end - start).days >= MAX_REPORT_DAYS:
+            return jsonify({'msg': f'Reports are limited to {MAX_REPORT_DAYS} days'}), 400
+
+        return jsonify(get_daily_report(start, end))
+    except Exception as e:
+        return jsonify({'msg': 'Failed to build daily report', 'error': str(e)}), 500
+
+@reports_bp.route('/weekly', methods=['GET'])
+@jwt_required()
+@replica_reads
+def weekly_report():
+    try:
+        from app.services.reporting import get_report
+
+        try:
+            # Any day in the week; defaults to last full week (Monday to Sunday)
+            default = datetime.utcnow().date() - timedelta(days=7)
+            day = _parse_day(request.args.get('date'), default)
+        except ValueError:
+            return jsonify({'msg': 'date must be in YYYY-MM-DD format'}), 400
+
+        start = day - timedelta(days=day.weekday())
+        return jsonify(get_report(start, start + timedelta(days=6)))
+    except Exception as e:
+        return jsonify({'msg': 'Failed to build weekly report', 'error': str(e)}), 500
+
+@reports_bp.route('/monthly', methods=['GET'])
+@jwt_required()
+@replica_reads
+def monthly_report():
+    try:
+        from app.services.reporting import get_report
+
+        try:
+            # YYYY-MM; defaults to last month
+            month = request.args.get('month')
+            if month:
+                start = datetime.strptime(month, '%Y-%m').date()
+            else:
+                start = (datetime.utcnow().date().replace(day=1) - timedelta(days=1)).replace(day=1)
+        except ValueError:
+            return jsonify({'msg': 'month must be in YYYY-MM format'}), 400
+
+        end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        return jsonify(get_report(start, end))
+    except Exception as e:
+        return jsonify({'msg': 'Failed to build monthly report', 'error': str(e)}), 500
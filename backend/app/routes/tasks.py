@@ -0,0 +1,84 @@
+from flask import Blueprint, current_app, jsonify, request
+from app.routes.auth import operator_required
+import time
+
+tasks_bp = Blueprint('tasks', __name__)
+
+# Longest a client may hold a request open waiting for results; TASK_MAX_WAIT_SECONDS
+# lowers it on sync workers, where each waiting client holds a whole process
+MAX_WAIT_SECONDS = 30
+MAX_BATCH_SIZE = 100
+WAIT_POLL_INTERVAL = 0.5
+
+def _load_result(task_id):
+    """AsyncResult for a task, or GroupResult for a saved group such as a bulk poll"""
+    from app import get_celery_app
+
+    celery = get_celery_app()
+    group = celery.GroupResult.restore(task_id)
+    return group if group is not None else celery.AsyncResult(task_id)
+
+def _describe(task_id, result):
+    if hasattr(result, 'results'):
+        ready = result.ready()
+        failed = result.failed() if ready else False
+        return {
+            'task_id': task_id,
+            'type': 'group',
+            'state': ('FAILURE' if failed else 'SUCCESS') if ready else 'PROGRESS',
+            'ready': ready,
+            'completed': result.completed_count(),
+            'total': len(result.results),
+            'result': [child.result if child.successful() else str(child.result) for child in result.results] if ready else None
+        }
+
+    state = result.state
+    value = result.result if result.ready() else None
+    return {
+        'task_id': task_id,
+        'type': 'task',
+        'state': state,
+        'ready': result.ready(),
+        'result': value if state == 'SUCCESS' else (str(value) if value is not None else None)
+    }
+
+def _wait(results, wait):
+    """Block until every result is ready or wait seconds have passed"""
+    deadline = time.monotonic() + wait
+    pending = list(results)
+    while pending and time.monotonic() < deadline:
+        pending = [result for result in pending if not result.ready()]
+        if pending:
+            time.sleep(min(WAIT_POLL_INTERVAL, max(0, deadline - time.monotonic())))
+
+def _get_wait():
+    wait = request.args.get('wait', 0, type=float)
+    limit = min(MAX_WAIT_SECONDS, current_app.config.get('TASK_MAX_WAIT_SECONDS', MAX_WAIT_SECONDS))
+    return max(0, min(wait, limit))
+
+# Only operators and admins start tasks, so only they may read the results
+@tasks_bp.route('/<task_id>', methods=['GET'])
+@operator_required
+def get_task(task_id):
+    try:
+        result = _load_result(task_id)
+        _wait([result], _get_wait())
+        return jsonify(_describe(task_id, result))
+    except Exception as e:
+        return jsonify({'msg': 'Failed to read task status', 'error': str(e)}), 503
+
+@tasks_bp.route('/', methods=['GET'])
+@operator_required
+def get_tasks():
+    try:
+        task_ids = [task_id for task_id in request.args.get('ids', '').split(',') if task_id]
+        if not task_ids:
+            return jsonify({'msg': 'ids is required'}), 400
+        if len(task_ids) > MAX_BATCH_SIZE:
+            return jsonify({'msg': f'At most {MAX_BATCH_SIZE} ids per request'}), 400
+
+        results = {task_id: _load_result(task_id) for task_id in task_ids}
+        _wait(results.values(), _get_wait())
+        return jsonify({'tasks': [_describe(task_id, result) for task_id, result in results.items()]})
+    except Exception as e:
+        return jsonify({'msg': 'Failed to read task status', 'error': str(e)}), 503
@@ -0,0 +1,86 @@
+from operator import attrgetter
+from app.models import Device, Camera, Alert
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+class Serializer:
+    """Builds response dicts from model instances or result rows
+
+    fields maps output names to (column, formatter or None), the shape
+    Listing uses for its columns. The attribute getter for a selection of
+    fields is built once and reused for every object.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.dumpers = {}
+
+    def dumper(self, names=None):
+        """Function turning one object into a dict of the named fields"""
+        names = tuple(names) if names else tuple(self.fields)
+        dump = self.dumpers.get(names)
+        if dump is not None:
+            return dump
+
+        getter = attrgetter(*names)
+        if len(names) == 1:
+            single = getter
+            getter = lambda obj: (single(obj),)  # noqa: E731
+        formatters = tuple((index, self.fields[name][1]) for index, name in enumerate(names) if self.fields[name][1])
+
+        def dump(obj):
+            values = getter(obj)
+            if formatters:
+                values = list(values)
+                for index, formatter in formatters:
+                    values[index] = formatter(values[index])
+            return dict(zip(names, values))
+
+        self.dumpers[names] = dump
+        return dump
+
+    def dump(self, obj, names=None):
+        return self.dumper(names)(obj)
+
+    def dump_many(self, objs, names=None):
+        dump = self.dumper(names)
+        return [dump(obj) for obj in objs]
+
+
+device_serializer = Serializer({
+    'id': (Device.id, None),
+    'name': (Device.name, None),
+    'ip_address': (Device.ip_address, None),
+    'vendor': (Device.vendor, None),
+    'device_type': (Device.device_type, None),
+    'snmp_community': (Device.snmp_community, None),
+    'last_seen': (Device.last_seen, isoformat),
+    'status': (Device.status, None),
+    'meta': (Device.meta, None)
+})
+
+camera_serializer = Serializer({
+    'id': (Camera.id, None),
+    'name': (Camera.name, None),
+    'ip_address': (Camera.ip_address, None),
+    'rtsp_url': (Camera.rtsp_url, None),
+    'username': (Camera.username, None),
+    'location': (Camera.location, None),
+    'status': (Camera.status, None),
+    'last_snapshot': (Camera.last_snapshot, None)
+})
+
+alert_serializer = Serializer({
+    'id': (Alert.id, None),
+    'device_id': (Alert.device_id, None),
+    'severity': (Alert.severity, None),
+    'message': (Alert.message, None),
+    'created_at': (Alert.created_at, isoformat),
+    'acknowledged': (Alert.acknowledged, None),
+    'acknowledged_at': (Alert.acknowledged_at, isoformat),
+    'occurrences': (Alert.occurrences, None),
+    'last_seen_at': (Alert.last_seen_at, isoformat)
+})
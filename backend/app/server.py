@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+
+# Worker model of each profile: 'sync' serves one request per process, which
+# suits short CRUD requests; 'threaded' serves SERVER_THREADS requests per
+# process, so clients waiting on a long poll or a streamed export don't tie
+# up a whole worker each
+PROFILES = ('sync', 'threaded')
+
+
+def cpu_count():
+    """CPUs this process may run on (respects container and taskset limits)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_workers(profile, cpus=None):
+    """Worker processes for profile on a host with cpus CPUs"""
+    cpus = cpus or cpu_count()
+    if profile == 'sync':
+        # Workers block on the database and Redis, so run two per core
+        return cpus * 2 + 1
+    # Threads already overlap the waiting; one process per core uses every core
+    return cpus
+
+
+def gunicorn_settings(config, profile=None):
+    """Gunicorn settings for profile (default SERVER_PROFILE) from the SERVER_* config values"""
+    profile = profile or config['SERVER_PROFILE']
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown server profile '{profile}', expected one of {', '.join(PROFILES)}")
+
+    settings = {
+        'bind': config['SERVER_BIND'],
+        'workers': config['SERVER_WORKERS'] or default_workers(profile),
+        'worker_class': 'sync' if profile == 'sync' else 'gthread',
+        'threads': 1 if profile == 'sync' else config['SERVER_THREADS'],
+        # Create the app once in the master; workers fork from it
+        'preload_app': True,
+        # Must exceed the longest request: a 30 second task long poll
+        'timeout': config['SERVER_TIMEOUT_SECONDS'],
+        'graceful_timeout': config['SERVER_GRACEFUL_TIMEOUT_SECONDS'],
+        'keepalive': config['SERVER_KEEPALIVE_SECONDS'],
+        'max_requests': config['SERVER_MAX_REQUESTS'],
+        'max_requests_jitter': config['SERVER_MAX_REQUESTS_JITTER'],
+        'accesslog': '-',
+        'errorlog': '-',
+    }
+    if os.path.isdir('/dev/shm'):
+        # Worker heartbeats on a disk-backed /tmp can stall under Docker's overlay filesystem
+        settings['worker_tmp_dir'] = '/dev/shm'
+    return settings
+
+
+def post_fork(server, worker):
+    """Gunicorn hook: give the new worker its own database connections"""
+    from app.db_routing import dispose_pools
+    dispose_pools()
+    server.log.info(f"Worker {worker.pid} started with fresh database pools")
+
+
+def load_config():
+    from app.config import Config
+    return {name: getattr(Config, name) for name in dir(Config) if name.startswith('SERVER_')}
+
+
+def run(settings, init_db=False):
+    """Serve run:app with gunicorn using settings"""
+    # Import here: gunicorn needs fcntl and is not available on Windows (use serve.py there)
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for name, value in settings.items():
+                self.cfg.set(name, value)
+            self.cfg.set('post_fork', post_fork)
+
+        def load(self):
+            import run as entry_point
+            if init_db:
+                entry_point.init_database()
+            return entry_point.app
+
+    Server().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the API with gunicorn')
+    parser.add_argument('--profile', choices=PROFILES, help='worker model (default: SERVER_PROFILE)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: from the CPU count)')
+    parser.add_argument('--bind', help='address to listen on (default: SERVER_BIND)')
+    parser.add_argument('--init-db', action='store_true', help='create tables and the default admin before serving')
+    parser.add_argument('--print', action='store_true', help='print the settings and exit')
+    args = parser.parse_args()
+
+    config = load_config()
+    if args.workers:
+        config['SERVER_WORKERS'] = args.workers
+    if args.bind:
+        config['SERVER_BIND'] = args.bind
+    settings = gunicorn_settings(config, args.profile)
+    if args.print:
+        print(json.dumps(settings, indent=2))
+        return
+
+    run(settings, init_db=args.init_db)
+
+
+if __name__ == '__main__':
+    main()
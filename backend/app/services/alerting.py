@@ -1,13 +1,435 @@
 from celery import shared_task
+from celery.exceptions import Retry
 from app import db
-from app.models import Alert, Device
+from app.models import Alert, Device, NotificationOutbox, OPEN_ALERT_PREDICATE
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
 import smtplib
 import requests
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from app.cache import get_redis, report_redis_error
+import redis
+import json
 import os
+import queue
+import random
+import threading
+import time
+import uuid
+
+UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+# Transaction-scoped locks on a dedup key, for the fallback path
+DEDUP_KEY_LOCKS = {
+    'postgresql': 'SELECT pg_advisory_xact_lock(hashtext(:key))',
+}
+
+def make_dedup_key(source, source_id, condition):
+    """Build the dedup key identifying one condition on one device or camera"""
+    return f"{source}:{source_id}:{condition}"
+
+def raise_alert(severity, message, device_id=None, dedup_key=None):
+    """Open an alert, or count a repeat on the open alert with the same dedup key.
+
+    Runs in the caller's transaction and returns (alert_id, created).
+    """
+    now = datetime.utcnow()
+
+    if dedup_key is None:
+        alert = Alert(device_id=device_id, severity=severity, message=message,
+                      created_at=now, last_seen_at=now, acknowledged=False, occurrences=1)
+        db.session.add(alert)
+        db.session.flush()
+        return alert.id, True
+
+    from app.services.retention import is_partitioning_active
+
+    insert_fn = UPSERT_DIALECTS.get(db.engine.dialect.name)
+    # Unique indexes on a partitioned table must include the partition key,
+    # so the open-alert index can't back ON CONFLICT there
+    if insert_fn is not None and not is_partitioning_active():
+        stmt = insert_fn(Alert).values(
+            device_id=device_id,
+            severity=severity,
+            message=message,
+            dedup_key=dedup_key,
+            created_at=now,
+            last_seen_at=now,
+            acknowledged=False,
+            occurrences=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Alert.dedup_key],
+            index_where=OPEN_ALERT_PREDICATE,
+            set_={
+                'occurrences': Alert.occurrences + 1,
+                'last_seen_at': stmt.excluded.last_seen_at
+            }
+        ).returning(Alert.id, Alert.occurrences)
+        row = db.session.execute(stmt).one()
+        return row.id, row.occurrences == 1
+
+    # Fallback: lock the open alert row and update it, or insert a new one. FOR UPDATE
+    # locks nothing while no alert is open, and on a partitioned table no unique index
+    # stops a second insert, so concurrent callers first serialize on the key itself.
+    lock = DEDUP_KEY_LOCKS.get(db.engine.dialect.name)
+    if lock is not None:
+        db.session.execute(text(lock), {'key': dedup_key})
+    alert = db.session.execute(
+        select(Alert)
+        # Same predicate as the partial index, so the planner can use it
+        .where(Alert.dedup_key == dedup_key, OPEN_ALERT_PREDICATE)
+        .with_for_update()
+    ).scalars().first()
+    if alert:
+        alert.occurrences = Alert.occurrences + 1
+        alert.last_seen_at = now
+        db.session.flush()
+        return alert.id, False
+
+    alert = Alert(device_id=device_id, severity=severity, message=message, dedup_key=dedup_key,
+                  created_at=now, last_seen_at=now, acknowledged=False, occurrences=1)
+    db.session.add(alert)
+    db.session.flush()
+    return alert.id, True
+
+class PermanentDeliveryError(Exception):
+    """Delivery failed in a way retrying won't fix (bad request, rejected recipient)"""
+
+class CircuitBreaker:
+    """Stop calling a failing channel until a cool-down has passed.
+
+    Closed: calls go through. After failure_threshold consecutive failures
+    the breaker opens and calls fail fast. Once reset_timeout has passed a
+    single trial call is let through (half-open); success closes it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class RateLimit:
+    """Token bucket limiting sends per second on one channel"""
+
+    def __init__(self, rate_per_second, burst=None):
+        self.rate = float(rate_per_second)
+        self.capacity = float(burst or max(1, rate_per_second))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class EmailChannel:
+    """SMTP channel keeping a small pool of logged-in connections open between sends"""
+
+    name = 'email'
+
+    def __init__(self, host, port=587, username=None, password=None, use_tls=True,
+                 require_auth=True, pool_size=2, timeout=10, max_idle_seconds=60):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.require_auth = require_auth
+        self.timeout = timeout
+        self.max_idle_seconds = max_idle_seconds
+        self._pool = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    @property
+    def configured(self):
+        # An unauthenticated relay (or a local test sink) only needs a host
+        return bool(self.host and (self.username and self.password or not self.require_auth))
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def _checkout(self):
+        while True:
+            try:
+                server, last_used = self._pool.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            # Servers drop idle sessions; don't gamble on a stale one
+            if time.monotonic() - last_used < self.max_idle_seconds:
+                return server
+            self._quit(server)
+
+    def _quit(self, server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def send(self, msg):
+        with self._slots:
+            server = self._checkout()
+            try:
+                try:
+                    server.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    server = self._connect()
+                    server.send_message(msg)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                self._pool.put((server, time.monotonic()))
+                raise PermanentDeliveryError(str(e))
+            except Exception:
+                self._quit(server)
+                raise
+            self._pool.put((server, time.monotonic()))
+        return {'recipient': msg['To']}
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._pool.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(server)
+
+class SlackChannel:
+    """Slack webhook channel sending over a pooled keep-alive HTTP session"""
+
+    name = 'slack'
+
+    def __init__(self, webhook_url, pool_size=4, timeout=10):
+        self.webhook_url = webhook_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def configured(self):
+        return bool(self.webhook_url)
+
+    def send(self, payload):
+        response = self.session.post(self.webhook_url, json=payload, timeout=self.timeout)
+        if response.status_code == 200:
+            return {'webhook_url': self.webhook_url}
+        error = f'HTTP {response.status_code}: {response.text}'
+        # Rate limiting and server errors are worth retrying, other 4xx are not
+        if response.status_code == 429 or response.status_code >= 500:
+            raise IOError(error)
+        raise PermanentDeliveryError(error)
+
+    def close(self):
+        self.session.close()
+
+class NotificationDispatcher:
+    """Deliver notifications over persistent channel connections.
+
+    Each channel gets its own rate limit and circuit breaker. Failed sends
+    are retried with exponential backoff, within retry_budget_seconds so a
+    delivery finishes well inside the notification queue's soft time limit;
+    a channel whose breaker is open fails fast instead of tying the worker
+    up on timeouts. send() delivers in the calling thread, submit() on the
+    dispatcher's thread pool.
+    """
+
+    def __init__(self, channels, rate_limits=None, max_retries=3, backoff_seconds=1.0,
+                 backoff_max_seconds=30.0, retry_budget_seconds=60.0, failure_threshold=5,
+                 reset_timeout=60, max_workers=4):
+        rate_limits = rate_limits or {}
+        self.channels = {channel.name: channel for channel in channels}
+        self.limits = {name: RateLimit(rate_limits.get(name, 0)) for name in self.channels}
+        self.breakers = {name: CircuitBreaker(failure_threshold, reset_timeout) for name in self.channels}
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.retry_budget_seconds = retry_budget_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='notify')
+
+    def is_configured(self, name):
+        channel = self.channels.get(name)
+        return bool(channel and channel.configured)
+
+    def send(self, name, payload):
+        """Deliver a payload on a channel, retrying transient failures"""
+        channel = self.channels.get(name)
+        if not channel or not channel.configured:
+            return {'status': 'skipped', 'reason': f'{name} channel not configured'}
+
+        breaker = self.breakers[name]
+        deadline = time.monotonic() + self.retry_budget_seconds
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                return {'status': 'failed', 'error': f'{name} circuit open', 'circuit': breaker.state}
+
+            self.limits[name].acquire()
+            try:
+                result = channel.send(payload)
+                breaker.record_success()
+                return dict(result, status='sent', attempts=attempt + 1)
+            except PermanentDeliveryError as e:
+                # The channel answered, so it is up; this payload just can't be delivered
+                breaker.record_success()
+                error = str(e)
+                break
+            except Exception as e:
+                error = str(e)
+                breaker.record_failure()
+                if attempt < self.max_retries:
+                    delay = min(self.backoff_max_seconds, self.backoff_seconds * (2 ** attempt))
+                    delay *= random.uniform(0.5, 1.0)
+                    if time.monotonic() + delay > deadline:
+                        error = f'{error} (retry budget of {self.retry_budget_seconds:g}s spent)'
+                        break
+                    time.sleep(delay)
+
+        logging.error(f"Failed to deliver {name} notification: {error}")
+        return {'status': 'failed', 'error': error}
+
+    def submit(self, name, payload):
+        """Queue a delivery on the dispatcher's thread pool and return its future"""
+        return self.executor.submit(self.send, name, payload)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for channel in self.channels.values():
+            channel.close()
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def build_dispatcher(config):
+    """Create a dispatcher for the SMTP server and Slack webhook in the environment"""
+    email = EmailChannel(
+        host=os.environ.get('SMTP_SERVER', 'smtp.gmail.com'),
+        port=int(os.environ.get('SMTP_PORT', 587)),
+        username=os.environ.get('SMTP_USERNAME'),
+        password=os.environ.get('SMTP_PASSWORD'),
+        use_tls=os.environ.get('SMTP_USE_TLS', 'true').lower() == 'true',
+        require_auth=os.environ.get('SMTP_REQUIRE_AUTH', 'true').lower() == 'true',
+        pool_size=config.get('NOTIFY_SMTP_POOL_SIZE', 2)
+    )
+    slack = SlackChannel(os.environ.get('SLACK_WEBHOOK_URL'))
+    return NotificationDispatcher(
+        [email, slack],
+        rate_limits=config.get('NOTIFY_RATE_LIMITS', {}),
+        max_retries=config.get('NOTIFY_MAX_RETRIES', 3),
+        backoff_seconds=config.get('NOTIFY_RETRY_BACKOFF_SECONDS', 1.0),
+        retry_budget_seconds=config.get('NOTIFY_RETRY_BUDGET_SECONDS', 60.0),
+        failure_threshold=config.get('NOTIFY_CIRCUIT_FAILURE_THRESHOLD', 5),
+        reset_timeout=config.get('NOTIFY_CIRCUIT_RESET_SECONDS', 60),
+        max_workers=config.get('NOTIFY_DISPATCH_WORKERS', 4)
+    )
+
+def get_dispatcher():
+    """Return this process's notification dispatcher, creating it on first use"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = build_dispatcher(current_app.config)
+    return _dispatcher
+
+def set_dispatcher(dispatcher):
+    """Replace the process's dispatcher (e.g. with one pointed at local test servers)"""
+    global _dispatcher
+    previous, _dispatcher = _dispatcher, dispatcher
+    return previous
+
+def _reset_dispatcher_after_fork():
+    # Forked worker processes must not share the parent's sockets or threads
+    global _dispatcher, _dispatcher_lock
+    _dispatcher = None
+    _dispatcher_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_dispatcher_after_fork)
+
+def deliver(channel, payload):
+    """Deliver a payload on a channel through the process's dispatcher"""
+    return get_dispatcher().send(channel, payload)
+
+def build_alert_data(alert, device=None):
+    """Prepare the notification payload for an alert"""
+    return {
+        'id': alert.id,
+        'severity': alert.severity,
+        'message': alert.message,
+        'device_name': device.name if device else "System",
+        'device_ip': device.ip_address if device else "",
+        'created_at': alert.created_at.isoformat(),
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+def notify_alert(alert_data):
+    """Deliver an alert on every channel, or hold it for a channel's digest.
+
+    Channels are handled concurrently so a slow SMTP server doesn't delay Slack.
+    """
+    app = current_app._get_current_object()
+    futures = {
+        channel: get_dispatcher().executor.submit(_notify_channel_in_context, app, channel, alert_data)
+        for channel in NOTIFICATION_CHANNELS
+    }
+    return {channel: future.result() for channel, future in futures.items()}
 
 @shared_task(bind=True)
 def send_alert_notification(self, alert_id):
@@ -17,54 +439,141 @@ def send_alert_notification(self, alert_id):
         if not alert:
             return {'error': 'Alert not found'}
         
-        device_name = "System"
-        device_ip = ""
-        
-        if alert.device_id:
-            device = Device.query.get(alert.device_id)
-            if device:
-                device_name = device.name
-                device_ip = device.ip_address
-        
-        # Prepare alert data
-        alert_data = {
-            'id': alert.id,
-            'severity': alert.severity,
-            'message': alert.message,
-            'device_name': device_name,
-            'device_ip': device_ip,
-            'created_at': alert.created_at.isoformat(),
-            'timestamp': datetime.utcnow().isoformat()
-        }
+        device = Device.query.get(alert.device_id) if alert.device_id else None
+        return notify_alert(build_alert_data(alert, device))
         
-        results = {}
+    except Exception as e:
+        logging.error(f"Error sending alert notification {alert_id}: {str(e)}")
+        return {'error': str(e)}
+
+@shared_task(bind=True)
+def send_alert_notifications(self, alert_ids):
+    """Send notifications for a batch of alerts handed over by the outbox"""
+    try:
+        alerts = Alert.query.filter(Alert.id.in_(alert_ids)).order_by(Alert.id).all()
+        device_ids = {alert.device_id for alert in alerts if alert.device_id}
+        devices = {d.id: d for d in Device.query.filter(Device.id.in_(device_ids)).all()} if device_ids else {}
         
-        # Send email notification
-        email_result = send_email_alert(alert_data)
-        results['email'] = email_result
+        results = {}
+        for alert in alerts:
+            alert_data = build_alert_data(alert, devices.get(alert.device_id))
+            results[alert.id] = notify_alert(alert_data)
         
-        # Send Slack notification if configured
-        slack_result = send_slack_alert(alert_data)
-        results['slack'] = slack_result
+        missing = set(alert_ids) - set(results)
+        if missing:
+            logging.warning(f"Alerts no longer exist, notifications skipped: {sorted(missing)}")
         
-        return results
+        return {'sent': len(results), 'missing': len(missing)}
         
     except Exception as e:
-        logging.error(f"Error sending alert notification {alert_id}: {str(e)}")
+        logging.error(f"Error sending alert notifications for {alert_ids}: {str(e)}")
         return {'error': str(e)}
 
+def enqueue_notification(alert_id):
+    """Record a pending notification in the caller's transaction.
+
+    Written together with the alert, so the notification exists exactly when
+    the alert does; drain_notification_outbox hands it to the workers.
+    """
+    db.session.add(NotificationOutbox(alert_id=alert_id, status='pending', created_at=datetime.utcnow()))
+
+@shared_task(bind=True)
+def drain_notification_outbox(self):
+    """Hand pending outbox entries to the notification workers, one message per batch.
+
+    Entries are claimed and committed before their batch is published, so a
+    second drainer (or a failed commit) can never publish the same entries
+    again. A drainer that dies between claiming and publishing leaves its
+    claims behind; they go back to pending after NOTIFY_OUTBOX_CLAIM_TIMEOUT_SECONDS.
+    """
+    config = current_app.config
+    batch_size = config.get('NOTIFY_OUTBOX_BATCH_SIZE', 100)
+    max_batches = config.get('NOTIFY_OUTBOX_MAX_BATCHES', 10)
+    claim_timeout = config.get('NOTIFY_OUTBOX_CLAIM_TIMEOUT_SECONDS', 300)
+    dispatched = 0
+    claimed_ids = []
+    
+    try:
+        released = db.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.status == 'claimed',
+                   NotificationOutbox.dispatched_at < datetime.utcnow() - timedelta(seconds=claim_timeout))
+            .values(status='pending')
+        ).rowcount
+        db.session.commit()
+        if released:
+            logging.warning(f"Released {released} outbox entries claimed by a drainer that never published them")
+
+        for _ in range(max_batches):
+            # SKIP LOCKED lets several drainers claim batches side by side
+            entries = db.session.execute(
+                select(NotificationOutbox)
+                .where(NotificationOutbox.status == 'pending')
+                .order_by(NotificationOutbox.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not entries:
+                break
+            
+            now = datetime.utcnow()
+            for entry in entries:
+                entry.status = 'claimed'
+                entry.attempts += 1
+                entry.dispatched_at = now
+            claimed_ids = [entry.id for entry in entries]
+            alert_ids = sorted({entry.alert_id for entry in entries})
+            db.session.commit()
+            
+            send_alert_notifications.delay(alert_ids)
+            
+            db.session.execute(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.id.in_(claimed_ids))
+                .values(status='dispatched')
+            )
+            db.session.commit()
+            claimed_ids = []
+            dispatched += len(entries)
+        
+        return {'dispatched': dispatched}
+        
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error draining notification outbox: {str(e)}")
+        if claimed_ids:
+            # The batch was not published: hand it to the next run
+            try:
+                db.session.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id.in_(claimed_ids))
+                    .values(status='pending')
+                )
+                db.session.commit()
+            except Exception as release_error:
+                db.session.rollback()
+                logging.error(f"Could not release claimed outbox entries: {str(release_error)}")
+        return {'error': str(e), 'dispatched': dispatched}
+
+def publish_outbox_drain():
+    """Ask a worker to drain the outbox now instead of waiting for beat's next run.
+
+    Call after the transaction holding the outbox entries has committed. If
+    the broker can't take the message the entries stay pending for beat.
+    """
+    try:
+        drain_notification_outbox.delay()
+    except Exception as e:
+        logging.warning(f"Could not publish an outbox drain, leaving it to beat: {str(e)}")
+
 def send_email_alert(alert_data):
     """Send email alert notification"""
     try:
         # Email configuration from environment
-        smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-        smtp_port = int(os.environ.get('SMTP_PORT', 587))
-        smtp_username = os.environ.get('SMTP_USERNAME')
-        smtp_password = os.environ.get('SMTP_PASSWORD')
         email_from = os.environ.get('ALERT_EMAIL_FROM', 'alerts@example.com')
         email_to = os.environ.get('ALERT_EMAIL_TO', 'admin@example.com')
         
-        if not all([smtp_username, smtp_password]):
+        if not get_dispatcher().is_configured('email'):
             return {'status': 'skipped', 'reason': 'SMTP credentials not configured'}
         
         # Create email message
@@ -91,13 +600,7 @@ Please check the monitoring dashboard for more details.
         msg.attach(MIMEText(body, 'plain'))
         
         # Send email
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(smtp_username, smtp_password)
-        server.send_message(msg)
-        server.quit()
-        
-        return {'status': 'sent', 'recipient': email_to}
+        return deliver('email', msg)
         
     except Exception as e:
         logging.error(f"Failed to send email alert: {str(e)}")
@@ -106,9 +609,7 @@ Please check the monitoring dashboard for more details.
 def send_slack_alert(alert_data):
     """Send Slack alert notification"""
     try:
-        slack_webhook_url = os.environ.get('SLACK_WEBHOOK_URL')
-        
-        if not slack_webhook_url:
+        if not get_dispatcher().is_configured('slack'):
             return {'status': 'skipped', 'reason': 'Slack webhook URL not configured'}
         
         # Determine color based on severity
@@ -160,62 +661,253 @@ def send_slack_alert(alert_data):
         }
         
         # Send to Slack
-        response = requests.post(
-            slack_webhook_url,
-            json=slack_message,
-            timeout=10
+        return deliver('slack', slack_message)
+            
+    except Exception as e:
+        logging.error(f"Failed to send Slack alert: {str(e)}")
+        return {'status': 'failed', 'error': str(e)}
+
+NOTIFICATION_CHANNELS = ('email', 'slack')
+
+SEVERITY_ORDER = ['critical', 'high', 'medium', 'low', 'info']
+
+def is_channel_configured(channel):
+    """Whether a notification channel has the settings it needs to deliver"""
+    return get_dispatcher().is_configured(channel)
+
+def send_channel_alert(channel, alert_data):
+    """Send a single alert on one channel"""
+    if channel == 'email':
+        return send_email_alert(alert_data)
+    return send_slack_alert(alert_data)
+
+def send_channel_digest(channel, alerts):
+    """Send several alerts on one channel as a single digest message"""
+    if len(alerts) == 1:
+        return send_channel_alert(channel, alerts[0])
+    if channel == 'email':
+        return send_email_digest(alerts)
+    return send_slack_digest(alerts)
+
+def _notify_channel_in_context(app, channel, alert_data):
+    with app.app_context():
+        return notify_channel(channel, alert_data)
+
+def notify_channel(channel, alert_data):
+    """Deliver an alert on a channel now, or queue it for the channel's next digest.
+
+    The first alert on a quiet channel goes out immediately and opens the
+    coalescing window; alerts arriving while the window is open, or while
+    the channel is above its burst threshold, are merged into one digest
+    sent when the window closes. Immediate severities always bypass it.
+    """
+    config = current_app.config
+    if not is_channel_configured(channel) or alert_data['severity'] in config.get('NOTIFY_IMMEDIATE_SEVERITIES', ()):
+        return send_channel_alert(channel, alert_data)
+
+    client = get_redis()
+    if client is None:
+        return send_channel_alert(channel, alert_data)
+
+    window = config.get('NOTIFY_COALESCE_SECONDS', {}).get(channel, 0)
+    burst_window = config.get('NOTIFY_BURST_WINDOW_SECONDS', 60)
+    burst_threshold = config.get('NOTIFY_BURST_THRESHOLD', 10)
+    window_key = f"notify:window:{channel}"
+    pending_key = f"notify:pending:{channel}"
+    burst_key = f"notify:burst:{channel}"
+
+    try:
+        burst_count = client.incr(burst_key)
+        if burst_count == 1:
+            client.expire(burst_key, burst_window)
+        in_burst = burst_count > burst_threshold
+
+        if window <= 0 and not in_burst:
+            return send_channel_alert(channel, alert_data)
+
+        hold = window if window > 0 else burst_window
+        # The token ties the flush to this window; the key outlives the countdown
+        # so a delayed flush can't let a second window open underneath it
+        token = uuid.uuid4().hex
+        opened = client.set(window_key, token, nx=True, ex=hold * DIGEST_WINDOW_TTL_FACTOR)
+        if opened:
+            flush_notification_digest.apply_async(args=[channel, token], countdown=hold)
+            if not in_burst:
+                return send_channel_alert(channel, alert_data)
+
+        client.rpush(pending_key, json.dumps(alert_data))
+        return {'status': 'queued', 'channel': channel, 'window_seconds': hold}
+
+    except redis.RedisError as e:
+        report_redis_error(e)
+        return send_channel_alert(channel, alert_data)
+
+# Close the window if it is still the one the flush was scheduled for, and move
+# its pending alerts aside; they are only deleted once the digest is delivered.
+# A late flush for an older window leaves a newer window's alerts alone.
+CLAIM_DIGEST_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    if redis.call('EXISTS', KEYS[2]) == 1 then
+        redis.call('RENAME', KEYS[2], KEYS[3])
+        redis.call('EXPIRE', KEYS[3], ARGV[2])
+    end
+end
+return redis.call('LRANGE', KEYS[3], 0, -1)
+"""
+
+DIGEST_WINDOW_TTL_FACTOR = 2
+DIGEST_CLAIM_TTL_SECONDS = 86400
+
+@shared_task(bind=True, max_retries=5)
+def flush_notification_digest(self, channel, token=None):
+    """Send the alerts held during a channel's coalescing window as one digest"""
+    try:
+        client = get_redis()
+        if client is None:
+            return {'status': 'skipped', 'reason': 'Redis unavailable'}
+
+        pending_key = f"notify:pending:{channel}"
+        claimed_key = f"notify:sending:{channel}:{token}"
+        pending = client.register_script(CLAIM_DIGEST_SCRIPT)(
+            keys=[f"notify:window:{channel}", pending_key, claimed_key],
+            args=[token, DIGEST_CLAIM_TTL_SECONDS]
         )
+
+        if not pending:
+            return {'status': 'empty', 'channel': channel}
+
+        alerts = [json.loads(item) for item in pending]
+        result = send_channel_digest(channel, alerts)
+        result['alerts'] = len(alerts)
+        if result.get('status') != 'failed':
+            client.delete(claimed_key)
+            return result
+
+        if self.request.retries < self.max_retries:
+            # The claimed alerts wait under the token for the retry
+            raise self.retry(countdown=current_app.config.get('NOTIFY_COALESCE_SECONDS', {}).get(channel) or 60)
+
+        # Out of retries: hand the alerts to the channel's next digest
+        pipe = client.pipeline(transaction=True)
+        pipe.lpush(pending_key, *reversed(pending))
+        pipe.delete(claimed_key)
+        pipe.execute()
+        result['requeued'] = len(alerts)
+        return result
+
+    except Retry:
+        raise
+    except Exception as e:
+        logging.error(f"Error flushing {channel} notification digest: {str(e)}")
+        return {'error': str(e)}
+
+def group_alerts_for_digest(alerts):
+    """Group alerts by severity (most severe first), then by device"""
+    groups = {}
+    for alert_data in alerts:
+        severity = alert_data.get('severity') or 'info'
+        device = alert_data.get('device_name') or 'System'
+        groups.setdefault(severity, {}).setdefault(device, []).append(alert_data)
+
+    rank = {severity: i for i, severity in enumerate(SEVERITY_ORDER)}
+    return sorted(groups.items(), key=lambda item: rank.get(item[0], len(rank)))
+
+def send_email_digest(alerts):
+    """Send several alerts as one digest email"""
+    try:
+        email_from = os.environ.get('ALERT_EMAIL_FROM', 'alerts@example.com')
+        email_to = os.environ.get('ALERT_EMAIL_TO', 'admin@example.com')
         
-        if response.status_code == 200:
-            return {'status': 'sent', 'webhook_url': slack_webhook_url}
-        else:
-            return {
-                'status': 'failed',
-                'error': f'HTTP {response.status_code}: {response.text}'
-            }
+        if not get_dispatcher().is_configured('email'):
+            return {'status': 'skipped', 'reason': 'SMTP credentials not configured'}
+        
+        groups = group_alerts_for_digest(alerts)
+        counts = ", ".join(
+            f"{sum(len(items) for items in devices.values())} {severity}" for severity, devices in groups
+        )
+        
+        msg = MIMEMultipart()
+        msg['From'] = email_from
+        msg['To'] = email_to
+        msg['Subject'] = f"[{groups[0][0].upper()}] {len(alerts)} Device Alerts ({counts})"
+        
+        body = f"""
+Device Monitoring Alert Digest
+
+{len(alerts)} alerts were raised:
+"""
+        for severity, devices in groups:
+            body += f"\n{severity.upper()}:\n"
+            for device_name, items in sorted(devices.items()):
+                body += f"  {device_name}\n"
+                for alert_data in items:
+                    body += f"    - {alert_data['created_at']}: {alert_data['message']} (Alert ID: {alert_data['id']})\n"
+        
+        body += "\nPlease check the monitoring dashboard for more details."
+        
+        msg.attach(MIMEText(body, 'plain'))
+        
+        return deliver('email', msg)
+        
+    except Exception as e:
+        logging.error(f"Failed to send email digest: {str(e)}")
+        return {'status': 'failed', 'error': str(e)}
+
+def send_slack_digest(alerts):
+    """Send several alerts as one Slack digest message"""
+    try:
+        if not get_dispatcher().is_configured('slack'):
+            return {'status': 'skipped', 'reason': 'Slack webhook URL not configured'}
+        
+        color_map = {
+            'critical': '#FF0000',
+            'high': '#FFA500',
+            'medium': '#FFFF00',
+            'low': '#00FF00',
+            'info': '#0000FF'
+        }
+        
+        attachments = []
+        for severity, devices in group_alerts_for_digest(alerts):
+            fields = []
+            for device_name, items in sorted(devices.items()):
+                fields.append({
+                    'title': f"{device_name} ({len(items)})",
+                    'value': "\n".join(alert_data['message'] for alert_data in items[:10]) +
+                             (f"\n...and {len(items) - 10} more" if len(items) > 10 else ''),
+                    'short': False
+                })
+            attachments.append({
+                'color': color_map.get(severity, '#808080'),
+                'title': f"{severity.upper()}: {sum(len(items) for items in devices.values())} alerts",
+                'fields': fields,
+                'footer': 'Device Monitoring System',
+                'ts': int(datetime.utcnow().timestamp())
+            })
+        
+        slack_message = {
+            'username': 'Device Monitor',
+            'icon_emoji': ':warning:',
+            'text': f"{len(alerts)} device alerts",
+            'attachments': attachments
+        }
+        
+        return deliver('slack', slack_message)
             
     except Exception as e:
-        logging.error(f"Failed to send Slack alert: {str(e)}")
+        logging.error(f"Failed to send Slack digest: {str(e)}")
         return {'status': 'failed', 'error': str(e)}
 
 @shared_task(bind=True)
 def send_daily_summary(self):
     """Send daily summary of alerts and device status"""
     try:
-        from datetime import datetime, timedelta
-        from sqlalchemy import func
-        
-        # Get yesterday's date
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        
-        # Get alert counts for yesterday
-        alert_counts = db.session.query(
-            Alert.severity,
-            func.count(Alert.id)
-        ).filter(
-            Alert.created_at >= yesterday.replace(hour=0, minute=0, second=0),
-            Alert.created_at < datetime.utcnow().replace(hour=0, minute=0, second=0)
-        ).group_by(Alert.severity).all()
-        
-        # Get device status counts
-        from app.models import Device, Camera
-        device_status = db.session.query(
-            Device.status,
-            func.count(Device.id)
-        ).group_by(Device.status).all()
-        
-        camera_status = db.session.query(
-            Camera.status,
-            func.count(Camera.id)
-        ).group_by(Camera.status).all()
-        
-        # Prepare summary data
-        summary_data = {
-            'date': yesterday.strftime('%Y-%m-%d'),
-            'alerts': dict(alert_counts),
-            'devices': dict(device_status),
-            'cameras': dict(camera_status)
-        }
+        from app.services.reporting import get_daily_summary_data
+        
+        # Read yesterday's rollup instead of rescanning the alert table
+        yesterday = datetime.utcnow().date() - timedelta(days=1)
+        summary_data = get_daily_summary_data(yesterday)
         
         # Send summary notifications
         results = {}
@@ -231,14 +923,10 @@ def send_daily_summary(self):
 def send_email_summary(summary_data):
     """Send daily summary via email"""
     try:
-        smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-        smtp_port = int(os.environ.get('SMTP_PORT', 587))
-        smtp_username = os.environ.get('SMTP_USERNAME')
-        smtp_password = os.environ.get('SMTP_PASSWORD')
         email_from = os.environ.get('ALERT_EMAIL_FROM', 'alerts@example.com')
         email_to = os.environ.get('ALERT_EMAIL_TO', 'admin@example.com')
         
-        if not all([smtp_username, smtp_password]):
+        if not get_dispatcher().is_configured('email'):
             return {'status': 'skipped', 'reason': 'SMTP credentials not configured'}
         
         msg = MIMEMultipart()
@@ -268,13 +956,7 @@ ALERTS SUMMARY:
         
         msg.attach(MIMEText(body, 'plain'))
         
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(smtp_username, smtp_password)
-        server.send_message(msg)
-        server.quit()
-        
-        return {'status': 'sent', 'recipient': email_to}
+        return deliver('email', msg)
         
     except Exception as e:
         logging.error(f"Failed to send email summary: {str(e)}")
@@ -283,9 +965,7 @@ ALERTS SUMMARY:
 def send_slack_summary(summary_data):
     """Send daily summary to Slack"""
     try:
-        slack_webhook_url = os.environ.get('SLACK_WEBHOOK_URL')
-        
-        if not slack_webhook_url:
+        if not get_dispatcher().is_configured('slack'):
             return {'status': 'skipped', 'reason': 'Slack webhook URL not configured'}
         
         # Create summary fields
@@ -330,15 +1010,7 @@ def send_slack_summary(summary_data):
             ]
         }
         
-        response = requests.post(slack_webhook_url, json=slack_message, timeout=10)
-        
-        if response.status_code == 200:
-            return {'status': 'sent', 'webhook_url': slack_webhook_url}
-        else:
-            return {
-                'status': 'failed',
-                'error': f'HTTP {response.status_code}: {response.text}'
-            }
+        return deliver('slack', slack_message)
             
     except Exception as e:
         logging.error(f"Failed to send Slack summary: {str(e)}")
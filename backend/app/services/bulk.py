@@ -0,0 +1,281 @@
+from flask import current_app
+from app import db
+from app.models import Device, Alert
+from app.utils import validate_ip_address
+from sqlalchemy import select, insert, update, delete, and_, true
+import csv
+import json
+
+# Rows validated, duplicate-checked and inserted together
+IMPORT_CHUNK_SIZE = 500
+# Per-row errors kept in the import report
+MAX_IMPORT_ERRORS = 1000
+
+# String columns checked against their length before inserting
+STRING_FIELDS = ('name', 'vendor', 'device_type', 'snmp_community')
+
+BULK_ACTIONS = ('poll', 'update', 'delete')
+# Fields a bulk update may set; name and IP address are unique per device
+BULK_UPDATE_FIELDS = ('vendor', 'device_type', 'snmp_community', 'meta')
+BULK_FILTERS = {
+    'status': Device.status,
+    'vendor': Device.vendor,
+    'type': Device.device_type
+}
+MAX_BULK_IDS = 10000
+
+
+def _decode_lines(stream, bad_lines):
+    """Decode a binary stream line by line, blanking (and recording) lines that aren't UTF-8"""
+    for number, line in enumerate(stream, start=1):
+        try:
+            yield line.decode('utf-8-sig' if number == 1 else 'utf-8')
+        except UnicodeDecodeError:
+            bad_lines.append(number)
+            yield '\n'
+
+
+def read_import_rows(stream, fmt):
+    """Yield (line_number, row dict or error message) from a CSV or NDJSON stream
+
+    Lines that aren't UTF-8 and malformed CSV records are reported as errors
+    on their line and skipped, so one bad line doesn't abort the import.
+    """
+    bad_lines = []
+    lines = _decode_lines(stream, bad_lines)
+    not_utf8 = 'Not valid UTF-8 text'
+
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        while True:
+            try:
+                row = next(reader)
+                error = None
+            except StopIteration:
+                break
+            except csv.Error as e:
+                row, error = None, f'Malformed CSV: {e}'
+            # A CSV record is reported by the line it ends on (DictReader's own
+            # line_num isn't updated when a record fails to parse)
+            number = reader.reader.line_num
+            while bad_lines:
+                yield bad_lines.pop(0), not_utf8
+            if error:
+                yield number, error
+                continue
+            if row.get('meta'):
+                try:
+                    row['meta'] = json.loads(row['meta'])
+                except ValueError:
+                    yield number, 'meta is not valid JSON'
+                    continue
+            yield number, row
+        while bad_lines:
+            yield bad_lines.pop(0), not_utf8
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if bad_lines:
+            yield bad_lines.pop(0), not_utf8
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, 'Invalid JSON'
+            continue
+        yield number, row if isinstance(row, dict) else 'Expected a JSON object'
+
+
+def validate_import_row(row):
+    """Return the device values for an import row, or an error message"""
+    name = str(row.get('name') or '').strip()
+    ip_address = str(row.get('ip_address') or '').strip()
+
+    if not name or not ip_address:
+        return 'Name and IP address required'
+    if not validate_ip_address(ip_address):
+        return 'Invalid IP address'
+
+    meta = row.get('meta') or {}
+    if not isinstance(meta, dict):
+        return 'meta must be an object'
+
+    for field in STRING_FIELDS:
+        value = row.get(field)
+        if value is not None and not isinstance(value, str):
+            return f'{field} must be a string'
+        if value and len(value.strip() if field == 'name' else value) > Device.__table__.c[field].type.length:
+            return f'{field} is too long'
+
+    return {
+        'name': name,
+        'ip_address': ip_address,
+        'vendor': row.get('vendor') or '',
+        'device_type': row.get('device_type') or '',
+        'snmp_community': row.get('snmp_community') or 'public',
+        'meta': meta,
+        'status': 'unknown'
+    }
+
+
+def _import_chunk(chunk, seen_ips, report):
+    """Insert the valid rows of chunk that don't duplicate an existing device"""
+    ips = [values['ip_address'] for _, values in chunk]
+    existing = set(db.session.execute(
+        select(Device.ip_address).where(Device.ip_address.in_(ips))
+    ).scalars())
+
+    devices = []
+    for number, values in chunk:
+        ip_address = values['ip_address']
+        if ip_address in existing:
+            _add_error(report, number, 'Device with this IP already exists', ip_address)
+        elif ip_address in seen_ips:
+            _add_error(report, number, 'Duplicate IP address in import', ip_address)
+        else:
+            seen_ips.add(ip_address)
+            devices.append(values)
+
+    if devices:
+        db.session.execute(insert(Device), devices)
+        db.session.commit()
+        report['imported'] += len(devices)
+
+
+def _add_error(report, number, message, ip_address=None):
+    report['failed'] += 1
+    if len(report['errors']) < MAX_IMPORT_ERRORS:
+        report['errors'].append({'row': number, 'ip_address': ip_address, 'error': message})
+    else:
+        report['errors_truncated'] = True
+
+
+def import_devices(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Import devices from (row_number, row) pairs; returns a per-row error report
+
+    Each chunk is committed on its own, so rows imported before a failure stay.
+    """
+    report = {'imported': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+    seen_ips = set()
+    chunk = []
+
+    for number, row in rows:
+        values = row if isinstance(row, str) else validate_import_row(row)
+        if isinstance(values, str):
+            ip_address = row.get('ip_address') if isinstance(row, dict) else None
+            _add_error(report, number, values, ip_address)
+            continue
+
+        chunk.append((number, values))
+        if len(chunk) >= chunk_size:
+            _import_chunk(chunk, seen_ips, report)
+            chunk = []
+
+    if chunk:
+        _import_chunk(chunk, seen_ips, report)
+
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
+
+
+def get_bulk_selection(data):
+    """Where clause for the devices chosen by an ids list or a filter object"""
+    ids = data.get('ids')
+    filters = data.get('filter')
+
+    if ids is not None:
+        # bool is an int subclass: true/false must not select devices 1 and 0
+        if not isinstance(ids, list) or not ids or not all(type(i) is int for i in ids):
+            raise ValueError('ids must be a non-empty list of device IDs')
+        if len(ids) > MAX_BULK_IDS:
+            raise ValueError(f'At most {MAX_BULK_IDS} ids per request; use a filter instead')
+        return Device.id.in_(set(ids))
+
+    if isinstance(filters, dict):
+        unknown = [key for key in filters if key not in BULK_FILTERS]
+        if unknown:
+            raise ValueError(f"Unknown filters: {', '.join(unknown)}")
+        # An empty filter selects every device
+        clauses = []
+        for key, value in filters.items():
+            values = value if isinstance(value, list) else [value]
+            clauses.append(BULK_FILTERS[key].in_(values))
+        return and_(true(), *clauses)
+
+    raise ValueError('Provide either ids or filter')
+
+
+def validate_bulk_values(values):
+    """Check the fields of a bulk update and return them"""
+    if not isinstance(values, dict) or not values:
+        raise ValueError('values must be a non-empty object')
+
+    unknown = [key for key in values if key not in BULK_UPDATE_FIELDS]
+    if unknown:
+        raise ValueError(f"Fields cannot be bulk updated: {', '.join(unknown)}")
+
+    for field, value in values.items():
+        if field == 'meta':
+            if not isinstance(value, dict):
+                raise ValueError('meta must be an object')
+        elif not isinstance(value, str):
+            raise ValueError(f'{field} must be a string')
+        elif len(value) > Device.__table__.c[field].type.length:
+            raise ValueError(f'{field} is too long')
+    return values
+
+
+def bulk_update_devices(selection, values):
+    """Apply values to every selected device in one UPDATE"""
+    result = db.session.execute(
+        update(Device).where(selection).values(**values).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def bulk_delete_devices(selection):
+    """Delete every selected device; their alerts are kept without a device"""
+    selected_ids = select(Device.id).where(selection)
+    db.session.execute(
+        update(Alert).where(Alert.device_id.in_(selected_ids)).values(device_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    result = db.session.execute(
+        delete(Device).where(selection).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def enqueue_bulk_poll(device_ids):
+    """Queue polls for device_ids as one chunked Celery group; returns the group id"""
+    from app import get_celery_app
+    from app.services.poller import poll_device_task
+
+    get_celery_app()
+    chunk_size = current_app.config.get('DEVICE_BULK_POLL_CHUNK_SIZE', 20)
+    job = poll_device_task.chunks([(device_id,) for device_id in device_ids], chunk_size).group()
+    result = job.apply_async()
+    # Saved in the result backend so the job can be looked up by its id
+    result.save()
+    return result.id
+
+
+def start_background_poll(device_ids):
+    """Queue polls on the bounded fallback executor when Celery is unavailable
+
+    Returns (queued, rejected); polls beyond the executor's queue limit are rejected.
+    """
+    from app.services.probes import submit_device_poll, ProbeQueueFull
+
+    queued = 0
+    for device_id in device_ids:
+        try:
+            submit_device_poll(device_id)
+            queued += 1
+        except ProbeQueueFull:
+            break
+    return queued, len(device_ids) - queued
@@ -1,6 +1,8 @@
 from celery import shared_task
 from app import db
 from app.models import Device, Camera, Alert
+from app.services.alerting import raise_alert, make_dedup_key, enqueue_notification, publish_outbox_drain
+from app.sqlite_tuning import run_write
 from datetime import datetime
 import subprocess
 import socket
@@ -34,7 +36,11 @@ def poll_all_devices(self):
 @shared_task(bind=True)
 def poll_device_task(self, device_id):
     """Async task to poll a specific device"""
-    return poll_device_sync(device_id)
+    result = poll_device_sync(device_id)
+    if result.get('notification_queued'):
+        # The alert and its outbox entry are committed; don't wait for beat to send it
+        publish_outbox_drain()
+    return result
 
 def poll_device_sync(device_id):
     """Synchronous device polling function"""
@@ -46,52 +52,58 @@ def poll_device_sync(device_id):
         # Test connectivity using ping
         is_online = ping_host(device.ip_address)
         
-        old_status = device.status
-        device.status = 'online' if is_online else 'offline'
-        device.last_seen = datetime.utcnow() if is_online else device.last_seen
-        
-        # Create alert if status changed to offline
-        if old_status == 'online' and device.status == 'offline':
-            alert = Alert(
-                device_id=device.id,
-                severity='high',
-                message=f'Device {device.name} ({device.ip_address}) went offline',
-                created_at=datetime.utcnow(),
-                acknowledged=False
-            )
-            db.session.add(alert)
-            
-            # Send notification for high severity alert
-            from app.services.alerting import send_alert_notification
-            send_alert_notification.delay(alert.id)
-        
-        # Create alert if device comes back online
-        elif old_status == 'offline' and device.status == 'online':
-            alert = Alert(
-                device_id=device.id,
-                severity='info',
-                message=f'Device {device.name} ({device.ip_address}) is back online',
-                created_at=datetime.utcnow(),
-                acknowledged=False
-            )
-            db.session.add(alert)
-        
-        db.session.commit()
-        
-        return {
-            'device_id': device.id,
-            'device_name': device.name,
-            'ip_address': device.ip_address,
-            'status': device.status,
-            'last_seen': device.last_seen.isoformat() if device.last_seen else None,
-            'status_changed': old_status != device.status
-        }
+        # Written through the single-writer queue on SQLite
+        return run_write(record_device_status, device_id, is_online)
         
     except Exception as e:
         db.session.rollback()
         logging.error(f"Error polling device {device_id}: {str(e)}")
         return {'error': str(e), 'device_id': device_id}
 
+def record_device_status(device_id, is_online):
+    """Store a poll result and raise status-change alerts, in the caller's transaction"""
+    device = Device.query.get(device_id)
+    if not device:
+        return {'error': 'Device not found'}
+    
+    old_status = device.status
+    device.status = 'online' if is_online else 'offline'
+    device.last_seen = datetime.utcnow() if is_online else device.last_seen
+    notification_queued = False
+    
+    # Create alert if status changed to offline; repeats bump the open alert
+    if old_status == 'online' and device.status == 'offline':
+        alert_id, created = raise_alert(
+            'high',
+            f'Device {device.name} ({device.ip_address}) went offline',
+            device_id=device.id,
+            dedup_key=make_dedup_key('device', device.id, 'offline')
+        )
+        
+        # Queue notification for a new alert; committed together with it
+        if created:
+            enqueue_notification(alert_id)
+            notification_queued = True
+    
+    # Create alert if device comes back online
+    elif old_status == 'offline' and device.status == 'online':
+        raise_alert(
+            'info',
+            f'Device {device.name} ({device.ip_address}) is back online',
+            device_id=device.id,
+            dedup_key=make_dedup_key('device', device.id, 'online')
+        )
+    
+    return {
+        'device_id': device.id,
+        'device_name': device.name,
+        'ip_address': device.ip_address,
+        'status': device.status,
+        'last_seen': device.last_seen.isoformat() if device.last_seen else None,
+        'status_changed': old_status != device.status,
+        'notification_queued': notification_queued
+    }
+
 @shared_task(bind=True)
 def poll_all_cameras(self):
     """Poll all cameras for status updates"""
@@ -124,55 +136,54 @@ def test_camera_sync(camera_id):
         if not camera:
             return {'error': 'Camera not found'}
         
-        old_status = camera.status
-        
         # Test basic connectivity first
         is_reachable = ping_host(camera.ip_address)
         
-        if is_reachable:
-            # Test RTSP stream if reachable
-            is_stream_available = test_rtsp_stream(camera.rtsp_url)
-            camera.status = 'online' if is_stream_available else 'offline'
-        else:
-            camera.status = 'offline'
-        
-        # Create alert if camera status changed to offline
-        if old_status == 'online' and camera.status == 'offline':
-            alert = Alert(
-                device_id=None,  # Cameras don't have device_id in our current model
-                severity='medium',
-                message=f'Camera {camera.name} ({camera.ip_address}) went offline',
-                created_at=datetime.utcnow(),
-                acknowledged=False
-            )
-            db.session.add(alert)
-        
-        # Create alert if camera comes back online
-        elif old_status == 'offline' and camera.status == 'online':
-            alert = Alert(
-                device_id=None,
-                severity='info',
-                message=f'Camera {camera.name} ({camera.ip_address}) is back online',
-                created_at=datetime.utcnow(),
-                acknowledged=False
-            )
-            db.session.add(alert)
-        
-        db.session.commit()
+        # Test RTSP stream if reachable
+        is_online = is_reachable and test_rtsp_stream(camera.rtsp_url)
         
-        return {
-            'camera_id': camera.id,
-            'camera_name': camera.name,
-            'ip_address': camera.ip_address,
-            'status': camera.status,
-            'status_changed': old_status != camera.status
-        }
+        # Written through the single-writer queue on SQLite
+        return run_write(record_camera_status, camera_id, is_online)
         
     except Exception as e:
         db.session.rollback()
         logging.error(f"Error testing camera {camera_id}: {str(e)}")
         return {'error': str(e), 'camera_id': camera_id}
 
+def record_camera_status(camera_id, is_online):
+    """Store a camera test result and raise status-change alerts, in the caller's transaction"""
+    camera = Camera.query.get(camera_id)
+    if not camera:
+        return {'error': 'Camera not found'}
+    
+    old_status = camera.status
+    camera.status = 'online' if is_online else 'offline'
+    
+    # Create alert if camera status changed to offline
+    # Cameras don't have device_id in our current model
+    if old_status == 'online' and camera.status == 'offline':
+        raise_alert(
+            'medium',
+            f'Camera {camera.name} ({camera.ip_address}) went offline',
+            dedup_key=make_dedup_key('camera', camera.id, 'offline')
+        )
+    
+    # Create alert if camera comes back online
+    elif old_status == 'offline' and camera.status == 'online':
+        raise_alert(
+            'info',
+            f'Camera {camera.name} ({camera.ip_address}) is back online',
+            dedup_key=make_dedup_key('camera', camera.id, 'online')
+        )
+    
+    return {
+        'camera_id': camera.id,
+        'camera_name': camera.name,
+        'ip_address': camera.ip_address,
+        'status': camera.status,
+        'status_changed': old_status != camera.status
+    }
+
 def ping_host(ip_address, timeout=5):
     """Ping a host to check connectivity"""
     try:
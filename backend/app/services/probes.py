@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+import logging
+import os
+import threading
+import time
+
+
+class ProbeQueueFull(Exception):
+    """The fallback executor already has as many probes queued as it allows"""
+
+
+class ProbeExecutor:
+    """Bounded thread pool for polls and camera tests run when Celery is unavailable
+
+    Probes are keyed (e.g. ('device', 12)): a probe submitted while the same
+    key is queued or running shares that run, and a result younger than
+    fresh_seconds is returned without probing again.
+    """
+
+    def __init__(self, app, workers=4, max_queue=100, fresh_seconds=30):
+        self.app = app
+        self.max_queue = max_queue
+        self.fresh_seconds = fresh_seconds
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='probe')
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.recent = {}  # key -> (finished_at, result)
+
+    def get_fresh(self, key):
+        with self.lock:
+            entry = self.recent.get(key)
+        if entry and time.monotonic() - entry[0] < self.fresh_seconds:
+            return entry[1]
+        return None
+
+    def submit(self, key, fn, *args):
+        """Queue fn(*args) for key; returns (status, future or fresh result)
+
+        status is 'fresh', 'in_flight' or 'queued'. Raises ProbeQueueFull when
+        max_queue probes are already waiting or running.
+        """
+        fresh = self.get_fresh(key)
+        if fresh is not None:
+            return 'fresh', fresh
+
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None:
+                return 'in_flight', future
+            if len(self.in_flight) >= self.max_queue:
+                raise ProbeQueueFull(f'{len(self.in_flight)} probes already queued')
+
+            future = self.executor.submit(self._run, key, fn, *args)
+            self.in_flight[key] = future
+            return 'queued', future
+
+    def _run(self, key, fn, *args):
+        try:
+            with self.app.app_context():
+                result = fn(*args)
+            with self.lock:
+                self.recent[key] = (time.monotonic(), result)
+                self._prune_recent()
+            return result
+        except Exception as e:
+            logging.getLogger('app').exception(f"Background probe {key} failed: {e}")
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+    def _prune_recent(self):
+        cutoff = time.monotonic() - self.fresh_seconds
+        for key in [key for key, (finished_at, _) in self.recent.items() if finished_at < cutoff]:
+            del self.recent[key]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_probe_executor():
+    """Return this process's fallback probe executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                config = current_app.config
+                _executor = ProbeExecutor(
+                    current_app._get_current_object(),
+                    workers=config.get('PROBE_EXECUTOR_WORKERS', 4),
+                    max_queue=config.get('PROBE_EXECUTOR_MAX_QUEUE', 100),
+                    fresh_seconds=config.get('PROBE_RESULT_FRESH_SECONDS', 30)
+                )
+    return _executor
+
+
+def _reset_executor_after_fork():
+    # Forked worker processes must not share the parent's threads
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_executor_after_fork)
+
+
+def submit_device_poll(device_id):
+    from app.services.poller import poll_device_sync
+    return get_probe_executor().submit(('device', device_id), poll_device_sync, device_id)
+
+
+def submit_camera_test(camera_id):
+    from app.services.poller import test_camera_sync
+    return get_probe_executor().submit(('camera', camera_id), test_camera_sync, camera_id)
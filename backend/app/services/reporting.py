@@ -0,0 +1,222 @@
+from celery import shared_task
+from flask import current_app
+from app import db
+from app.models import Alert, Device, Camera, AlertDailyRollup, StatusSnapshot
+from app.services.retention import get_retention_cutoffs
+from sqlalchemy import select, insert, delete, func, literal
+from datetime import datetime, timedelta
+import logging
+
+
+def _day_bounds(day):
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1)
+
+
+def build_alert_rollup(day):
+    """Recompute the alert counts per severity and device for one day"""
+    start, end = _day_bounds(day)
+    db.session.execute(delete(AlertDailyRollup).where(AlertDailyRollup.day == day))
+    db.session.execute(
+        insert(AlertDailyRollup).from_select(
+            ['day', 'severity', 'device_id', 'alert_count', 'occurrence_count'],
+            select(
+                literal(day, AlertDailyRollup.day.type),
+                Alert.severity,
+                Alert.device_id,
+                func.count(Alert.id),
+                func.coalesce(func.sum(Alert.occurrences), func.count(Alert.id))
+            )
+            .where(Alert.created_at >= start, Alert.created_at < end)
+            .group_by(Alert.severity, Alert.device_id)
+        )
+    )
+
+
+def take_status_snapshot():
+    """Record how many devices and cameras are in each status today"""
+    day = datetime.utcnow().date()
+    db.session.execute(delete(StatusSnapshot).where(StatusSnapshot.day == day))
+    taken_at = datetime.utcnow()
+    for kind, model in (('device', Device), ('camera', Camera)):
+        db.session.execute(
+            insert(StatusSnapshot).from_select(
+                ['day', 'kind', 'status', 'count', 'taken_at'],
+                select(
+                    literal(day, StatusSnapshot.day.type),
+                    literal(kind),
+                    model.status,
+                    func.count(model.id),
+                    literal(taken_at, StatusSnapshot.taken_at.type)
+                ).group_by(model.status)
+            )
+        )
+    return day
+
+
+def get_first_complete_day(today):
+    """First day whose alerts retention can't have purged yet (None if nothing is purged)"""
+    if not current_app.config.get('ALERT_RETENTION_ENABLED', True):
+        return None
+    cutoffs = [cutoff for cutoff in get_retention_cutoffs(datetime(today.year, today.month, today.day)) if cutoff]
+    if not cutoffs:
+        return None
+    return max(cutoffs).date() + timedelta(days=1)
+
+
+def get_rollup_days_to_build(today=None):
+    """Days after the last rolled-up day through yesterday that still have all their alerts.
+
+    Existing rollups are never rebuilt: the alerts they counted may have been
+    purged since. Days older than REPORT_ROLLUP_BACKFILL_DAYS, or than the
+    alert retention period, are skipped for the same reason.
+    """
+    today = today or datetime.utcnow().date()
+    yesterday = today - timedelta(days=1)
+    backfill = current_app.config.get('REPORT_ROLLUP_BACKFILL_DAYS', 31)
+
+    first_day = yesterday - timedelta(days=backfill - 1)
+    first_complete_day = get_first_complete_day(today)
+    if first_complete_day:
+        first_day = max(first_day, first_complete_day)
+    last_day = db.session.execute(select(func.max(AlertDailyRollup.day))).scalar()
+    if last_day is not None:
+        first_day = max(first_day, last_day + timedelta(days=1))
+
+    days = []
+    day = first_day
+    while day <= yesterday:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def build_missing_rollups(today=None):
+    """Roll up every day that needs it, committing day by day; returns the days built"""
+    days = get_rollup_days_to_build(today)
+    for day in days:
+        build_alert_rollup(day)
+        db.session.commit()
+    return days
+
+
+@shared_task(bind=True)
+def build_daily_rollups(self):
+    """Fill alert rollups for every day not rolled up yet, and snapshot today's status"""
+    try:
+        days = build_missing_rollups()
+
+        today = datetime.utcnow().date()
+        has_snapshot = db.session.execute(
+            select(StatusSnapshot.id).where(StatusSnapshot.day == today).limit(1)
+        ).first()
+        if not has_snapshot:
+            take_status_snapshot()
+            db.session.commit()
+
+        return {'days': [day.isoformat() for day in days], 'snapshot': today.isoformat()}
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error building daily rollups: {str(e)}")
+        return {'error': str(e)}
+
+
+def get_report(start, end, top_devices=10):
+    """Aggregate rollups for the days start..end (inclusive)"""
+    by_severity = db.session.execute(
+        select(AlertDailyRollup.severity, func.sum(AlertDailyRollup.alert_count),
+               func.sum(AlertDailyRollup.occurrence_count))
+        .where(AlertDailyRollup.day >= start, AlertDailyRollup.day <= end)
+        .group_by(AlertDailyRollup.severity)
+    ).all()
+
+    by_day = db.session.execute(
+        select(AlertDailyRollup.day, func.sum(AlertDailyRollup.alert_count))
+        .where(AlertDailyRollup.day >= start, AlertDailyRollup.day <= end)
+        .group_by(AlertDailyRollup.day)
+        .order_by(AlertDailyRollup.day)
+    ).all()
+
+    device_total = func.sum(AlertDailyRollup.alert_count).label('total')
+    top = db.session.execute(
+        select(AlertDailyRollup.device_id, Device.name, device_total)
+        .outerjoin(Device, Device.id == AlertDailyRollup.device_id)
+        .where(AlertDailyRollup.day >= start, AlertDailyRollup.day <= end,
+               AlertDailyRollup.device_id.isnot(None))
+        .group_by(AlertDailyRollup.device_id, Device.name)
+        .order_by(device_total.desc())
+        .limit(top_devices)
+    ).all()
+
+    # Status at the end of the period: the latest snapshot inside it
+    snapshot_day = db.session.execute(
+        select(func.max(StatusSnapshot.day)).where(StatusSnapshot.day >= start, StatusSnapshot.day <= end)
+    ).scalar()
+    snapshot = {'device': {}, 'camera': {}}
+    if snapshot_day:
+        for kind, status, count in db.session.execute(
+            select(StatusSnapshot.kind, StatusSnapshot.status, StatusSnapshot.count)
+            .where(StatusSnapshot.day == snapshot_day)
+        ).all():
+            snapshot.setdefault(kind, {})[status or 'unknown'] = count
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'alerts': {severity or 'unknown': int(count) for severity, count, _ in by_severity},
+        'occurrences': {severity or 'unknown': int(occurrences or 0) for severity, _, occurrences in by_severity},
+        'alerts_per_day': [{'date': day.isoformat(), 'count': int(count)} for day, count in by_day],
+        'top_devices': [
+            {'device_id': device_id, 'device_name': name, 'alerts': int(total)}
+            for device_id, name, total in top
+        ],
+        'status_date': snapshot_day.isoformat() if snapshot_day else None,
+        'devices': snapshot['device'],
+        'cameras': snapshot['camera']
+    }
+
+
+def get_daily_report(start, end, top_devices=10):
+    """Per-day rollups for the days start..end (inclusive), one row per day"""
+    days = {}
+    day = start
+    while day <= end:
+        days[day] = {'date': day.isoformat(), 'alerts': {}, 'occurrences': {}, 'devices': {}, 'cameras': {}}
+        day += timedelta(days=1)
+
+    for day, severity, count, occurrences in db.session.execute(
+        select(AlertDailyRollup.day, AlertDailyRollup.severity, func.sum(AlertDailyRollup.alert_count),
+               func.sum(AlertDailyRollup.occurrence_count))
+        .where(AlertDailyRollup.day >= start, AlertDailyRollup.day <= end)
+        .group_by(AlertDailyRollup.day, AlertDailyRollup.severity)
+    ).all():
+        days[day]['alerts'][severity or 'unknown'] = int(count)
+        days[day]['occurrences'][severity or 'unknown'] = int(occurrences or 0)
+
+    for day, kind, status, count in db.session.execute(
+        select(StatusSnapshot.day, StatusSnapshot.kind, StatusSnapshot.status, StatusSnapshot.count)
+        .where(StatusSnapshot.day >= start, StatusSnapshot.day <= end)
+    ).all():
+        days[day]['devices' if kind == 'device' else 'cameras'][status or 'unknown'] = count
+
+    report = get_report(start, end, top_devices=top_devices)
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': list(days.values()),
+        'top_devices': report['top_devices']
+    }
+
+
+def get_daily_summary_data(day):
+    """Summary data for the daily summary notification, read from the rollups"""
+    # Catch up if the nightly rollup task hasn't run yet
+    build_missing_rollups()
+    report = get_report(day, day)
+    return {
+        'date': day.strftime('%Y-%m-%d'),
+        'alerts': report['alerts'],
+        'devices': report['devices'],
+        'cameras': report['cameras']
+    }
@@ -0,0 +1,384 @@
+from celery import shared_task
+from flask import current_app
+from app import db
+from app.models import Alert, NotificationOutbox
+from app.table_versions import bump_versions
+from sqlalchemy import and_, or_, select, delete, text
+from datetime import datetime, timedelta
+import gzip
+import json
+import os
+import logging
+
+ARCHIVE_INDEX_FILE = 'index.ndjson'
+PARTITION_PREFIX = 'alert_p'
+
+# The indexes of models.Alert, recreated on the partitioned table. A unique index there
+# must include created_at, so the open dedup key index can't stay unique; raise_alert
+# serializes on the key with an advisory lock instead.
+PARTITIONED_ALERT_INDEXES = (
+    "CREATE INDEX ix_alert_created_at ON alert (created_at)",
+    "CREATE INDEX ix_alert_acknowledged_created_at ON alert (acknowledged, created_at)",
+    "CREATE INDEX ix_alert_severity_acknowledged_created_at ON alert (severity, acknowledged, created_at)",
+    "CREATE INDEX ix_alert_device_id ON alert (device_id)",
+    "CREATE INDEX ix_alert_open_dedup_key ON alert (dedup_key) WHERE NOT acknowledged",
+)
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def _add_months(value, months):
+    month_index = value.month - 1 + months
+    return datetime(value.year + month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_retention_cutoffs(now=None):
+    """Return (acknowledged_cutoff, unacknowledged_cutoff); None means keep forever"""
+    now = now or datetime.utcnow()
+    ack_days = current_app.config.get('ALERT_RETENTION_ACKNOWLEDGED_DAYS', 0)
+    unack_days = current_app.config.get('ALERT_RETENTION_UNACKNOWLEDGED_DAYS', 0)
+    ack_cutoff = now - timedelta(days=ack_days) if ack_days > 0 else None
+    unack_cutoff = now - timedelta(days=unack_days) if unack_days > 0 else None
+    return ack_cutoff, unack_cutoff
+
+
+def get_retention_filter(now=None):
+    """Build the WHERE clause matching alerts past their retention period"""
+    ack_cutoff, unack_cutoff = get_retention_cutoffs(now)
+    clauses = []
+    if ack_cutoff:
+        clauses.append(and_(Alert.acknowledged.is_(True), Alert.created_at < ack_cutoff))
+    if unack_cutoff:
+        clauses.append(and_(
+            or_(Alert.acknowledged.is_(False), Alert.acknowledged.is_(None)),
+            Alert.created_at < unack_cutoff
+        ))
+    if not clauses:
+        return None
+    return or_(*clauses)
+
+
+def get_archive_dir():
+    """Return the alert archive directory, creating it if needed"""
+    archive_dir = current_app.config.get('ALERT_ARCHIVE_DIR') or \
+        os.path.join(current_app.instance_path, 'alert_archive')
+    os.makedirs(archive_dir, exist_ok=True)
+    return archive_dir
+
+
+def archive_alert_rows(rows, archive_dir=None):
+    """Write alert rows to a gzip-compressed NDJSON file and record it in the archive index"""
+    archive_dir = archive_dir or get_archive_dir()
+    rows = [dict(row) for row in rows]
+    ids = [row['id'] for row in rows]
+    created = [row['created_at'] for row in rows if row.get('created_at')]
+
+    filename = f"alerts-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{min(ids)}-{max(ids)}.ndjson.gz"
+    path = os.path.join(archive_dir, filename)
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, default=_json_default) + '\n')
+    os.replace(tmp_path, path)
+
+    entry = {
+        'file': filename,
+        'count': len(rows),
+        'min_id': min(ids),
+        'max_id': max(ids),
+        'min_created_at': min(created).isoformat() if created else None,
+        'max_created_at': max(created).isoformat() if created else None,
+        'device_ids': sorted({row['device_id'] for row in rows if row.get('device_id') is not None}),
+        'archived_at': datetime.utcnow().isoformat()
+    }
+    with open(os.path.join(archive_dir, ARCHIVE_INDEX_FILE), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
+    return entry
+
+
+def read_archive_index(archive_dir=None):
+    """Yield entries from the archive index"""
+    archive_dir = archive_dir or get_archive_dir()
+    index_path = os.path.join(archive_dir, ARCHIVE_INDEX_FILE)
+    if not os.path.exists(index_path):
+        return
+    with open(index_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def load_archived_alerts(start=None, end=None, device_id=None, alert_id=None, archive_dir=None):
+    """Yield archived alerts matching the filters, opening only files the index points at"""
+    archive_dir = archive_dir or get_archive_dir()
+    start_iso = start.isoformat() if start else None
+    end_iso = end.isoformat() if end else None
+    seen = set()
+
+    for entry in read_archive_index(archive_dir):
+        if alert_id is not None and not entry['min_id'] <= alert_id <= entry['max_id']:
+            continue
+        if start_iso and entry['max_created_at'] and entry['max_created_at'] < start_iso:
+            continue
+        if end_iso and entry['min_created_at'] and entry['min_created_at'] >= end_iso:
+            continue
+        if device_id is not None and device_id not in entry.get('device_ids', []):
+            continue
+
+        path = os.path.join(archive_dir, entry['file'])
+        if not os.path.exists(path):
+            logging.warning(f"Archive file missing: {entry['file']}")
+            continue
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                # A batch can be archived twice if its delete was rolled back
+                if row['id'] in seen:
+                    continue
+                if alert_id is not None and row['id'] != alert_id:
+                    continue
+                if device_id is not None and row.get('device_id') != device_id:
+                    continue
+                created_at = row.get('created_at') or ''
+                if start_iso and created_at < start_iso:
+                    continue
+                if end_iso and created_at >= end_iso:
+                    continue
+                seen.add(row['id'])
+                yield row
+
+
+def is_partitioning_active():
+    """Whether the alert table is managed as monthly PostgreSQL partitions"""
+    return bool(current_app.config.get('ALERT_PARTITIONING_ENABLED')) and \
+        db.engine.dialect.name == 'postgresql'
+
+
+def list_alert_partitions():
+    """Return (partition_name, month_start) for each monthly alert partition"""
+    rows = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'alert'"
+    )).scalars().all()
+
+    partitions = []
+    for name in rows:
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        try:
+            partitions.append((name, datetime.strptime(name[len(PARTITION_PREFIX):], '%Y%m')))
+        except ValueError:
+            continue
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def _create_month_partition(month_start):
+    month_end = _add_months(month_start, 1)
+    db.session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {PARTITION_PREFIX}{month_start:%Y%m} PARTITION OF alert "
+        f"FOR VALUES FROM ('{month_start:%Y-%m-%d}') TO ('{month_end:%Y-%m-%d}')"
+    ))
+
+
+def ensure_alert_partitions(months_ahead=None):
+    """Create monthly partitions from the current month up to months_ahead"""
+    if months_ahead is None:
+        months_ahead = current_app.config.get('ALERT_PARTITION_MONTHS_AHEAD', 3)
+    current = _month_start(datetime.utcnow())
+    for offset in range(months_ahead + 1):
+        _create_month_partition(_add_months(current, offset))
+    db.session.commit()
+
+
+def enable_alert_partitioning():
+    """Convert the alert table into a table range-partitioned by month on created_at"""
+    if db.engine.dialect.name != 'postgresql':
+        raise RuntimeError('Alert partitioning requires PostgreSQL')
+
+    is_partitioned = db.session.execute(text(
+        "SELECT c.relkind = 'p' FROM pg_class c WHERE c.relname = 'alert'"
+    )).scalar()
+    if is_partitioned:
+        return {'status': 'already_partitioned'}
+
+    oldest = db.session.execute(select(db.func.min(Alert.created_at))).scalar() or datetime.utcnow()
+    months_ahead = current_app.config.get('ALERT_PARTITION_MONTHS_AHEAD', 3)
+
+    # Run as a single transaction so a failure leaves the original table untouched
+    db.session.execute(text("ALTER TABLE alert RENAME TO alert_unpartitioned"))
+    db.session.execute(text("ALTER SEQUENCE alert_id_seq OWNED BY NONE"))
+    db.session.execute(text(
+        "CREATE TABLE alert (LIKE alert_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    ))
+    db.session.execute(text("ALTER TABLE alert ALTER COLUMN created_at SET NOT NULL"))
+    db.session.execute(text("ALTER TABLE alert ADD PRIMARY KEY (id, created_at)"))
+
+    month = _month_start(oldest)
+    last_month = _add_months(_month_start(datetime.utcnow()), months_ahead)
+    partitions = 0
+    while month <= last_month:
+        _create_month_partition(month)
+        month = _add_months(month, 1)
+        partitions += 1
+    db.session.execute(text("CREATE TABLE IF NOT EXISTS alert_default PARTITION OF alert DEFAULT"))
+
+    # The partition key can't be NULL; date such alerts now rather than lose them
+    backfilled = db.session.execute(text(
+        "UPDATE alert_unpartitioned SET created_at = now() AT TIME ZONE 'utc' WHERE created_at IS NULL"
+    )).rowcount
+    total = db.session.execute(text("SELECT count(*) FROM alert_unpartitioned")).scalar()
+    copied = db.session.execute(text("INSERT INTO alert SELECT * FROM alert_unpartitioned")).rowcount
+    if copied != total:
+        db.session.rollback()
+        raise RuntimeError(f'Copied {copied} of {total} alerts into the partitioned table, nothing was changed')
+    # LIKE copies neither indexes nor foreign keys; their names are free once the old table is gone
+    db.session.execute(text("DROP TABLE alert_unpartitioned"))
+    for statement in PARTITIONED_ALERT_INDEXES:
+        db.session.execute(text(statement))
+    db.session.execute(text(
+        "ALTER TABLE alert ADD CONSTRAINT alert_device_id_fkey FOREIGN KEY (device_id) REFERENCES device (id)"
+    ))
+    db.session.execute(text("ALTER SEQUENCE alert_id_seq OWNED BY alert.id"))
+    db.session.commit()
+
+    return {'status': 'partitioned', 'partitions': partitions, 'rows_copied': copied, 'created_at_backfilled': backfilled}
+
+
+def expired_partitions(partitions, cutoff):
+    """The (name, month_start) partitions whose whole month is older than cutoff"""
+    return [(name, month_start) for name, month_start in partitions if _add_months(month_start, 1) <= cutoff]
+
+
+def drop_expired_partitions(archive=True, now=None):
+    """Archive and drop whole monthly partitions older than every retention cutoff"""
+    ack_cutoff, unack_cutoff = get_retention_cutoffs(now)
+    if not ack_cutoff or not unack_cutoff:
+        # Some alerts are kept forever, so partitions can't be dropped wholesale
+        return {'dropped': [], 'archived': 0}
+    cutoff = min(ack_cutoff, unack_cutoff)
+    batch_size = current_app.config.get('ALERT_RETENTION_BATCH_SIZE', 500)
+
+    dropped = []
+    archived = 0
+    for name, month_start in expired_partitions(list_alert_partitions(), cutoff):
+        if archive:
+            last_id = 0
+            while True:
+                rows = db.session.execute(
+                    text(f"SELECT * FROM {name} WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                    {'last_id': last_id, 'limit': batch_size}
+                ).mappings().all()
+                if not rows:
+                    break
+                archive_alert_rows(rows)
+                archived += len(rows)
+                last_id = rows[-1]['id']
+
+        db.session.execute(text(f"ALTER TABLE alert DETACH PARTITION {name}"))
+        db.session.execute(text(f"DROP TABLE {name}"))
+        db.session.commit()
+        # DDL is not seen by the session events that track table writes
+        bump_versions('alert')
+        dropped.append(name)
+
+    return {'dropped': dropped, 'archived': archived}
+
+
+def purge_alert_batches(criteria, archive=True, batch_size=500, max_batches=None):
+    """Archive (optionally) and delete alerts matching criteria in small transactions"""
+    table = Alert.__table__
+    purged = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        rows = db.session.execute(
+            select(table).where(criteria).order_by(table.c.id).limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            break
+
+        if archive:
+            archive_alert_rows(rows)
+
+        ids = [row['id'] for row in rows]
+        db.session.execute(delete(table).where(table.c.id.in_(ids)))
+        db.session.commit()
+
+        purged += len(ids)
+        batches += 1
+
+    return {'purged': purged, 'batches': batches}
+
+
+def prune_notification_outbox(now=None):
+    """Delete outbox entries that were dispatched longer ago than the retention period"""
+    days = current_app.config.get('NOTIFY_OUTBOX_RETENTION_DAYS', 7)
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    pruned = db.session.execute(
+        delete(NotificationOutbox).where(
+            NotificationOutbox.status == 'dispatched',
+            NotificationOutbox.dispatched_at < cutoff
+        )
+    ).rowcount
+    db.session.commit()
+    return pruned
+
+
+@shared_task(bind=True)
+def purge_expired_alerts(self):
+    """Archive or delete alerts past their retention period in small batches"""
+    try:
+        config = current_app.config
+        if not config.get('ALERT_RETENTION_ENABLED', True):
+            return {'status': 'disabled'}
+
+        archive = config.get('ALERT_RETENTION_MODE', 'archive') == 'archive'
+        result = {'mode': 'archive' if archive else 'purge'}
+        result['outbox_pruned'] = prune_notification_outbox()
+
+        if is_partitioning_active():
+            result['partitions'] = drop_expired_partitions(archive=archive)
+
+        criteria = get_retention_filter()
+        if criteria is None:
+            result.update({'purged': 0, 'batches': 0})
+            return result
+
+        result.update(purge_alert_batches(
+            criteria,
+            archive=archive,
+            batch_size=config.get('ALERT_RETENTION_BATCH_SIZE', 500),
+            max_batches=config.get('ALERT_RETENTION_MAX_BATCHES', 200)
+        ))
+        return result
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error purging expired alerts: {str(e)}")
+        return {'error': str(e)}
+
+
+@shared_task(bind=True)
+def maintain_alert_partitions(self):
+    """Keep monthly alert partitions created ahead of time"""
+    try:
+        if not is_partitioning_active():
+            return {'status': 'disabled'}
+        ensure_alert_partitions()
+        return {'partitions': [name for name, _ in list_alert_partitions()]}
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error maintaining alert partitions: {str(e)}")
+        return {'error': str(e)}
@@ -0,0 +1,25 @@
+from flask.cli import AppGroup
+import click
+import json
+
+# Kept apart from the retention module so registering the commands doesn't import Celery
+alerts_cli = AppGroup('alerts', help='Alert retention and storage maintenance.')
+
+
+@alerts_cli.command('purge')
+def purge_command():
+    """Run the alert retention policy once."""
+    from app.services.retention import purge_expired_alerts
+    click.echo(json.dumps(purge_expired_alerts.run(), indent=2))
+
+
+@alerts_cli.command('partition')
+def partition_command():
+    """Convert the alert table to monthly partitions (PostgreSQL)."""
+    from app import db
+    from app.services.retention import enable_alert_partitioning
+    try:
+        click.echo(json.dumps(enable_alert_partitioning(), indent=2))
+    except Exception as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
@@ -0,0 +1,176 @@
+from concurrent.futures import Future
+from flask import current_app
+from sqlalchemy import event
+from app import db
+import logging
+import os
+import queue
+import threading
+
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def is_file_database(engine):
+    """True for a SQLite engine backed by a file (not :memory:)"""
+    database = engine.url.database
+    return engine.dialect.name == 'sqlite' and bool(database) and database != ':memory:' \
+        and not database.startswith('file::memory:')
+
+
+def configure_sqlite_engine(engine, wal=True, busy_timeout_ms=5000, synchronous='NORMAL', cache_size_kb=16384):
+    """Set WAL journaling and per-connection pragmas on every new SQLite connection"""
+    synchronous = synchronous.upper()
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f'SQLITE_SYNCHRONOUS must be one of {", ".join(SYNCHRONOUS_LEVELS)}')
+    use_wal = wal and is_file_database(engine)
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if use_wal:
+                # Readers keep reading while one connection writes
+                mode = cursor.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+                if mode.lower() != 'wal':
+                    logging.warning(f"SQLite stayed in {mode} journal mode, WAL is not available here")
+            # Wait for the write lock instead of failing with "database is locked"
+            cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+            # NORMAL only syncs at checkpoints in WAL mode; commits stay durable across app crashes
+            cursor.execute(f'PRAGMA synchronous={synchronous}')
+            cursor.execute(f'PRAGMA cache_size={-int(cache_size_kb)}')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+        finally:
+            cursor.close()
+
+
+def init_sqlite(app):
+    """Apply the SQLite pragmas from the config to the app's SQLite engines"""
+    config = app.config
+    with app.app_context():
+        engines = [engine for engine in db.engines.values() if engine.dialect.name == 'sqlite']
+    for engine in engines:
+        configure_sqlite_engine(
+            engine,
+            wal=config.get('SQLITE_WAL', True),
+            busy_timeout_ms=config.get('SQLITE_BUSY_TIMEOUT_MS', 5000),
+            synchronous=config.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+            cache_size_kb=config.get('SQLITE_CACHE_SIZE_KB', 16384)
+        )
+
+
+class WriteQueue:
+    """Single writer thread applying queued writes to a SQLite database
+
+    Each write is a function run against db.session in its own savepoint.
+    Writes already waiting when the thread picks up work are committed
+    together in one BEGIN IMMEDIATE transaction, which takes the database
+    write lock up front, so other processes' writers wait for it instead
+    of failing halfway through.
+    """
+
+    def __init__(self, app, batch_size=50, timeout=30):
+        self.app = app
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) and wait for its result (or exception) after the commit"""
+        future = Future()
+        self.queue.put((future, fn, args))
+        return future.result(timeout=self.timeout)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            batch = [job for job in batch if job[0].set_running_or_notify_cancel()]
+            if batch:
+                self._apply(batch)
+
+    def _apply(self, batch):
+        results = []
+        try:
+            with self.app.app_context():
+                try:
+                    db.session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+                    for future, fn, args in batch:
+                        try:
+                            with db.session.begin_nested():
+                                results.append((future, fn(*args), None))
+                        except Exception as e:
+                            results.append((future, None, e))
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+        except Exception as e:
+            logging.error(f"SQLite write batch of {len(batch)} failed: {str(e)}")
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    """Return this process's SQLite write queue, or None when writes run inline"""
+    global _write_queue
+    config = current_app.config
+    if not config.get('SQLITE_WRITE_QUEUE', True) or not is_file_database(db.engine):
+        return None
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                _write_queue = WriteQueue(
+                    current_app._get_current_object(),
+                    batch_size=config.get('SQLITE_WRITE_BATCH_SIZE', 50),
+                    timeout=config.get('SQLITE_WRITE_TIMEOUT_SECONDS', 30)
+                )
+    return _write_queue
+
+
+def _reset_write_queue_after_fork():
+    # Forked worker processes must not share the parent's writer thread
+    global _write_queue, _write_queue_lock
+    _write_queue = None
+    _write_queue_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_write_queue_after_fork)
+
+
+def run_write(fn, *args):
+    """Run fn(*args) against db.session and commit it; returns fn's result
+
+    On a file-backed SQLite database the write goes through the write queue.
+    Elsewhere it runs and commits in the caller's session.
+    """
+    write_queue = get_write_queue()
+    if write_queue is not None:
+        if threading.current_thread() is write_queue.thread:
+            # Already part of a queued write; committed with its batch
+            return fn(*args)
+        return write_queue.submit(fn, *args)
+
+    try:
+        result = fn(*args)
+        db.session.commit()
+        return result
+    except Exception:
+        db.session.rollback()
+        raise
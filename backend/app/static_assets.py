@@ -0,0 +1,183 @@
+from flask import Response, current_app, request, send_file
+from werkzeug.security import safe_join
+from werkzeug.http import http_date, parse_date
+from app.frontend_build import MANIFEST_FILE, load_manifest, rewrite_html
+from datetime import datetime, timezone
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+try:
+    import brotli
+except ImportError:  # optional: precompressed .br files are still served
+    brotli = None
+
+# Compressed in memory when loaded (if no precompressed file exists)
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+# Content-hashed names such as app.3f2a9c1d.js may be cached forever
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class StaticAsset:
+    """One file held in memory with its compressed variants"""
+
+    def __init__(self, path, body, mtime, mimetype):
+        self.path = path
+        self.mtime = mtime
+        self.mimetype = mimetype
+        self.last_modified = datetime.fromtimestamp(int(mtime), tz=timezone.utc)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # encoding -> (body, strong ETag); each encoding is a different representation
+        self.variants = {'identity': (body, f'"{digest}"')}
+
+        compressible = mimetype.startswith(COMPRESSIBLE_TYPES)
+        for encoding, suffix, compress in (('br', '.br', brotli and brotli.compress),
+                                           ('gzip', '.gz', lambda data: gzip.compress(data, 9, mtime=0))):
+            precompressed = _read_if_newer(path + suffix, mtime)
+            if precompressed is None and compressible and compress:
+                precompressed = compress(body)
+            if precompressed is not None and len(precompressed) < len(body):
+                self.variants[encoding] = (precompressed, f'"{digest}-{encoding}"')
+
+    def choose(self, accept_encodings):
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encodings[encoding]:
+                return encoding
+        return 'identity'
+
+    def matches(self, if_none_match):
+        etags = {etag for _, etag in self.variants.values()}
+        return if_none_match.contains_weak('*') or any(if_none_match.contains_weak(etag.strip('"')) for etag in etags)
+
+
+def _read_if_newer(path, mtime):
+    try:
+        if os.path.getmtime(path) >= mtime:
+            with open(path, 'rb') as f:
+                return f.read()
+    except OSError:
+        pass
+    return None
+
+
+class StaticAssets:
+    """Frontend files served from memory with validators and cache headers
+
+    Files are read once; with reload enabled (debug) they are re-read when
+    their modification time changes. Files bigger than max_file_bytes are
+    streamed from disk instead. When build_root holds the manifest written by
+    ``flask frontend build``, its outputs are served too and pages have their
+    asset tags rewritten to the bundled, fingerprinted files.
+    """
+
+    def __init__(self, root, build_root=None, max_age=300, max_file_bytes=1024 * 1024, reload=False):
+        self.root = root
+        self.build_root = build_root
+        self.manifest = None
+        self.manifest_mtime = None
+        self.max_age = max_age
+        self.max_file_bytes = max_file_bytes
+        self.reload = reload
+        self.assets = {}
+        self.lock = threading.Lock()
+
+    def resolve(self, path):
+        for root in (self.build_root, self.root):
+            file_path = safe_join(root, path) if root else None
+            if file_path and os.path.isfile(file_path):
+                return file_path
+        return None
+
+    def check_manifest(self):
+        """Pick up a new build; cached pages are dropped so they are rewritten again"""
+        if not self.build_root:
+            return
+        try:
+            mtime = os.path.getmtime(os.path.join(self.build_root, MANIFEST_FILE))
+        except OSError:
+            mtime = None
+        if mtime != self.manifest_mtime:
+            with self.lock:
+                self.manifest = load_manifest(self.build_root) if mtime else None
+                self.manifest_mtime = mtime
+                self.assets.clear()
+
+    def load(self, file_path):
+        asset = self.assets.get(file_path)
+        if asset is not None and not self.reload:
+            return asset
+
+        self.check_manifest()
+        asset = self.assets.get(file_path)
+
+        mtime = os.path.getmtime(file_path)
+        if asset is not None and asset.mtime == mtime:
+            return asset
+
+        with open(file_path, 'rb') as f:
+            body = f.read()
+        mimetype = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        if mimetype == 'text/html' and self.manifest:
+            body = rewrite_html(body.decode('utf-8'), self.manifest).encode('utf-8')
+        asset = StaticAsset(file_path, body, mtime, mimetype)
+        with self.lock:
+            self.assets[file_path] = asset
+        return asset
+
+    def cache_control(self, file_path, mimetype):
+        if FINGERPRINT_RE.search(os.path.basename(file_path)):
+            return IMMUTABLE_CACHE_CONTROL
+        if mimetype == 'text/html':
+            # Pages always revalidate so they pick up newly fingerprinted assets
+            return 'no-cache'
+        return f'public, max-age={self.max_age}'
+
+    def serve(self, file_path):
+        """Response for a file under root, honouring conditional and encoding headers"""
+        if os.path.getsize(file_path) > self.max_file_bytes:
+            response = send_file(file_path, conditional=True, etag=True)
+            response.headers['Cache-Control'] = self.cache_control(file_path, response.mimetype)
+            return response
+
+        asset = self.load(file_path)
+        encoding = asset.choose(request.accept_encodings)
+        body, etag = asset.variants[encoding]
+        headers = {
+            'ETag': etag,
+            'Last-Modified': http_date(asset.last_modified),
+            'Cache-Control': self.cache_control(file_path, asset.mimetype),
+            'Vary': 'Accept-Encoding'
+        }
+
+        if request.if_none_match:
+            not_modified = asset.matches(request.if_none_match)
+        else:
+            since = parse_date(request.headers.get('If-Modified-Since'))
+            not_modified = since is not None and asset.last_modified <= since
+        if not_modified:
+            return Response(status=304, headers=headers)
+
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(body, mimetype=asset.mimetype, headers=headers)
+
+
+def get_static_assets():
+    """Return the app's static asset layer, creating it on first use"""
+    assets = current_app.extensions.get('static_assets')
+    if assets is None:
+        config = current_app.config
+        reload = config.get('STATIC_RELOAD')
+        assets = StaticAssets(
+            config['FRONTEND_DIR'],
+            build_root=config.get('FRONTEND_BUILD_DIR'),
+            max_age=config.get('STATIC_MAX_AGE_SECONDS', 300),
+            max_file_bytes=config.get('STATIC_CACHE_MAX_FILE_BYTES', 1024 * 1024),
+            reload=current_app.debug if reload is None else reload
+        )
+        current_app.extensions['static_assets'] = assets
+    return assets
@@ -0,0 +1,149 @@
+from functools import wraps
+from flask import current_app, has_app_context, request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.cache import get_redis, report_redis_error
+from app.db_routing import prefer_primary_since
+import secrets
+import threading
+import time
+
+# Redis hash of version counters, plus an epoch replaced if the hash is lost
+VERSIONS_KEY = 'table-versions'
+EPOCH_FIELD = 'epoch'
+# Redis hash of the time each table (or 'table:status') last changed
+CHANGED_AT_KEY = 'table-changed-at'
+# Tables whose status column also has its own version (for status summaries)
+STATUS_TABLES = {'device', 'camera'}
+
+# Set when a commit's changes couldn't reach Redis. The session keeps them
+# for its next commit, but may be closed first, so the next call that
+# reaches Redis replaces the epoch instead.
+_missed = threading.Event()
+
+
+def _changed(session, table, status=False):
+    changed = session.info.setdefault('changed_tables', set())
+    changed.add(table)
+    if status and table in STATUS_TABLES:
+        changed.add(f'{table}:status')
+
+
+def _after_flush(session, flush_context):
+    for obj in session.new | session.deleted:
+        _changed(session, obj.__table__.name, status=True)
+    for obj in session.dirty:
+        if not session.is_modified(obj):
+            continue
+        columns = {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+        # Every listing shows its changed columns (a poll's last_seen too), but
+        # the status summaries only need a new version when status changes
+        _changed(session, obj.__table__.name, status='status' in columns)
+
+
+def _do_orm_execute(orm_execute_state):
+    # Bulk INSERT/UPDATE/DELETE statements bypass the unit of work
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _changed(orm_execute_state.session, table.name, status=True)
+
+
+def _after_commit(session):
+    changed = session.info.pop('changed_tables', set()) | session.info.pop('unpushed_tables', set())
+    if changed and has_app_context() and not bump_versions(*changed):
+        session.info['unpushed_tables'] = changed
+
+
+def _after_rollback(session):
+    session.info.pop('changed_tables', None)
+
+
+def init_table_versions():
+    """Track which tables each transaction writes and bump their versions on commit"""
+    if not event.contains(Session, 'after_commit', _after_commit):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'do_orm_execute', _do_orm_execute)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
+
+
+def _replace_epoch(client):
+    _missed.clear()
+    client.hset(VERSIONS_KEY, EPOCH_FIELD, secrets.token_hex(4))
+
+
+def bump_versions(*names):
+    """Mark tables (or 'table:status') as changed for every worker; False if Redis wasn't reached"""
+    client = get_redis()
+    if client is None:
+        if current_app.config.get('REDIS_URL'):
+            _missed.set()
+        return False
+    try:
+        if _missed.is_set():
+            _replace_epoch(client)
+        pipe = client.pipeline()
+        for name in sorted(names):
+            pipe.hincrby(VERSIONS_KEY, name, 1)
+        if names:
+            pipe.hset(CHANGED_AT_KEY, mapping=dict.fromkeys(names, time.time()))
+        pipe.execute()
+        return True
+    except Exception as e:
+        _missed.set()
+        report_redis_error(e)
+        return False
+
+
+def get_versions(names):
+    """(weak ETag value, time of the latest change) for names, or (None, None) without Redis"""
+    client = get_redis()
+    if client is None:
+        return None, None
+    try:
+        if _missed.is_set():
+            _replace_epoch(client)
+        pipe = client.pipeline()
+        pipe.hmget(VERSIONS_KEY, EPOCH_FIELD, *names)
+        pipe.hmget(CHANGED_AT_KEY, *names)
+        (epoch, *versions), changed_at = pipe.execute()
+        if epoch is None:
+            client.hsetnx(VERSIONS_KEY, EPOCH_FIELD, secrets.token_hex(4))
+            epoch, *versions = client.hmget(VERSIONS_KEY, EPOCH_FIELD, *names)
+    except Exception as e:
+        report_redis_error(e)
+        return None, None
+    changed_at = [float(value) for value in changed_at if value is not None]
+    return '-'.join([epoch] + [version or '0' for version in versions]), max(changed_at, default=None)
+
+
+def get_etag(names):
+    """Weak ETag value for the current versions of names, or None without Redis"""
+    return get_versions(names)[0]
+
+
+def versioned(*names):
+    """Answer If-None-Match with 304, before running the view, while none of names changed"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            etag, changed_at = get_versions(names) if current_app.config.get('TABLE_VERSION_ETAGS', True) else (None, None)
+            if etag is None:
+                return fn(*args, **kwargs)
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                # The body must be at least as new as the ETag, so recent
+                # changes are read from the primary rather than a replica
+                prefer_primary_since(changed_at)
+                response = current_app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # Browsers revalidate every time instead of reusing a stale copy
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
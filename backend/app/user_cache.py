@@ -0,0 +1,179 @@
+import logging
+import os
+import threading
+import time
+from flask import current_app
+from app.cache import get_redis, report_redis_error
+
+# Redis pub/sub channel and hash used to tell every process a user changed
+INVALIDATE_CHANNEL = 'auth:user-invalidate'
+CHANGED_HASH = 'auth:user-changed'
+# Role changes are remembered at least as long as an access token lives
+CHANGE_RETENTION_SECONDS = 24 * 3600
+MAX_CACHED_USERS = 1024
+
+_users = {}        # user id -> (expires_at, user dict or None)
+_changed_at = {}   # user id -> wall-clock time of the last role change or deletion
+_unpublished = []  # (user id, changed_at) invalidations Redis hasn't taken yet
+_lock = threading.Lock()
+_listener = None
+# Set while the listener is subscribed, caught up and has published this
+# process's own invalidations: only then does this process hear of every change
+_synced = threading.Event()
+
+
+def _load_user(user_id):
+    from app.models import User
+
+    user = User.query.get(user_id)
+    if not user:
+        return None
+    return {'id': user.id, 'username': user.username, 'email': user.email, 'role': user.role}
+
+
+def get_cached_user(user_id):
+    """Return the user's id, username, email and role, cached for USER_CACHE_TTL_SECONDS"""
+    _ensure_listener()
+    user_id = int(user_id)
+    now = time.monotonic()
+
+    with _lock:
+        entry = _users.get(user_id)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    user = _load_user(user_id)
+    with _lock:
+        if len(_users) >= MAX_CACHED_USERS:
+            _users.clear()
+        _users[user_id] = (now + current_app.config.get('USER_CACHE_TTL_SECONDS', 60), user)
+    return user
+
+
+def claims_trusted():
+    """Whether this process hears about every role change, so token claims may be trusted.
+
+    False without Redis, before a new (or just forked) process's listener has
+    caught up, after the listener lost its connection, and while an
+    invalidation of this process's is still waiting to be published.
+    """
+    _ensure_listener()
+    return _synced.is_set() and get_redis() is not None
+
+
+def changed_since(user_id, issued_at):
+    """Whether the user's role changed (or the user was deleted) after a token was issued"""
+    _ensure_listener()
+    with _lock:
+        changed_at = _changed_at.get(int(user_id))
+    return changed_at is not None and changed_at >= issued_at
+
+
+def _forget(user_id, changed_at):
+    with _lock:
+        _users.pop(user_id, None)
+        if changed_at >= _changed_at.get(user_id, 0):
+            _changed_at[user_id] = changed_at
+        cutoff = time.time() - CHANGE_RETENTION_SECONDS
+        for stale in [uid for uid, at in _changed_at.items() if at < cutoff]:
+            del _changed_at[stale]
+
+
+def _publish(client, changes):
+    pipe = client.pipeline()
+    for user_id, changed_at in changes:
+        pipe.hset(CHANGED_HASH, user_id, changed_at)
+    pipe.expire(CHANGED_HASH, CHANGE_RETENTION_SECONDS)
+    for user_id, changed_at in changes:
+        pipe.publish(INVALIDATE_CHANNEL, f'{user_id}:{changed_at}')
+    pipe.execute()
+
+
+def _publish_unpublished(client):
+    with _lock:
+        changes = list(_unpublished)
+    if changes:
+        _publish(client, changes)
+        with _lock:
+            del _unpublished[:len(changes)]
+
+
+def invalidate_user(user_id):
+    """Drop a user from every process's cache after a role change or deletion"""
+    user_id = int(user_id)
+    changed_at = time.time()
+    _forget(user_id, changed_at)
+    if not current_app.config.get('REDIS_URL'):
+        # Without Redis no process trusts role claims, so there's no one to tell
+        return
+
+    client = get_redis()
+    try:
+        if client is None:
+            raise ConnectionError('Redis unavailable')
+        _publish(client, [(user_id, changed_at)])
+    except Exception as e:
+        # Other processes can't be told yet: the listener publishes it once
+        # Redis is back, and until then this process doesn't trust claims either
+        with _lock:
+            _unpublished.append((user_id, changed_at))
+        _synced.clear()
+        if client is not None:
+            report_redis_error(e)
+
+
+def _ensure_listener():
+    global _listener
+    if _listener is not None or get_redis() is None:
+        return
+    with _lock:
+        if _listener is None:
+            _listener = threading.Thread(
+                target=_listen, args=(current_app._get_current_object(),),
+                name='user-cache-listener', daemon=True
+            )
+            _listener.start()
+
+
+def _listen(app):
+    """Apply invalidations published by other processes until the process exits"""
+    while True:
+        with app.app_context():
+            client = get_redis()
+        if client is None:
+            _synced.clear()
+            time.sleep(5)
+            continue
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATE_CHANNEL)
+            # Catch up on changes published before this process subscribed
+            for user_id, changed_at in client.hgetall(CHANGED_HASH).items():
+                _forget(int(user_id), float(changed_at))
+
+            while True:
+                _publish_unpublished(client)
+                _synced.set()
+                message = pubsub.get_message(timeout=1.0)
+                if message and message['type'] == 'message':
+                    user_id, changed_at = message['data'].split(':', 1)
+                    _forget(int(user_id), float(changed_at))
+        except Exception as e:
+            # Messages may have been missed: drop everything cached and stop
+            # trusting claims until the listener has caught up again
+            _synced.clear()
+            with _lock:
+                _users.clear()
+            logging.warning(f"User cache listener lost Redis: {str(e)}")
+            time.sleep(5)
+
+
+def _reset_after_fork():
+    # The listener thread does not survive fork; the child catches up on its own
+    global _listener, _lock, _synced
+    _listener = None
+    _lock = threading.Lock()
+    _synced = threading.Event()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
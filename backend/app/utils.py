@@ -1,6 +1,5 @@
 import re
 import ipaddress
-from cryptography.fernet import Fernet
 from flask import current_app
 import base64
 import hashlib
@@ -28,6 +27,7 @@ def validate_url(url):
 
 def generate_encryption_key():
     """Generate a new encryption key"""
+    from cryptography.fernet import Fernet
     return Fernet.generate_key()
 
 def encrypt_password(password, key=None):
@@ -38,6 +38,7 @@ def encrypt_password(password, key=None):
             secret = current_app.config['SECRET_KEY'].encode()
             key = base64.urlsafe_b64encode(hashlib.sha256(secret).digest())
         
+        from cryptography.fernet import Fernet
         f = Fernet(key)
         encrypted = f.encrypt(password.encode())
         return base64.urlsafe_b64encode(encrypted).decode()
@@ -53,6 +54,7 @@ def decrypt_password(encrypted_password, key=None):
             secret = current_app.config['SECRET_KEY'].encode()
             key = base64.urlsafe_b64encode(hashlib.sha256(secret).digest())
         
+        from cryptography.fernet import Fernet
         f = Fernet(key)
         encrypted_bytes = base64.urlsafe_b64decode(encrypted_password.encode())
         decrypted = f.decrypt(encrypted_bytes)
@@ -240,29 +242,19 @@ def log_activity(user_id, action, resource_type, resource_id, details=None):
         return False
 
 class RateLimiter:
-    """Simple in-memory rate limiter"""
+    """Sliding-window rate limiter shared by all workers through Redis"""
     
-    def __init__(self):
-        self.requests = {}
+    def __init__(self, max_local_keys=10000):
+        from app.ratelimit import SlidingWindowCounter
+        self.counter = SlidingWindowCounter(max_local_keys)
     
-    def is_allowed(self, key, max_requests=100, window_seconds=3600):
-        """Check if request is allowed based on rate limit"""
-        now = datetime.utcnow()
-        window_start = now - timedelta(seconds=window_seconds)
+    def is_allowed(self, key, max_requests=100, window_seconds=3600, cost=1):
+        """Check if request is allowed based on rate limit, consuming cost from it if so"""
+        from flask import has_app_context
+        from app.cache import get_redis
         
-        # Clean old entries
-        if key in self.requests:
-            self.requests[key] = [req_time for req_time in self.requests[key] if req_time > window_start]
-        else:
-            self.requests[key] = []
-        
-        # Check if under limit
-        if len(self.requests[key]) >= max_requests:
-            return False
-        
-        # Add current request
-        self.requests[key].append(now)
-        return True
+        client = get_redis() if has_app_context() else None
+        return self.counter.acquire(client, f'ratelimit:{key}', max_requests, window_seconds, cost)
 
 # Global rate limiter instance
 rate_limiter = RateLimiter()
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+HTTP Load Benchmark
+
+Seeds a scratch database with a production-sized dataset, serves it with
+gunicorn (app.server) and drives each endpoint with concurrent clients for a
+fixed time. Reports p50/p95/p99 latency, requests per second and SQL
+queries per request, and compares them with a saved baseline. Run from the
+backend directory:
+
+    python -m benchmarks.load --scale 0.05 --save-baseline small
+    python -m benchmarks.load --scale 0.05 --baseline small
+    python -m benchmarks.load --url http://staging:5000 --database-url postgresql://... --password ...
+
+The dataset is the same on every run (fixed random seed). Scratch SQLite
+databases are kept in the temp directory and reused by later runs of the
+same scale. Every run, --url ones included, deletes the devices it created
+and reopens the alerts it acknowledged when it finishes. With --url the
+database is otherwise only read: log in with an existing account.
+"""
+
+import argparse
+import ipaddress
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# Rows seeded at scale 1
+LOAD_SEED_ROWS = {'device': 20000, 'camera': 2000, 'alert': 2000000, 'notification_outbox': 20000}
+USERNAME = 'bench-admin'
+PASSWORD = 'bench-password'
+# Devices created by the benchmark get addresses from 100.64.0.0/10, away from the seeded ones
+CREATED_DEVICE_NETWORK = ipaddress.IPv4Network('100.64.0.0/10')
+
+DEFAULT_TOLERANCE = 0.25
+# Latency differences below this are noise, whatever the percentage
+LATENCY_NOISE_MS = 2.0
+
+
+class Endpoint:
+    """One request the benchmark repeats
+
+    path is formatted with the ids picked for each request (device_id,
+    camera_id, alert_id, page, n); body, if set, is a function of the same
+    ids. ok lists the statuses that count as success.
+    """
+
+    def __init__(self, name, method, path, body=None, ok=(200,)):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.ok = ok
+
+    def request(self, ids):
+        return self.method, self.path.format(**ids), self.body(ids) if self.body else None
+
+
+# Polls, camera tests and bulk requests (network probes), imports, deletes,
+# acknowledge-all, the archive, login and task long-polls are left out: they
+# probe or destroy data, or depend on Celery and rate limits rather than the API
+ENDPOINTS = [
+    Endpoint('health', 'GET', '/health'),
+    Endpoint('auth profile', 'GET', '/api/auth/profile'),
+    Endpoint('auth users', 'GET', '/api/auth/users'),
+    Endpoint('devices page', 'GET', '/api/devices/?limit=100&cursor={device_id}'),
+    Endpoint('devices by status', 'GET', '/api/devices/?status=offline&limit=100'),
+    Endpoint('device', 'GET', '/api/devices/{device_id}'),
+    Endpoint('devices status', 'GET', '/api/devices/status'),
+    Endpoint('devices export', 'GET', '/api/devices/export?format=csv'),
+    Endpoint('cameras page', 'GET', '/api/cameras/?limit=100&cursor={camera_id}'),
+    Endpoint('camera', 'GET', '/api/cameras/{camera_id}'),
+    Endpoint('camera stream', 'GET', '/api/cameras/{camera_id}/stream'),
+    Endpoint('cameras status', 'GET', '/api/cameras/status'),
+    Endpoint('alerts page', 'GET', '/api/alerts/?page={page}&per_page=50'),
+    Endpoint('alerts open', 'GET', '/api/alerts/?acknowledged=false&per_page=50'),
+    Endpoint('alerts critical', 'GET', '/api/alerts/?severity=critical&acknowledged=false&per_page=50'),
+    Endpoint('alert', 'GET', '/api/alerts/{alert_id}'),
+    Endpoint('alerts summary', 'GET', '/api/alerts/summary'),
+    Endpoint('report daily', 'GET', '/api/reports/daily'),
+    Endpoint('report weekly', 'GET', '/api/reports/weekly'),
+    Endpoint('report monthly', 'GET', '/api/reports/monthly'),
+    Endpoint('device create', 'POST', '/api/devices/', ok=(201,), body=lambda ids: {
+        'name': f"bench-{ids['n']}",
+        'ip_address': str(CREATED_DEVICE_NETWORK[ids['n'] % CREATED_DEVICE_NETWORK.num_addresses]),
+        'vendor': 'cisco',
+        'device_type': 'switch'
+    }),
+    # Writes the seeded name back, so repeated runs leave the data as it was
+    Endpoint('device update', 'PUT', '/api/devices/{device_id}', body=lambda ids: {
+        'name': f"device-{ids['device_id'] - 1}"
+    }),
+    # Most seeded alerts are acknowledged already; those answer 400 after the same lookup
+    Endpoint('alert acknowledge', 'POST', '/api/alerts/{alert_id}/acknowledge', ok=(200, 400)),
+]
+
+
+class Dataset:
+    """Row counts of the seeded database and the per-request ids drawn from them
+
+    acknowledged_before is the latest acknowledged_at before the run; alerts
+    acknowledged after it were acknowledged by the benchmark.
+    """
+
+    def __init__(self, counts, max_ids, acknowledged_before=None):
+        self.counts = counts
+        self.max_ids = max_ids
+        self.acknowledged_before = acknowledged_before
+        # Created devices are numbered after every device that exists already
+        self.created = itertools.count(max_ids['device'] + 1)
+
+    def ids(self, rng):
+        return {
+            'device_id': rng.randint(1, self.counts['device']),
+            'camera_id': rng.randint(1, self.counts['camera']),
+            'alert_id': rng.randint(1, self.max_ids['alert']),
+            'page': rng.randint(1, max(1, min(100, math.ceil(self.counts['alert'] / 50)))),
+            'n': next(self.created),
+        }
+
+
+def default_database_url(scale):
+    return f"sqlite:///{os.path.join(tempfile.gettempdir(), f'coll-load-{scale:g}.db')}"
+
+
+def prepare_database(database_url, scale=1.0, seed_data=True):
+    """Seed database_url unless it holds data already, and add the benchmark's admin user
+
+    With seed_data off the database is only read.
+    """
+    from sqlalchemy import create_engine, func, insert, inspect, select
+    from werkzeug.security import generate_password_hash
+    from app.models import User, Device, Camera, Alert
+    from app.query_plans import seed
+
+    engine = create_engine(database_url)
+    try:
+        has_data = inspect(engine).has_table('device')
+        if has_data:
+            with engine.connect() as conn:
+                has_data = conn.execute(select(func.count(Device.id))).scalar() > 0
+        if not has_data:
+            if not seed_data:
+                raise SystemExit(f'{database_url} has no data to benchmark; seed it first with --seed-only')
+            started = time.perf_counter()
+            counts = seed(engine, scale, rows=LOAD_SEED_ROWS)
+            print(f"Seeded {', '.join(f'{rows} {table}' for table, rows in counts.items())} "
+                  f"in {time.perf_counter() - started:.0f}s")
+
+        with engine.begin() as conn:
+            if seed_data and conn.execute(select(User.id).where(User.username == USERNAME)).first() is None:
+                conn.execute(insert(User).values(
+                    username=USERNAME, email=f'{USERNAME}@example.com',
+                    password_hash=generate_password_hash(PASSWORD), role='admin'
+                ))
+            counts, max_ids = {}, {}
+            for table, model in (('device', Device), ('camera', Camera), ('alert', Alert)):
+                counts[table], max_ids[table] = conn.execute(select(func.count(model.id), func.max(model.id))).one()
+            acknowledged_before = conn.execute(select(func.max(Alert.acknowledged_at))).scalar()
+    finally:
+        engine.dispose()
+    return Dataset(counts, max_ids, acknowledged_before)
+
+
+def restore_database(database_url, dataset):
+    """Undo the benchmark's writes, so the next run starts from the same data
+
+    Deletes the devices it created and reopens the alerts acknowledged since
+    dataset was prepared.
+    """
+    from sqlalchemy import create_engine, delete, update
+    from app.models import Alert, Device
+
+    acknowledged = Alert.acknowledged_at.is_not(None)
+    if dataset.acknowledged_before is not None:
+        acknowledged = Alert.acknowledged_at > dataset.acknowledged_before
+    engine = create_engine(database_url)
+    try:
+        with engine.begin() as conn:
+            conn.execute(delete(Device).where(Device.name.like('bench-%')))
+            conn.execute(update(Alert).where(acknowledged).values(acknowledged=False, acknowledged_at=None))
+    finally:
+        engine.dispose()
+
+
+def count_queries(database_url, endpoints, dataset, samples=3, username=USERNAME):
+    """Median SQL statements per request for each endpoint, measured in-process as username"""
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event
+    from app import create_app, db
+    from app.config import Config
+    from app.models import User
+
+    config = type('LoadConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': database_url, 'TESTING': True, 'RATELIMIT_ENABLED': False
+    })
+    app = create_app(config)
+    executed = [0]
+
+    def count(*args):
+        executed[0] += 1
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', count)
+        user = User.query.filter_by(username=username).one()
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(user.id), additional_claims={'role': user.role})}"}
+
+    client = app.test_client()
+    rng = random.Random(0)
+    queries = {}
+    try:
+        for endpoint in endpoints:
+            counts = []
+            # The first request fills per-process caches; the rest show the steady state
+            for sample in range(samples + 1):
+                method, path, body = endpoint.request(dataset.ids(rng))
+                before = executed[0]
+                response = client.open(path, method=method, json=body, headers=headers)
+                response.get_data()
+                response.close()
+                if sample:
+                    counts.append(executed[0] - before)
+            queries[endpoint.name] = sorted(counts)[len(counts) // 2]
+    finally:
+        with app.app_context():
+            for engine in db.engines.values():
+                event.remove(engine, 'before_cursor_execute', count)
+                engine.dispose()
+    return queries
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """The API under gunicorn on a free local port, for the duration of a with block"""
+
+    def __init__(self, database_url, profile='sync', workers=None):
+        self.database_url = database_url
+        self.profile = profile
+        self.workers = workers
+        self.port = _free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+
+    def __enter__(self):
+        import requests
+
+        # Run outside the source tree so the server's log file goes to a scratch directory
+        self.cwd = tempfile.TemporaryDirectory()
+        env = dict(
+            os.environ, PYTHONPATH=BACKEND_DIR, PYTHONWARNINGS='ignore', FLASK_ENV='production',
+            DATABASE_URL=self.database_url, RATELIMIT_ENABLED='false', SERVER_MAX_REQUESTS='0'
+        )
+        command = [sys.executable, '-m', 'app.server', '--profile', self.profile,
+                   '--bind', f'127.0.0.1:{self.port}']
+        if self.workers:
+            command += ['--workers', str(self.workers)]
+        self.log = open(os.path.join(self.cwd.name, 'server.log'), 'w+')
+        self.process = subprocess.Popen(command, cwd=self.cwd.name, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                if requests.get(f'{self.url}/health', timeout=5).status_code == 200:
+                    return self
+            except requests.RequestException:
+                time.sleep(0.5)
+        self.__exit__(None, None, None)
+        raise RuntimeError('The server did not start')
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        if exc[0] is not None or self.process.returncode not in (0, -15):
+            self.log.seek(0)
+            print(self.log.read()[-4000:], file=sys.stderr)
+        self.log.close()
+        self.cwd.cleanup()
+
+
+def login(base_url, username=USERNAME, password=PASSWORD):
+    import requests
+
+    response = requests.post(f'{base_url}/api/auth/login', json={'username': username, 'password': password}, timeout=30)
+    response.raise_for_status()
+    return {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted values"""
+    return values[max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def drive(base_url, headers, endpoint, dataset, clients=8, duration=5.0):
+    """Send endpoint's request from clients threads for duration seconds; latency and throughput stats"""
+    import requests
+
+    def client(index):
+        rng = random.Random(index)
+        latencies, errors = [], 0
+        with requests.Session() as session:
+            session.headers.update(headers)
+            while time.perf_counter() < deadline:
+                method, path, body = endpoint.request(dataset.ids(rng))
+                started = time.perf_counter()
+                try:
+                    response = session.request(method, base_url + path, json=body, timeout=60)
+                    response.content
+                except requests.RequestException:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                if response.status_code not in endpoint.ok:
+                    errors += 1
+        return latencies, errors
+
+    # Connections and caches warm up before the clock starts
+    warm = random.Random(-1)
+    with requests.Session() as session:
+        for _ in range(3):
+            method, path, body = endpoint.request(dataset.ids(warm))
+            session.request(method, base_url + path, json=body, headers=headers, timeout=60).content
+
+    started = time.perf_counter()
+    deadline = started + duration
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for result in results for latency in result[0])
+    stats = {
+        'requests': len(latencies),
+        'errors': sum(result[1] for result in results),
+        'rps': round(len(latencies) / elapsed, 1),
+    }
+    if latencies:
+        stats.update(
+            mean_ms=round(sum(latencies) / len(latencies), 2),
+            p50_ms=round(percentile(latencies, 50), 2),
+            p95_ms=round(percentile(latencies, 95), 2),
+            p99_ms=round(percentile(latencies, 99), 2),
+        )
+    return stats
+
+
+def run_benchmark(base_url, dataset, endpoints, clients=8, duration=5.0, headers=None, queries=None):
+    """Stats for every endpoint, in order"""
+    headers = headers or login(base_url)
+    results = {}
+    for endpoint in endpoints:
+        stats = drive(base_url, headers, endpoint, dataset, clients, duration)
+        stats['queries_per_request'] = (queries or {}).get(endpoint.name)
+        results[endpoint.name] = stats
+        print(format_row(endpoint.name, stats), flush=True)
+    return results
+
+
+def format_row(name, stats):
+    queries = stats.get('queries_per_request')
+    return (f"{name:20} {stats['requests']:8} {stats['rps']:9.1f} {stats.get('p50_ms', 0):9.1f} "
+            f"{stats.get('p95_ms', 0):9.1f} {stats.get('p99_ms', 0):9.1f} {'-' if queries is None else queries:>8} "
+            f"{stats['errors']:7}")
+
+
+def compare(result, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Regressions of result against baseline, as messages
+
+    p95 latency may grow and throughput shrink by tolerance (a fraction);
+    any extra query per request or any new error is a regression.
+    """
+    regressions = []
+    for name, stats in result['endpoints'].items():
+        base = baseline['endpoints'].get(name)
+        if base is None:
+            continue
+        if stats['errors'] and not base['errors']:
+            regressions.append(f"{name}: {stats['errors']} errors, baseline had none")
+        if 'p95_ms' in stats and 'p95_ms' in base and \
+                stats['p95_ms'] > base['p95_ms'] * (1 + tolerance) and stats['p95_ms'] - base['p95_ms'] > LATENCY_NOISE_MS:
+            regressions.append(f"{name}: p95 {stats['p95_ms']}ms, baseline {base['p95_ms']}ms")
+        if stats['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: {stats['rps']} requests/s, baseline {base['rps']}")
+        if None not in (stats['queries_per_request'], base['queries_per_request']) and \
+                stats['queries_per_request'] > base['queries_per_request']:
+            regressions.append(
+                f"{name}: {stats['queries_per_request']} queries per request, baseline {base['queries_per_request']}"
+            )
+    return regressions
+
+
+def baseline_path(name):
+    return name if name.endswith('.json') else os.path.join(BASELINE_DIR, f'{name}.json')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the API against a large synthetic dataset')
+    parser.add_argument('--scale', type=float, default=1.0, help='fraction of the full dataset (20k devices, 2M alerts)')
+    parser.add_argument('--database-url', help='database to seed and serve (default: a SQLite file in the temp directory)')
+    parser.add_argument('--url', help='benchmark this running server instead of starting one (never seeds or adds a user)')
+    parser.add_argument('--username', default=USERNAME, help='login for --url')
+    parser.add_argument('--password', default=PASSWORD, help='password for --url')
+    parser.add_argument('--profile', default='sync', help='server profile to start (see app.server)')
+    parser.add_argument('--workers', type=int, help='server workers (default: from the CPU count)')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent clients per endpoint')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per endpoint')
+    parser.add_argument('--endpoints', help='comma-separated endpoint names (default: all)')
+    parser.add_argument('--seed-only', action='store_true', help='seed the database and exit')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--save-baseline', metavar='NAME', help='save the results as benchmarks/baselines/NAME.json')
+    parser.add_argument('--baseline', metavar='NAME', help='compare with a saved baseline (name or path)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed p95 growth and throughput drop, as a fraction')
+    args = parser.parse_args()
+
+    endpoints = ENDPOINTS
+    if args.endpoints:
+        wanted = [name.strip() for name in args.endpoints.split(',')]
+        unknown = set(wanted) - {endpoint.name for endpoint in ENDPOINTS}
+        if unknown:
+            parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+        endpoints = [endpoint for endpoint in ENDPOINTS if endpoint.name in wanted]
+
+    database_url = args.database_url or (None if args.url else default_database_url(args.scale))
+    dataset = None
+    if database_url:
+        dataset = prepare_database(database_url, args.scale, seed_data=not args.url)
+        if args.seed_only:
+            return
+    if dataset is None:
+        raise SystemExit('--url needs --database-url to pick ids and count queries')
+
+    try:
+        print('Counting queries per request...', flush=True)
+        queries = count_queries(database_url, endpoints, dataset, username=args.username if args.url else USERNAME)
+        print(f"\n{'endpoint':20} {'requests':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'queries':>8} {'errors':>7}")
+        if args.url:
+            results = run_benchmark(args.url, dataset, endpoints, args.clients, args.duration,
+                                    headers=login(args.url, args.username, args.password), queries=queries)
+        else:
+            with Server(database_url, args.profile, args.workers) as server:
+                results = run_benchmark(server.url, dataset, endpoints, args.clients, args.duration, queries=queries)
+    finally:
+        restore_database(database_url, dataset)
+
+    result = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'rows': dataset.counts,
+            'server': args.url or f'gunicorn {args.profile}' + (f' x{args.workers}' if args.workers else ''),
+            'clients': args.clients,
+            'duration_seconds': args.duration,
+            'python': sys.version.split()[0],
+            'machine': f'{platform.machine()}, {os.cpu_count()} CPUs',
+        },
+        'endpoints': results,
+    }
+    for path in filter(None, (args.output, args.save_baseline and baseline_path(args.save_baseline))):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'\nSaved {path}')
+
+    failed = [name for name, stats in results.items() if stats['errors']]
+    if failed:
+        print(f"\n✗ Errors from {', '.join(failed)}")
+    if args.baseline:
+        with open(baseline_path(args.baseline)) as f:
+            baseline = json.load(f)
+        if baseline['meta']['rows'] != result['meta']['rows'] or baseline['meta']['clients'] != args.clients:
+            print('\nNote: the baseline used a different dataset or client count')
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'✗ {regression}')
+        if not regressions:
+            print(f"\n✓ No regressions against {args.baseline}")
+        failed = failed or regressions
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+
+Starts fresh interpreters and records how long `import app`, `create_app()`
+and the first request take, and which heavy optional modules got imported
+on the way. Run from the backend directory:
+
+    python -m benchmarks.startup --runs 5 --output startup.json
+    python -m benchmarks.startup --importtime 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed by some commands, tasks or endpoints; creating the app must not import them
+HEAVY_MODULES = ('celery', 'kombu', 'billiard', 'alembic', 'flask_migrate', 'requests', 'smtplib', 'waitress', 'gunicorn')
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app('app.config.Config')
+created = time.perf_counter()
+response = flask_app.test_client().get('/health')
+served = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - started,
+    'create_app_seconds': created - imported,
+    'first_request_seconds': served - created,
+    'status': response.status_code,
+    'heavy_modules': sorted(name for name in %r if name in sys.modules),
+}))
+'''
+
+
+def run_probe(extra_args=()):
+    # Run outside the source tree so the production log handler writes to a scratch directory
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, FLASK_ENV='production', PYTHONWARNINGS='ignore')
+    with tempfile.TemporaryDirectory() as cwd:
+        completed = subprocess.run(
+            [sys.executable, *extra_args, '-c', PROBE % (HEAVY_MODULES,)],
+            cwd=cwd, env=env, capture_output=True, text=True, check=True
+        )
+    return completed
+
+
+def measure_startup(runs=5):
+    """Median, min and max of each startup phase over runs fresh processes"""
+    samples = [json.loads(run_probe().stdout.strip().splitlines()[-1]) for _ in range(runs)]
+    result = {'runs': runs, 'python': sys.version.split()[0]}
+    for phase in ('import_seconds', 'create_app_seconds', 'first_request_seconds'):
+        values = [sample[phase] for sample in samples]
+        result[phase] = {
+            'median': round(statistics.median(values), 4),
+            'min': round(min(values), 4),
+            'max': round(max(values), 4),
+        }
+    totals = [sample['import_seconds'] + sample['create_app_seconds'] for sample in samples]
+    result['total_seconds'] = round(statistics.median(totals), 4)
+    result['heavy_modules'] = sorted({name for sample in samples for name in sample['heavy_modules']})
+    result['status'] = samples[-1]['status']
+    return result
+
+
+def top_imports(limit=15):
+    """The limit slowest imports (cumulative microseconds) from python -X importtime"""
+    rows = []
+    for line in run_probe(('-X', 'importtime')).stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure application startup time')
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes to measure')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--max-seconds', type=float, help='fail if import plus create_app takes longer')
+    parser.add_argument('--importtime', type=int, metavar='N', help='also list the N slowest imports')
+    args = parser.parse_args()
+
+    result = measure_startup(args.runs)
+    print(json.dumps(result, indent=2))
+    if args.importtime:
+        print(f"\nSlowest imports (cumulative):")
+        for cumulative, name in top_imports(args.importtime):
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    failed = False
+    if result['heavy_modules']:
+        print(f"\n✗ Startup imported {', '.join(result['heavy_modules'])}")
+        failed = True
+    if args.max_seconds is not None and result['total_seconds'] > args.max_seconds:
+        print(f"\n✗ Startup took {result['total_seconds']}s, budget {args.max_seconds}s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
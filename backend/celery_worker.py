@@ -8,6 +8,10 @@ for background task processing including device polling and alert notifications.
 Usage:
     celery -A celery_worker.celery worker --loglevel=info
     celery -A celery_worker.celery beat --loglevel=info (for scheduled tasks)
+
+Set CELERY_WORKER_PROFILE to polling, notifications or reporting to run a
+worker for that queue only, with the queue's concurrency and prefetch
+(default: all queues in one worker).
 """
 
 import os
@@ -24,8 +28,15 @@ logging.basicConfig(
 # Create Flask app with proper configuration
 app = create_app('app.config.Config')
 
-# Get the Celery instance from the app
-from app import celery
+# Get the Celery instance for the app
+from app import get_celery_app
+celery = get_celery_app(app)
+from app.celery_queues import apply_worker_profile
+
+# Consume the profile's queues with its concurrency and prefetch settings
+worker_profile = app.config['CELERY_WORKER_PROFILE']
+worker_queues = apply_worker_profile(celery, worker_profile, app.config['CELERY_QUEUE_SETTINGS'])
+logging.info(f"Celery worker profile '{worker_profile}': queues {', '.join(worker_queues)}")
 
 # Configure Celery beat schedule for periodic tasks
 celery.conf.beat_schedule = {
@@ -37,9 +48,25 @@ celery.conf.beat_schedule = {
         'task': 'app.services.poller.poll_all_cameras',
         'schedule': crontab(minute='*/10'),  # Every 10 minutes
     },
+    'build-daily-rollups': {
+        'task': 'app.services.reporting.build_daily_rollups',
+        'schedule': crontab(hour=0, minute=5),  # Daily at 00:05
+    },
     'send-daily-summary': {
         'task': 'app.services.alerting.send_daily_summary',
-        'schedule': crontab(hour=0, minute=0),  # Daily at midnight
+        'schedule': crontab(hour=0, minute=15),  # Daily at 00:15, after the rollups
+    },
+    'drain-notification-outbox': {
+        'task': 'app.services.alerting.drain_notification_outbox',
+        'schedule': 10.0,  # Every 10 seconds
+    },
+    'purge-expired-alerts': {
+        'task': 'app.services.retention.purge_expired_alerts',
+        'schedule': crontab(minute=15),  # Hourly
+    },
+    'maintain-alert-partitions': {
+        'task': 'app.services.retention.maintain_alert_partitions',
+        'schedule': crontab(hour=1, minute=0),  # Daily at 01:00
     },
 }
 
@@ -49,6 +76,8 @@ celery.conf.timezone = 'UTC'
 with app.app_context():
     import app.services.poller
     import app.services.alerting
+    import app.services.retention
+    import app.services.reporting
     logging.info("Celery tasks imported successfully")
 
 if __name__ == '__main__':
@@ -0,0 +1,9 @@
+"""
+Gunicorn configuration, read by `gunicorn run:app` from this directory
+
+Uses the same SERVER_* settings and profile as `python -m app.server`.
+"""
+
+from app.server import gunicorn_settings, load_config, post_fork  # noqa: F401 post_fork is a gunicorn hook
+
+globals().update(gunicorn_settings(load_config()))
@@ -0,0 +1,56 @@
+"""add alert dedup columns
+
+Revision ID: 2b7f4e1c9d05
+Revises:
+Create Date: 2026-10-19 10:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b7f4e1c9d05'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _columns():
+    return [
+        sa.Column('dedup_key', sa.String(length=128), nullable=True),
+        sa.Column('occurrences', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('last_seen_at', sa.DateTime(), nullable=True),
+    ]
+
+
+def _alert_columns():
+    inspector = sa.inspect(op.get_bind())
+    if 'alert' not in inspector.get_table_names():
+        return None
+    return {column['name'] for column in inspector.get_columns('alert')}
+
+
+def upgrade():
+    # Databases created with db.create_all() after these columns were added have them already
+    existing = _alert_columns()
+    if existing is None:
+        return
+
+    added = False
+    for column in _columns():
+        if column.name not in existing:
+            op.add_column('alert', column)
+            added = True
+    if added:
+        # Each existing alert counts once and was last seen when it was raised
+        op.execute("UPDATE alert SET occurrences = 1 WHERE occurrences IS NULL")
+        op.execute("UPDATE alert SET last_seen_at = created_at WHERE last_seen_at IS NULL")
+
+
+def downgrade():
+    existing = _alert_columns() or set()
+    with op.batch_alter_table('alert') as batch_op:
+        for column in reversed(_columns()):
+            if column.name in existing:
+                batch_op.drop_column(column.name)
@@ -0,0 +1,78 @@
+"""add hot query indexes
+
+Revision ID: 4c2d9e71a0b3
+Revises: 2b7f4e1c9d05
+Create Date: 2026-10-19 10:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c2d9e71a0b3'
+down_revision = '2b7f4e1c9d05'
+branch_labels = None
+depends_on = None
+
+OPEN_ALERT_PREDICATE = sa.text('NOT acknowledged')
+
+# (name, table, columns, options) as declared on the models
+INDEXES = [
+    ('ix_device_ip_address', 'device', ['ip_address'], {}),
+    ('ix_device_status_id', 'device', ['status', 'id'], {}),
+    ('ix_camera_ip_address', 'camera', ['ip_address'], {}),
+    ('ix_camera_status_id', 'camera', ['status', 'id'], {}),
+    ('ix_alert_created_at', 'alert', ['created_at'], {}),
+    ('ix_alert_acknowledged_created_at', 'alert', ['acknowledged', 'created_at'], {}),
+    ('ix_alert_severity_acknowledged_created_at', 'alert', ['severity', 'acknowledged', 'created_at'], {}),
+    ('ix_alert_device_id', 'alert', ['device_id'], {}),
+    ('ix_alert_open_dedup_key', 'alert', ['dedup_key'],
+     {'unique': True, 'sqlite_where': OPEN_ALERT_PREDICATE, 'postgresql_where': OPEN_ALERT_PREDICATE}),
+    ('ix_notification_outbox_status_id', 'notification_outbox', ['status', 'id'], {}),
+    ('ix_alert_daily_rollup_day', 'alert_daily_rollup', ['day', 'severity'], {}),
+    ('ix_status_snapshot_day', 'status_snapshot', ['day', 'kind'], {}),
+]
+
+
+def _existing_indexes():
+    inspector = sa.inspect(op.get_bind())
+    return {
+        table: {index['name'] for index in inspector.get_indexes(table)}
+        for table in inspector.get_table_names()
+    }
+
+
+def _is_partitioned(table):
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return False
+    relkind = bind.execute(sa.text('SELECT relkind FROM pg_class WHERE relname = :name'), {'name': table}).scalar()
+    return relkind == 'p'
+
+
+def upgrade():
+    # Databases created with db.create_all() already have some or all of these
+    existing = _existing_indexes()
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    for name, table, columns, options in INDEXES:
+        if table not in existing or name in existing[table]:
+            continue
+        partitioned = _is_partitioned(table)
+        if partitioned and options.get('unique'):
+            # Unique indexes on a partitioned table must include the partition key
+            continue
+        if postgresql and not partitioned:
+            # Build without blocking writes to large tables
+            with op.get_context().autocommit_block():
+                op.create_index(name, table, columns, postgresql_concurrently=True, **options)
+        else:
+            op.create_index(name, table, columns, **options)
+
+
+def downgrade():
+    existing = _existing_indexes()
+    for name, table, _, _ in reversed(INDEXES):
+        if name in existing.get(table, ()):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Alert Deduplication Test
+
+Repeats of an open condition bump one alert's occurrence counter, through
+the upsert and through the locking fallback, and the migrations add the
+dedup columns to an alert table created before they existed. With alert
+partitioning on, the fallback is used and serializes on the dedup key;
+set TEST_POSTGRES_URL to a scratch PostgreSQL database to race it for real.
+"""
+
+import os
+import tempfile
+import threading
+from datetime import datetime
+from unittest import mock
+from flask_migrate import Migrate, upgrade
+from sqlalchemy import event, inspect, text
+from app import create_app, db
+from app.config import Config
+from app.models import Alert, Device
+import app.services.alerting as alerting
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# The alert table as db.create_all() made it before deduplication
+BASELINE_ALERT_TABLE = '''
+CREATE TABLE alert (
+    id INTEGER NOT NULL PRIMARY KEY,
+    device_id INTEGER REFERENCES device (id),
+    severity VARCHAR(20),
+    message VARCHAR(255),
+    created_at DATETIME,
+    acknowledged BOOLEAN,
+    acknowledged_at DATETIME
+)
+'''
+
+
+def _make_app(database_url='sqlite://', **config):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        TESTING = True
+        REDIS_URL = None
+    for name, value in config.items():
+        setattr(TestConfig, name, value)
+    return create_app(TestConfig)
+
+
+def _check_counting():
+    device = Device(name='switch', ip_address='10.0.0.1')
+    db.session.add(device)
+    db.session.commit()
+    key = alerting.make_dedup_key('device', device.id, 'offline')
+
+    first_id, created = alerting.raise_alert('high', 'down', device.id, dedup_key=key)
+    assert created
+    for _ in range(3):
+        alert_id, created = alerting.raise_alert('high', 'still down', device.id, dedup_key=key)
+        assert alert_id == first_id and not created
+    db.session.commit()
+
+    alert = db.session.get(Alert, first_id)
+    assert alert.occurrences == 4 and alert.message == 'down'
+    assert alert.last_seen_at >= alert.created_at
+
+    # Once acknowledged, the condition opens a new alert
+    alert.acknowledged = True
+    db.session.commit()
+    second_id, created = alerting.raise_alert('high', 'down again', device.id, dedup_key=key)
+    db.session.commit()
+    assert created and second_id != first_id
+    assert db.session.get(Alert, second_id).occurrences == 1
+
+    # Alerts without a key are never merged
+    ids = {alerting.raise_alert('low', 'note', device.id)[0] for _ in range(2)}
+    db.session.commit()
+    assert len(ids) == 2
+
+
+def test_upsert_counts_occurrences():
+    """ON CONFLICT upsert: one open alert per key, repeats counted"""
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        _check_counting()
+
+
+def test_fallback_counts_occurrences():
+    """Dialects without the upsert lock the open alert and count on it"""
+    app = _make_app()
+    dialects = alerting.UPSERT_DIALECTS
+    alerting.UPSERT_DIALECTS = {}
+    try:
+        with app.app_context():
+            db.create_all()
+            _check_counting()
+    finally:
+        alerting.UPSERT_DIALECTS = dialects
+
+
+def test_partitioned_fallback_locks_the_key():
+    """With partitioning active the fallback runs and takes the dedup key lock before each select"""
+    app = _make_app()
+    locks = alerting.DEDUP_KEY_LOCKS
+    alerting.DEDUP_KEY_LOCKS = {'sqlite': 'SELECT :key'}
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    try:
+        with app.app_context(), \
+                mock.patch('app.services.retention.is_partitioning_active', return_value=True):
+            db.create_all()
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                _check_counting()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+    finally:
+        alerting.DEDUP_KEY_LOCKS = locks
+
+    assert not any('ON CONFLICT' in statement for statement in statements)
+    selects = [index for index, statement in enumerate(statements)
+               if statement.startswith('SELECT') and 'alert.dedup_key =' in statement]
+    # One initial raise, three repeats and one after acknowledging
+    assert len(selects) == 5
+    assert all(statements[index - 1] == 'SELECT ?' for index in selects)
+
+
+def test_postgres_concurrent_fallback():
+    """Racing pollers on a partitioned setup open exactly one alert for a key"""
+    database_url = os.environ.get('TEST_POSTGRES_URL')
+    if not database_url:
+        print('TEST_POSTGRES_URL not set, skipping the PostgreSQL dedup race test')
+        return
+
+    app = _make_app(database_url, ALERT_PARTITIONING_ENABLED=True)
+    threads_count = 8
+    barrier = threading.Barrier(threads_count)
+    errors = []
+
+    def poll(device_id, key):
+        try:
+            with app.app_context():
+                barrier.wait()
+                alerting.raise_alert('high', 'down', device_id, dedup_key=key)
+                db.session.commit()
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            # As on the partitioned table, no unique index backs the dedup key
+            db.session.execute(text('DROP INDEX ix_alert_open_dedup_key'))
+            db.session.execute(text('CREATE INDEX ix_alert_open_dedup_key ON alert (dedup_key) WHERE NOT acknowledged'))
+            device = Device(name='switch', ip_address='10.0.0.1')
+            db.session.add(device)
+            db.session.commit()
+            device_id = device.id
+            key = alerting.make_dedup_key('device', device_id, 'offline')
+
+        threads = [threading.Thread(target=poll, args=(device_id, key)) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+
+        with app.app_context():
+            alerts = Alert.query.filter_by(dedup_key=key).all()
+            assert len(alerts) == 1 and alerts[0].occurrences == threads_count
+    finally:
+        with app.app_context():
+            db.session.rollback()
+            db.drop_all()
+            db.engine.dispose()
+
+
+def test_migration_adds_dedup_columns():
+    """Upgrading a pre-deduplication database adds and backfills the columns, then indexes them"""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app = _make_app(f'sqlite:///{path}')
+    Migrate(app, db)
+    created_at = datetime(2024, 1, 2, 3, 4, 5)
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.execute(text('DROP TABLE alert'))
+            db.session.execute(text(BASELINE_ALERT_TABLE))
+            db.session.execute(text(
+                "INSERT INTO alert (severity, message, created_at, acknowledged) VALUES ('high', 'old', :at, 0)"
+            ), {'at': created_at})
+            db.session.commit()
+
+            upgrade(directory=MIGRATIONS_DIR)
+
+            inspector = inspect(db.engine)
+            columns = {column['name'] for column in inspector.get_columns('alert')}
+            assert {'dedup_key', 'occurrences', 'last_seen_at'} <= columns
+            assert 'ix_alert_open_dedup_key' in {index['name'] for index in inspector.get_indexes('alert')}
+
+            old = Alert.query.one()
+            assert old.occurrences == 1 and old.last_seen_at == created_at and old.dedup_key is None
+            db.session.rollback()
+            _check_counting()
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    test_upsert_counts_occurrences()
+    test_fallback_counts_occurrences()
+    test_partitioned_fallback_locks_the_key()
+    test_postgres_concurrent_fallback()
+    test_migration_adds_dedup_columns()
+    print("✓ Alert deduplication OK")
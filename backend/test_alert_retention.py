@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Alert Retention Test
+
+Purges expired alerts in batches into the NDJSON archive, reads them back
+through the archive index, and checks which monthly partitions expire.
+Set TEST_POSTGRES_URL to a scratch PostgreSQL database to also convert the
+alert table to partitions and maintain them.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app import create_app, db
+from app.config import Config
+from app.models import Alert, Device
+from app.services.retention import ARCHIVE_INDEX_FILE, expired_partitions, get_retention_filter, \
+    load_archived_alerts, purge_alert_batches, read_archive_index
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+
+
+def _make_app(archive_dir, database_url='sqlite://'):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        TESTING = True
+        REDIS_URL = None
+        ALERT_ARCHIVE_DIR = archive_dir
+        ALERT_RETENTION_ACKNOWLEDGED_DAYS = 30
+        ALERT_RETENTION_UNACKNOWLEDGED_DAYS = 180
+    return create_app(TestConfig)
+
+
+def _seed_alerts():
+    devices = [Device(name=f'device-{i}', ip_address=f'10.0.0.{i}') for i in range(1, 3)]
+    db.session.add_all(devices)
+    db.session.flush()
+    alerts = []
+    # 23 acknowledged alerts past the 30 day cutoff, one a day from 40 days ago
+    for i in range(23):
+        created_at = NOW - timedelta(days=40 + i)
+        alerts.append(Alert(device_id=devices[i % 2].id, severity='low', message=f'old {i}', created_at=created_at,
+                            acknowledged=True, acknowledged_at=created_at, dedup_key=f'old:{i}'))
+    # Kept: recent acknowledged alerts and an old alert that is still open
+    for i in range(4):
+        alerts.append(Alert(device_id=devices[0].id, severity='low', message=f'new {i}',
+                            created_at=NOW - timedelta(days=i), acknowledged=True, dedup_key=f'new:{i}'))
+    alerts.append(Alert(device_id=devices[1].id, severity='high', message='open', created_at=NOW - timedelta(days=100),
+                        acknowledged=False, dedup_key='open'))
+    db.session.add_all(alerts)
+    db.session.commit()
+    return devices
+
+
+def test_purge_archives_in_batches():
+    """Expired alerts are archived and deleted batch by batch; everything else stays"""
+    archive_dir = tempfile.mkdtemp()
+    app = _make_app(archive_dir)
+    try:
+        with app.app_context():
+            db.create_all()
+            _seed_alerts()
+            criteria = get_retention_filter(NOW)
+
+            first = purge_alert_batches(criteria, archive=True, batch_size=10, max_batches=1)
+            assert first == {'purged': 10, 'batches': 1}
+            rest = purge_alert_batches(criteria, archive=True, batch_size=10)
+            assert rest == {'purged': 13, 'batches': 2}
+
+            remaining = Alert.query.order_by(Alert.id).all()
+            assert sorted(alert.message for alert in remaining) == ['new 0', 'new 1', 'new 2', 'new 3', 'open']
+
+        entries = list(read_archive_index(archive_dir))
+        assert [entry['count'] for entry in entries] == [10, 10, 3]
+        archived_ids = []
+        for entry in entries:
+            with gzip.open(os.path.join(archive_dir, entry['file']), 'rt', encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f]
+            ids = [row['id'] for row in rows]
+            assert (min(ids), max(ids)) == (entry['min_id'], entry['max_id'])
+            assert min(row['created_at'] for row in rows) == entry['min_created_at']
+            archived_ids.extend(ids)
+        assert sorted(archived_ids) == list(range(1, 24))
+    finally:
+        shutil.rmtree(archive_dir)
+
+
+def test_purge_without_archive():
+    """Purge mode deletes without writing archive files"""
+    archive_dir = tempfile.mkdtemp()
+    app = _make_app(archive_dir)
+    try:
+        with app.app_context():
+            db.create_all()
+            _seed_alerts()
+            result = purge_alert_batches(get_retention_filter(NOW), archive=False, batch_size=50)
+            assert result == {'purged': 23, 'batches': 1}
+            assert Alert.query.count() == 5
+        assert not os.path.exists(os.path.join(archive_dir, ARCHIVE_INDEX_FILE))
+    finally:
+        shutil.rmtree(archive_dir)
+
+
+def test_archive_index_lookups():
+    """Archive lookups filter by id, device and time, and only open files the index points at"""
+    archive_dir = tempfile.mkdtemp()
+    app = _make_app(archive_dir)
+    try:
+        with app.app_context():
+            db.create_all()
+            devices = _seed_alerts()
+            purge_alert_batches(get_retention_filter(NOW), archive=True, batch_size=10)
+
+            entries = list(read_archive_index(archive_dir))
+            assert [alert['id'] for alert in load_archived_alerts(alert_id=15)] == [15]
+            by_device = list(load_archived_alerts(device_id=devices[1].id))
+            assert by_device and all(alert['device_id'] == devices[1].id for alert in by_device)
+
+            start, end = NOW - timedelta(days=45), NOW - timedelta(days=42)
+            window = list(load_archived_alerts(start=start, end=end))
+            assert sorted(alert['message'] for alert in window) == ['old 3', 'old 4', 'old 5']
+
+            # Alerts 1-10 are in the first file: removing the others must not matter
+            for entry in entries[1:]:
+                os.remove(os.path.join(archive_dir, entry['file']))
+            assert [alert['id'] for alert in load_archived_alerts(alert_id=7)] == [7]
+    finally:
+        shutil.rmtree(archive_dir)
+
+
+def test_expired_partitions():
+    """Only months that ended before the cutoff are dropped"""
+    partitions = [(f'alert_p2024{month:02d}', datetime(2024, month, 1)) for month in range(1, 7)]
+    expired = expired_partitions(partitions, datetime(2024, 4, 1))
+    assert [name for name, _ in expired] == ['alert_p202401', 'alert_p202402', 'alert_p202403']
+    assert expired_partitions(partitions, datetime(2024, 1, 31)) == []
+
+
+def test_postgres_partitioning():
+    """Converting to partitions keeps every alert, including ones without created_at, and its indexes"""
+    database_url = os.environ.get('TEST_POSTGRES_URL')
+    if not database_url:
+        print('TEST_POSTGRES_URL not set, skipping the PostgreSQL partitioning test')
+        return
+
+    from app.services.retention import drop_expired_partitions, enable_alert_partitioning, \
+        ensure_alert_partitions, list_alert_partitions
+
+    archive_dir = tempfile.mkdtemp()
+    app = _make_app(archive_dir, database_url)
+    try:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            _seed_alerts()
+            db.session.execute(text("UPDATE alert SET created_at = NULL WHERE message = 'new 0'"))
+            db.session.commit()
+
+            result = enable_alert_partitioning()
+            assert result['status'] == 'partitioned'
+            assert result['rows_copied'] == 28 and result['created_at_backfilled'] == 1
+            assert Alert.query.count() == 28
+            assert Alert.query.filter_by(message='new 0').one().created_at is not None
+            indexes = set(db.session.execute(text(
+                "SELECT indexname FROM pg_indexes WHERE tablename = 'alert'"
+            )).scalars())
+            assert {index.name for index in Alert.__table__.indexes} <= indexes
+            assert db.session.execute(text(
+                "SELECT confrelid::regclass::text FROM pg_constraint "
+                "WHERE conrelid = 'alert'::regclass AND contype = 'f'"
+            )).scalars().all() == ['device']
+
+            ensure_alert_partitions(months_ahead=2)
+            months = [month for _, month in list_alert_partitions()]
+            this_month = datetime(datetime.utcnow().year, datetime.utcnow().month, 1)
+            assert this_month in months and len([m for m in months if m > this_month]) >= 2
+
+            app.config['ALERT_RETENTION_UNACKNOWLEDGED_DAYS'] = 30
+            oldest = months[0]
+            dropped = drop_expired_partitions(archive=True, now=datetime.utcnow())
+            assert dropped['dropped'] and dropped['dropped'][0] == f'alert_p{oldest:%Y%m}'
+            assert dropped['archived'] == sum(entry['count'] for entry in read_archive_index(archive_dir))
+    finally:
+        with app.app_context():
+            db.session.rollback()
+            db.session.execute(text('DROP TABLE IF EXISTS alert CASCADE'))
+            db.session.commit()
+            db.drop_all()
+        shutil.rmtree(archive_dir)
+
+
+if __name__ == '__main__':
+    test_purge_archives_in_batches()
+    test_purge_without_archive()
+    test_archive_index_lookups()
+    test_expired_partitions()
+    test_postgres_partitioning()
+    print("✓ Alert retention OK")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Bulk Device Action Test
+
+Bulk update, delete and poll select devices by id list or filter, reject
+malformed id lists (including JSON booleans) and enforce the admin-only
+delete.
+"""
+
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.config import Config
+from app.models import Alert, Device, User
+from app.services import bulk
+
+BAD_IDS = ([True], [1, False], [1, '2'], [1.0], [], 'all', [None])
+
+
+def _make_app():
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        TESTING = True
+        REDIS_URL = None
+        RATELIMIT_ENABLED = False
+    return create_app(TestConfig)
+
+
+def _setup():
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        users = [User(username=role, email=f'{role}@example.com', password_hash='-', role=role)
+                 for role in ('admin', 'operator')]
+        db.session.add_all(users)
+        db.session.add_all([
+            Device(name=f'device-{i}', ip_address=f'10.0.0.{i}', vendor='cisco' if i <= 3 else 'juniper',
+                   status='online')
+            for i in range(1, 7)
+        ])
+        db.session.commit()
+        db.session.add(Alert(device_id=1, severity='high', message='down'))
+        db.session.commit()
+        headers = {
+            user.role: {'Authorization': 'Bearer ' + create_access_token(
+                identity=str(user.id), additional_claims={'role': user.role})}
+            for user in users
+        }
+    client = app.test_client()
+    return app, lambda body, role='operator': client.post('/api/devices/bulk', json=body, headers=headers[role])
+
+
+def test_bool_and_malformed_ids_rejected():
+    """true/false and other non-integer ids are a 400 for every action"""
+    app, post = _setup()
+    for action in bulk.BULK_ACTIONS:
+        for ids in BAD_IDS:
+            body = {'action': action, 'ids': ids, 'values': {'vendor': 'hp'}}
+            response = post(body, 'admin')
+            assert response.status_code == 400, (action, ids)
+            assert response.get_json()['msg'] == 'ids must be a non-empty list of device IDs'
+    with app.app_context():
+        assert Device.query.count() == 6 and Device.query.filter_by(vendor='hp').count() == 0
+
+
+def test_bulk_update():
+    """Updates the selected devices only, and only the allowed fields"""
+    app, post = _setup()
+    response = post({'action': 'update', 'ids': [1, 2, 99], 'values': {'vendor': 'hp', 'meta': {'rack': 2}}})
+    assert response.status_code == 200 and response.get_json()['count'] == 2
+
+    response = post({'action': 'update', 'filter': {'vendor': 'juniper'}, 'values': {'device_type': 'router'}})
+    assert response.get_json()['count'] == 3
+
+    assert post({'action': 'update', 'ids': [1], 'values': {'name': 'x'}}).status_code == 400
+    assert post({'action': 'update', 'ids': [1], 'values': {'vendor': 5}}).status_code == 400
+    assert post({'action': 'update', 'filter': {'owner': 'me'}, 'values': {'vendor': 'x'}}).status_code == 400
+    with app.app_context():
+        assert {d.id for d in Device.query.filter_by(vendor='hp')} == {1, 2}
+        assert db.session.get(Device, 1).meta == {'rack': 2}
+        assert {d.id for d in Device.query.filter_by(device_type='router')} == {4, 5, 6}
+
+
+def test_bulk_delete():
+    """Only admins may delete; alerts of deleted devices are kept without a device"""
+    app, post = _setup()
+    assert post({'action': 'delete', 'ids': [1, 2]}).status_code == 403
+
+    response = post({'action': 'delete', 'ids': [1, 2]}, 'admin')
+    assert response.status_code == 200 and response.get_json()['count'] == 2
+    assert post({'action': 'delete', 'filter': {'vendor': ['cisco']}}, 'admin').get_json()['count'] == 1
+    with app.app_context():
+        assert sorted(d.id for d in Device.query) == [4, 5, 6]
+        assert Alert.query.one().device_id is None
+
+
+def test_bulk_poll():
+    """Queues the selected device ids as one job, falling back to the background executor"""
+    app, post = _setup()
+    with mock.patch.object(bulk, 'enqueue_bulk_poll', return_value='job-1') as enqueue:
+        response = post({'action': 'poll', 'filter': {'vendor': 'juniper'}})
+        assert response.status_code == 202
+        assert response.get_json() == {'msg': 'Polling initiated', 'action': 'poll', 'count': 3, 'job_id': 'job-1'}
+        enqueue.assert_called_once_with([4, 5, 6])
+
+        response = post({'action': 'poll', 'ids': [99]})
+        assert response.get_json()['count'] == 0 and response.get_json()['job_id'] is None
+
+    with mock.patch.object(bulk, 'enqueue_bulk_poll', side_effect=ConnectionError('no broker')), \
+            mock.patch.object(bulk, 'start_background_poll', return_value=(1, 1)) as background:
+        response = post({'action': 'poll', 'ids': [2, 1]})
+        assert response.status_code == 202
+        assert response.get_json()['count'] == 1 and response.get_json()['rejected'] == 1
+        background.assert_called_once_with([1, 2])
+
+    with mock.patch.object(bulk, 'enqueue_bulk_poll', side_effect=ConnectionError('no broker')), \
+            mock.patch.object(bulk, 'start_background_poll', return_value=(0, 2)):
+        response = post({'action': 'poll', 'ids': [1, 2]})
+        assert response.status_code == 503 and response.headers['Retry-After'] == '5'
+
+
+if __name__ == '__main__':
+    test_bool_and_malformed_ids_rejected()
+    test_bulk_update()
+    test_bulk_delete()
+    test_bulk_poll()
+    print("✓ Bulk device actions OK")
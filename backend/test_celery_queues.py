@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Celery Queue Routing Test
+
+Every registered task, Celery's built-ins included, is routed to a queue
+that some worker consumes, both with the default 'all' profile and with
+one worker per queue. Bulk poll chunks go to the polling queue.
+"""
+
+from app import create_app, make_celery
+from app.celery_queues import DEFAULT_QUEUE, TASK_QUEUES, apply_worker_profile
+from app.config import Config
+
+
+def _make_celery():
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        TESTING = True
+        REDIS_URL = None
+        RATELIMIT_ENABLED = False
+    app = create_app(TestConfig)
+    celery_app = make_celery(app)
+    celery_app.loader.import_default_modules()
+    return app, celery_app
+
+
+def _queue(celery_app, name, options=None):
+    return celery_app.amqp.router.route(dict(options or {}), name)['queue'].name
+
+
+def _consumed(celery_app, profiles, queue_settings):
+    queues = set()
+    for profile in profiles:
+        queues.update(apply_worker_profile(celery_app, profile, queue_settings))
+    return queues
+
+
+def test_every_task_reaches_a_worker():
+    """Each registered task's queue is consumed by the 'all' profile and by the per-queue profiles"""
+    app, celery_app = _make_celery()
+    settings = app.config['CELERY_QUEUE_SETTINGS']
+    names = sorted(celery_app.tasks)
+    assert set(TASK_QUEUES) - {'celery.chunks', 'celery.starmap'} <= {n for n in names if n.startswith('app.')}
+
+    all_queues = _consumed(celery_app, ['all'], settings)
+    per_queue = _consumed(celery_app, sorted(settings), settings)
+    for name in names:
+        queue = _queue(celery_app, name)
+        assert queue in all_queues and queue in per_queue, (name, queue)
+    assert DEFAULT_QUEUE in per_queue
+
+
+def test_bulk_poll_chunks_use_the_polling_queue():
+    """The chunk tasks of a bulk poll are routed to polling, with its time limits"""
+    app, celery_app = _make_celery()
+    from app.services.poller import poll_device_task
+
+    job = poll_device_task.chunks([(device_id,) for device_id in range(1, 45)], 20).group()
+    assert len(job.tasks) == 3
+    for signature in job.tasks:
+        assert signature.task == 'celery.starmap'
+        assert _queue(celery_app, signature.task, signature.options) == 'polling'
+    starmap = celery_app.tasks['celery.starmap']
+    assert starmap.soft_time_limit == app.config['CELERY_QUEUE_SETTINGS']['polling']['soft_time_limit']
+
+
+if __name__ == '__main__':
+    test_every_task_reaches_a_worker()
+    test_bulk_poll_chunks_use_the_polling_queue()
+    print("✓ Celery queue routing OK")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Response Compression Test
+
+Text responses are gzipped for clients that accept it, streamed bodies are
+compressed and flushed as they are produced, and the skip rules (small
+bodies, event streams, binary types, existing Content-Encoding, 204/206/304,
+HEAD, no-transform, file passthrough) leave responses untouched. Strong
+ETags get the encoding appended; weak ones are kept.
+"""
+
+import gzip
+import json
+import zlib
+from unittest import mock
+from flask import Response, request
+from app import create_app
+from app import compression
+from app.compression import STREAM_FLUSH_BYTES, compress_response
+from app.config import Config
+
+BODY = json.dumps([{'id': i, 'name': f'device-{i}', 'status': 'online'} for i in range(100)])
+
+
+def _make_app(**config):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        TESTING = True
+        REDIS_URL = None
+        RATELIMIT_ENABLED = False
+    for name, value in config.items():
+        setattr(TestConfig, name, value)
+    return create_app(TestConfig)
+
+
+def _compress(app, response, accept='gzip, deflate', method='GET'):
+    headers = {'Accept-Encoding': accept} if accept else {}
+    with app.test_request_context('/', method=method, headers=headers):
+        return compress_response(response)
+
+
+def test_gzip():
+    """Large text bodies are gzipped and vary on Accept-Encoding"""
+    app = _make_app()
+    response = _compress(app, Response(BODY, mimetype='application/json'))
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    data = response.get_data()
+    assert int(response.headers['Content-Length']) == len(data) < len(BODY)
+    assert gzip.decompress(data).decode() == BODY
+
+    # Through the app as a whole
+    response = app.test_client().get('/health', headers={'Accept-Encoding': 'gzip'})
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_skip_rules():
+    """Responses that shouldn't or can't be compressed are left as they are"""
+    app = _make_app()
+    skipped = [
+        (Response(BODY, mimetype='text/event-stream'), {}),
+        (Response(b'\x89PNG' * 200, mimetype='image/png'), {}),
+        (Response(BODY, mimetype='application/json', headers={'Content-Encoding': 'br'}), {}),
+        (Response(BODY, status=206, mimetype='text/csv'), {}),
+        (Response(status=304, mimetype='application/json'), {}),
+        (Response(status=204, mimetype='application/json'), {}),
+        (Response(BODY, mimetype='application/json'), {'method': 'HEAD'}),
+        (Response(BODY, mimetype='application/json', headers={'Cache-Control': 'no-transform'}), {}),
+        (Response(BODY, mimetype='application/json'), {'accept': None}),
+        (Response(BODY, mimetype='application/json'), {'accept': 'gzip;q=0, identity'}),
+        (Response('{"ok": true}', mimetype='application/json'), {}),
+    ]
+    for response, options in skipped:
+        body = response.get_data()
+        response = _compress(app, response, **options)
+        assert response.headers.get('Content-Encoding') in (None, 'br'), response
+        assert response.get_data() == body
+
+    response = Response(BODY, mimetype='text/css')
+    response.direct_passthrough = True
+    assert 'Content-Encoding' not in _compress(app, response).headers
+
+    app = _make_app(COMPRESS_ENABLED=False)
+    assert 'Content-Encoding' not in _compress(app, Response(BODY, mimetype='application/json')).headers
+
+
+def test_etags():
+    """A strong ETag gets the encoding appended; a weak one stays as it is"""
+    app = _make_app()
+    response = Response(BODY, mimetype='text/javascript')
+    response.set_etag('abc')
+    assert _compress(app, response).get_etag() == ('abc-gzip', False)
+
+    response = Response(BODY, mimetype='application/json')
+    response.set_etag('1-2', weak=True)
+    assert _compress(app, response).get_etag() == ('1-2', True)
+
+    # Not compressed, not renamed
+    response = Response('{}', mimetype='application/json')
+    response.set_etag('abc')
+    assert _compress(app, response).get_etag() == ('abc', False)
+
+
+def test_streamed():
+    """Streamed bodies are compressed as produced, flushed every STREAM_FLUSH_BYTES, and closed"""
+    app = _make_app()
+    produced = []
+    closed = []
+    line = ('x' * 1023 + '\n').encode()
+
+    class Rows:
+        def __iter__(self):
+            for i in range(200):
+                produced.append(i)
+                yield line
+
+        def close(self):
+            closed.append(True)
+
+    response = _compress(app, Response(Rows(), mimetype='application/x-ndjson'))
+    assert response.headers['Content-Encoding'] == 'gzip' and 'Content-Length' not in response.headers
+
+    decompressor = zlib.decompressobj(31)
+    chunks = iter(response.response)
+    output = b''
+    while not output:
+        output = decompressor.decompress(next(chunks))
+    assert len(produced) == STREAM_FLUSH_BYTES // len(line)
+    assert output == line * len(produced)
+    for chunk in chunks:
+        output += decompressor.decompress(chunk)
+    assert output == line * 200 and closed == [True]
+
+
+def test_prefers_brotli_on_ties():
+    """With brotli available it wins ties, but a higher q for gzip still picks gzip"""
+    app = _make_app()
+    with mock.patch.object(compression, 'brotli', object()):
+        for accept, expected in (('gzip, br', 'br'), ('br;q=0.5, gzip', 'gzip'), ('br', 'br'), ('identity', None)):
+            with app.test_request_context('/', headers={'Accept-Encoding': accept}):
+                assert compression.choose_encoding(request.accept_encodings) == expected, accept
+    with app.test_request_context('/', headers={'Accept-Encoding': 'br'}):
+        assert compression.choose_encoding(request.accept_encodings) is None
+
+
+if __name__ == '__main__':
+    test_gzip()
+    test_skip_rules()
+    test_etags()
+    test_streamed()
+    test_prefers_brotli_on_ties()
+    print("✓ Response compression OK")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Table Version ETag Test
+
+List and summary endpoints send weak ETags built from per-table versions.
+A matching If-None-Match is a 304 without running the view, every kind of
+write changes the ETag of the tables it touched, and without Redis no
+ETags are sent. Runs against fakeredis.
+"""
+
+from unittest import mock
+import fakeredis
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app import cache
+from app import user_cache
+from app.config import Config
+from app.models import Device, User
+from app.routes import devices
+from app.table_versions import VERSIONS_KEY
+
+REDIS_URL = 'redis://etag-test:6379/0'
+
+
+def _setup(**config):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        TESTING = True
+        REDIS_URL = globals()['REDIS_URL']
+        RATELIMIT_ENABLED = False
+    for name, value in config.items():
+        setattr(TestConfig, name, value)
+    app = create_app(TestConfig)
+    client = fakeredis.FakeRedis(decode_responses=True)
+    cache._clients[REDIS_URL] = client
+    cache._down_until = 0.0
+    user_cache._users.clear()
+    with app.app_context():
+        db.create_all()
+        user = User(username='ops', email='ops@example.com', password_hash='-', role='operator')
+        db.session.add(user)
+        db.session.add_all([Device(name=f'device-{i}', ip_address=f'10.0.0.{i}') for i in (1, 2)])
+        db.session.commit()
+        token = create_access_token(identity=str(user.id), additional_claims={'role': 'operator'})
+    test_client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def get(url, etag=None):
+        response = test_client.get(url, headers=dict(headers, **({'If-None-Match': etag} if etag else {})))
+        # Listings stream their body; read and close it before another app's context is pushed
+        response.get_data()
+        response.close()
+        return response
+    return app, client, get
+
+
+def test_not_modified():
+    """A matching If-None-Match is a 304 before the view runs; a stale one gets the body"""
+    app, client, get = _setup()
+    response = get('/api/devices/')
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and etag.startswith('W/"')
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    with mock.patch.object(devices.device_listing, 'respond', side_effect=AssertionError('view ran')):
+        response = get('/api/devices/', etag)
+        assert response.status_code == 304 and response.get_data() == b''
+        assert response.headers['ETag'] == etag
+    assert get('/api/devices/', 'W/"stale"').status_code == 200
+
+
+def test_writes_change_etags():
+    """ORM writes, bulk statements and deletes each change the versions of their tables"""
+    app, client, get = _setup()
+    list_etag = get('/api/devices/').headers['ETag']
+    status_etag = get('/api/devices/status').headers['ETag']
+
+    with app.app_context():
+        db.session.get(Device, 1).vendor = 'cisco'
+        db.session.commit()
+    new_list_etag = get('/api/devices/').headers['ETag']
+    assert new_list_etag != list_etag
+    assert get('/api/devices/status', status_etag).status_code == 304
+
+    with app.app_context():
+        Device.query.filter_by(id=2).update({'status': 'online'})
+        db.session.commit()
+    assert get('/api/devices/', new_list_etag).status_code == 200
+    assert get('/api/devices/status', status_etag).status_code == 200
+    status_etag = get('/api/devices/status').headers['ETag']
+
+    with app.app_context():
+        db.session.delete(db.session.get(Device, 1))
+        db.session.commit()
+    assert get('/api/devices/status', status_etag).status_code == 200
+
+    # Rolled back writes don't count
+    status_etag = get('/api/devices/status').headers['ETag']
+    with app.app_context():
+        db.session.add(Device(name='device-3', ip_address='10.0.0.3'))
+        db.session.flush()
+        db.session.rollback()
+    assert get('/api/devices/status', status_etag).status_code == 304
+
+
+def test_lost_versions_get_a_new_epoch():
+    """If the versions hash is lost, old ETags don't match the restarted counters"""
+    app, client, get = _setup()
+    etag = get('/api/devices/').headers['ETag']
+    client.delete(VERSIONS_KEY)
+    response = get('/api/devices/', etag)
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+
+
+def test_no_etags_without_redis():
+    """Without Redis, or with TABLE_VERSION_ETAGS off, responses carry no ETag"""
+    app, client, get = _setup(TABLE_VERSION_ETAGS=False)
+    response = get('/api/devices/')
+    assert response.status_code == 200 and 'ETag' not in response.headers
+
+    app, client, get = _setup()
+    etag = get('/api/devices/').headers['ETag']
+    cache._down_until = float('inf')
+    try:
+        response = get('/api/devices/', etag)
+        assert response.status_code == 200 and 'ETag' not in response.headers
+    finally:
+        cache._down_until = 0.0
+
+
+if __name__ == '__main__':
+    test_not_modified()
+    test_writes_change_etags()
+    test_lost_versions_get_a_new_epoch()
+    test_no_etags_without_redis()
+    print("✓ Table version ETags OK")
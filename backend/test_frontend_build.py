@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Frontend Build Test
+
+The JS minifier keeps strings, template literals and regex literals intact
+(including ones holding // or quotes), keeps the line breaks ASI depends on,
+and the build writes fingerprinted bundles that pages are rewritten to. When
+node is installed, minified scripts must still parse and print the same.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from app.frontend_build import build_frontend, load_manifest, minify_css, minify_js, rewrite_html
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'public')
+
+CASES = [
+    ('var url = "http://example.com/a//b"; // comment', 'var url = "http://example.com/a//b";'),
+    ("var s = 'a /* not a comment */ b';", "var s = 'a /* not a comment */ b';"),
+    ('var t = `x // ${ {a: "}"}.a } /* y */ ${`nested ${1}`}`;', 'var t = `x // ${ {a: "}"}.a } /* y */ ${`nested ${1}`}`;'),
+    ('var t = `line one\n    line two`;', 'var t = `line one\n    line two`;'),
+    ('var r = /\\/\\//g; // two slashes', 'var r = /\\/\\//g;'),
+    ('var r = /[/"]/.test(s);', 'var r = /[/"]/.test(s);'),
+    ("function f(s) {\n    return /'\\//.test(s);\n}", "function f(s) {\nreturn /'\\//.test(s);\n}"),
+    ('if (typeof /x/ === "object") {}', 'if (typeof /x/ === "object") {}'),
+    ('var half = total / 2 / count; // ratio', 'var half = total / 2 / count;'),
+    ('var q = (a + b) / c\n/ d', 'var q = (a + b) / c\n/ d'),
+    ('var a = b/**/\nvar c = d', 'var a = b\nvar c = d'),
+    ('return/**/x', 'return x'),
+    ('var a = 1 /* spans\nlines */ var b = 2', 'var a = 1\nvar b = 2'),
+    ('\n\n    var a = 1;\r\n\r\n\tvar b = 2;   \n', 'var a = 1;\nvar b = 2;'),
+]
+
+SCRIPT = r'''
+// Prints values that depend on the tricky parts surviving
+var url = "http://example.com//path"; /* a comment */
+var quoted = 'it\'s // not a comment';
+var template = `sum: ${ [1, 2].map(function (n) { return `${n}`; }).join('}') } // kept`;
+function slashes(s) {
+    return /\/\//.test(s);
+}
+function quote(s) {
+    return s.replace(/'/g, '"');
+}
+var total = 10
+var half = total
+/ 2 / 1
+var counter = 0
+counter++
+;[1, 2].forEach(function () { counter += 1; })
+var joined = typeof/**/url
+console.log(JSON.stringify([url, quoted, template, slashes(url), slashes('a/b'), quote("it's"),
+                            half, counter, joined, /[/]+/.exec('a//b')[0]]));
+'''
+
+
+def _node_output(source):
+    return subprocess.run(['node', '-e', source], capture_output=True, text=True, check=True).stdout
+
+
+def test_minify_js_cases():
+    """Tricky strings, templates, regexes and comments minify as expected"""
+    for source, expected in CASES:
+        assert minify_js(source) == expected, source
+
+
+def test_minified_script_behaves_the_same():
+    """Minified code prints the same as the original under node"""
+    if shutil.which('node') is None:
+        return
+    assert _node_output(minify_js(SCRIPT)) == _node_output(SCRIPT)
+
+
+def test_minify_css():
+    """Comments and whitespace go; declarations stay"""
+    source = '/* header */\n.a > .b ,\n.c {\n    color: red;\n    margin: 0 auto;\n}\n'
+    assert minify_css(source) == '.a>.b,.c{color:red;margin:0 auto}'
+
+
+def test_build_frontend():
+    """Every page's assets build into bundles that still parse, and pages point at them"""
+    with tempfile.TemporaryDirectory() as build_dir:
+        result = build_frontend(FRONTEND_DIR, build_dir)
+        manifest = load_manifest(build_dir)
+        assert manifest['bundles'] and result['pages'] > 0
+        for output in list(manifest['files'].values()) + list(manifest['bundles'].values()):
+            assert os.path.exists(os.path.join(build_dir, output + '.gz'))
+            if output.endswith('.js') and shutil.which('node') is not None:
+                subprocess.run(['node', '--check', os.path.join(build_dir, output)], check=True)
+
+        with open(os.path.join(FRONTEND_DIR, 'dashboard.html'), encoding='utf-8') as f:
+            page = rewrite_html(f.read(), manifest)
+        for bundle in manifest['bundles'].values():
+            if bundle in page:
+                break
+        else:
+            raise AssertionError('dashboard.html does not use a bundle')
+        with open(os.path.join(build_dir, 'manifest.json'), encoding='utf-8') as f:
+            assert json.load(f) == manifest
+
+
+if __name__ == '__main__':
+    test_minify_js_cases()
+    test_minified_script_behaves_the_same()
+    test_minify_css()
+    test_build_frontend()
+    print("✓ Frontend build OK")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Listing Test
+
+Device and camera listings return only the requested fields, filter on the
+server, page with keyset cursors and stream full listings as a JSON array,
+NDJSON or CSV.
+"""
+
+import csv
+import io
+import json
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.config import Config
+from app.models import Camera, Device
+
+STATUSES = ('online', 'offline', 'unknown')
+
+
+def _make_app():
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        TESTING = True
+        REDIS_URL = None
+        RATELIMIT_ENABLED = False
+    return create_app(TestConfig)
+
+
+def _setup():
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Device(name=f'device-{i}', ip_address=f'10.0.0.{i}', vendor='cisco' if i % 2 else 'juniper',
+                   device_type='switch', status=STATUSES[i % 3], meta={'rack': i})
+            for i in range(1, 26)
+        ])
+        db.session.add_all([
+            Camera(name=f'camera-{i}', ip_address=f'10.0.1.{i}', rtsp_url=f'rtsp://10.0.1.{i}/live',
+                   location='lobby' if i < 3 else 'yard', status='online')
+            for i in range(1, 6)
+        ])
+        db.session.commit()
+        token = create_access_token(identity='1', additional_claims={'role': 'viewer'})
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    return lambda url: client.get(url, headers=headers)
+
+
+def test_field_selection():
+    """fields= picks the output keys; unknown fields are rejected"""
+    get = _setup()
+    response = get('/api/devices/?fields=name,status&limit=5')
+    assert response.status_code == 200
+    rows = response.get_json()['devices']
+    assert rows[0] == {'name': 'device-1', 'status': 'offline'}
+    assert all(list(row) == ['name', 'status'] for row in rows)
+
+    full = get('/api/devices/?limit=1').get_json()['devices'][0]
+    assert set(full) == {'id', 'name', 'ip_address', 'vendor', 'device_type', 'snmp_community',
+                         'last_seen', 'status', 'meta'}
+    assert full['meta'] == {'rack': 1}
+
+    response = get('/api/devices/?fields=name,password')
+    assert response.status_code == 400 and 'password' in response.get_json()['msg']
+
+
+def test_cursor_pagination():
+    """Following next_cursor visits every filtered row once, in id order"""
+    get = _setup()
+    seen = []
+    url = '/api/devices/?fields=id,status&status=online,offline&limit=4'
+    cursor = None
+    pages = 0
+    while True:
+        body = get(url + (f'&cursor={cursor}' if cursor else '')).get_json()
+        assert body['limit'] == 4 and len(body['devices']) <= 4
+        seen.extend(body['devices'])
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+        assert cursor == body['devices'][-1]['id']
+
+    ids = [row['id'] for row in seen]
+    assert ids == sorted(ids) and len(ids) == len(set(ids))
+    assert ids == [i for i in range(1, 26) if STATUSES[i % 3] != 'unknown']
+    assert pages == 5
+
+    assert get('/api/devices/?vendor=juniper&limit=100').get_json()['devices'][0]['vendor'] == 'juniper'
+    assert get('/api/devices/?limit=0').status_code == 400
+    assert get('/api/devices/?limit=1001').status_code == 400
+    assert get('/api/cameras/?location=lobby&limit=10').get_json()['cameras'] == [
+        row for row in get('/api/cameras/?limit=10').get_json()['cameras'] if row['location'] == 'lobby'
+    ]
+
+
+def test_streamed_listings():
+    """Full listings stream as a JSON array or NDJSON, exports as CSV"""
+    get = _setup()
+    response = get('/api/devices/?fields=id,name')
+    assert response.is_streamed and response.mimetype == 'application/json'
+    rows = json.loads(response.get_data(as_text=True))
+    assert [row['id'] for row in rows] == list(range(1, 26))
+
+    response = get('/api/devices/?fields=id,meta&status=unknown&format=ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {'id': i, 'meta': {'rack': i}} for i in range(1, 26) if STATUSES[i % 3] == 'unknown'
+    ]
+
+    empty = get('/api/devices/?status=missing')
+    assert json.loads(empty.get_data(as_text=True)) == []
+    assert get('/api/devices/?format=xml').status_code == 400
+
+    response = get('/api/devices/export?fields=name,meta&vendor=cisco')
+    assert response.headers['Content-Disposition'] == 'attachment; filename=devices.csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ['name', 'meta'] and len(rows) == 14
+    # Nested values are written as JSON
+    assert rows[1][0] == 'device-1' and json.loads(rows[1][1]) == {'rack': 1}
+
+    cameras = get('/api/cameras/?format=ndjson').get_data(as_text=True).splitlines()
+    assert len(cameras) == 5
+
+
+if __name__ == '__main__':
+    test_field_selection()
+    test_cursor_pagination()
+    test_streamed_listings()
+    print("✓ Listings OK")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Load Benchmark Check
+
+Runs the HTTP load benchmark briefly against a tiny seeded database and
+checks its statistics and baseline comparison, and that the benchmark's
+writes are undone afterwards. `python -m benchmarks.load`
+runs it at full size.
+"""
+
+import os
+import tempfile
+from sqlalchemy import create_engine, func, select
+from app.models import Alert, User
+from benchmarks.load import ENDPOINTS, USERNAME, Server, compare, count_queries, prepare_database, \
+    restore_database, run_benchmark
+
+SCALE = 0.001
+SMOKE_ENDPOINTS = ('device', 'alerts page', 'device create', 'alert acknowledge')
+
+
+def _open_alerts(database_url):
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.count(Alert.id)).where(Alert.acknowledged.is_(False))).scalar()
+    finally:
+        engine.dispose()
+
+
+def test_load_benchmark_runs():
+    """Every sampled endpoint answers without errors and gets latency, throughput and query counts"""
+    endpoints = [endpoint for endpoint in ENDPOINTS if endpoint.name in SMOKE_ENDPOINTS]
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'load.db')}"
+        dataset = prepare_database(database_url, SCALE)
+        open_alerts = _open_alerts(database_url)
+        queries = count_queries(database_url, endpoints, dataset)
+        with Server(database_url, workers=2) as server:
+            results = run_benchmark(server.url, dataset, endpoints, clients=2, duration=0.5, queries=queries)
+        assert _open_alerts(database_url) < open_alerts
+        restore_database(database_url, dataset)
+        assert _open_alerts(database_url) == open_alerts
+        assert prepare_database(database_url, SCALE).counts == dataset.counts
+
+    for name in SMOKE_ENDPOINTS:
+        stats = results[name]
+        assert stats['requests'] > 0 and stats['errors'] == 0, stats
+        assert stats['p50_ms'] <= stats['p95_ms'] <= stats['p99_ms']
+        assert stats['queries_per_request'] >= 1
+
+
+def test_url_mode_adds_no_user():
+    """Preparing a database for --url only reads it"""
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'load.db')}"
+        prepare_database(database_url, SCALE)
+        engine = create_engine(database_url)
+        try:
+            with engine.begin() as conn:
+                conn.execute(User.__table__.delete().where(User.username == USERNAME))
+            prepare_database(database_url, SCALE, seed_data=False)
+            with engine.connect() as conn:
+                assert conn.execute(select(User.id).where(User.username == USERNAME)).first() is None
+        finally:
+            engine.dispose()
+
+
+def test_compare_flags_regressions():
+    """Slower p95, lower throughput, extra queries and new errors are reported; noise is not"""
+    baseline = {'endpoints': {
+        'device': {'requests': 1000, 'errors': 0, 'rps': 200.0, 'p95_ms': 10.0, 'queries_per_request': 1},
+        'alerts page': {'requests': 1000, 'errors': 0, 'rps': 200.0, 'p95_ms': 1.0, 'queries_per_request': 3},
+    }}
+    result = {'endpoints': {
+        'device': {'requests': 500, 'errors': 2, 'rps': 100.0, 'p95_ms': 20.0, 'queries_per_request': 2},
+        # 1ms to 2ms doubles p95 but stays within the noise floor
+        'alerts page': {'requests': 1000, 'errors': 0, 'rps': 190.0, 'p95_ms': 2.0, 'queries_per_request': 3},
+    }}
+    regressions = compare(result, baseline)
+    print('\n'.join(regressions))
+    assert len(regressions) == 4
+    assert all(regression.startswith('device:') for regression in regressions)
+
+
+if __name__ == '__main__':
+    test_load_benchmark_runs()
+    test_url_mode_adds_no_user()
+    test_compare_flags_regressions()
+    print("✓ Load benchmark OK")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Notification Digest Test
+
+Alerts held during a channel's coalescing window are flushed as one digest,
+kept in Redis until the digest is delivered, and never drained by a flush
+scheduled for an earlier window. Runs against fakeredis.
+"""
+
+import json
+from unittest import mock
+import fakeredis
+from celery.exceptions import Retry
+from app import create_app
+from app import cache
+from app.config import Config
+import app.services.alerting as alerting
+
+REDIS_URL = 'redis://digest-test:6379/0'
+
+
+class StubDispatcher:
+    """Dispatcher with every channel configured that records what it delivers"""
+
+    def __init__(self):
+        self.sent = []
+        self.fail = False
+
+    def is_configured(self, name):
+        return True
+
+    def send(self, name, payload):
+        if self.fail:
+            return {'status': 'failed', 'error': 'connection refused'}
+        self.sent.append((name, payload))
+        return {'status': 'sent'}
+
+
+def _make_app():
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        TESTING = True
+        REDIS_URL = globals()['REDIS_URL']
+        NOTIFY_COALESCE_SECONDS = {'email': 0, 'slack': 60}
+        NOTIFY_IMMEDIATE_SEVERITIES = ('critical',)
+    return create_app(TestConfig)
+
+
+def _alert(alert_id, severity='high'):
+    return {'id': alert_id, 'severity': severity, 'message': f'alert {alert_id}', 'device_name': 'switch',
+            'device_ip': '10.0.0.1', 'created_at': '2024-01-01T00:00:00', 'timestamp': '2024-01-01T00:00:00'}
+
+
+class DigestHarness:
+    """Fake Redis, a stub dispatcher and recorded flush scheduling for one test"""
+
+    def __init__(self):
+        self.app = _make_app()
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        self.dispatcher = StubDispatcher()
+        self.flushes = []
+
+    def __enter__(self):
+        cache._clients[REDIS_URL] = self.redis
+        # An earlier test may have backed off from a real, unreachable Redis
+        cache._down_until = 0.0
+        self.previous = alerting.set_dispatcher(self.dispatcher)
+        self.patch = mock.patch.object(alerting.flush_notification_digest, 'apply_async',
+                                       side_effect=lambda args, countdown: self.flushes.append(args))
+        self.patch.start()
+        self.context = self.app.app_context()
+        self.context.push()
+        return self
+
+    def __exit__(self, *exc):
+        self.context.pop()
+        self.patch.stop()
+        alerting.set_dispatcher(self.previous)
+        cache._clients.pop(REDIS_URL, None)
+
+    def flush(self, args, retries=0):
+        alerting.flush_notification_digest.push_request(retries=retries)
+        try:
+            return alerting.flush_notification_digest.run(*args)
+        finally:
+            alerting.flush_notification_digest.pop_request()
+
+
+def test_window_coalesces_into_one_digest():
+    """The first alert goes out, the rest of the window arrives as one digest"""
+    with DigestHarness() as h:
+        assert alerting.notify_channel('slack', _alert(1))['status'] == 'sent'
+        for alert_id in (2, 3, 4):
+            assert alerting.notify_channel('slack', _alert(alert_id))['status'] == 'queued'
+        # Critical alerts bypass the window
+        assert alerting.notify_channel('slack', _alert(5, 'critical'))['status'] == 'sent'
+        assert len(h.flushes) == 1 and len(h.dispatcher.sent) == 2
+
+        result = h.flush(h.flushes[0])
+        assert result['status'] == 'sent' and result['alerts'] == 3
+        assert h.dispatcher.sent[-1][1]['text'] == '3 device alerts'
+        assert not h.redis.keys('notify:pending:*') and not h.redis.keys('notify:sending:*')
+        assert h.redis.get('notify:window:slack') is None
+
+
+def test_failed_send_keeps_alerts():
+    """A failed digest keeps its alerts for the retry, and requeues them when retries run out"""
+    with DigestHarness() as h:
+        for alert_id in (1, 2, 3):
+            alerting.notify_channel('slack', _alert(alert_id))
+        h.dispatcher.fail = True
+        try:
+            h.flush(h.flushes[0])
+            raise AssertionError('expected the flush to retry')
+        except Retry:
+            pass
+        token = h.flushes[0][1]
+        assert len(h.redis.lrange(f'notify:sending:slack:{token}', 0, -1)) == 2
+
+        # The retry runs with the same token and sends what it claimed
+        h.dispatcher.fail = False
+        result = h.flush(h.flushes[0], retries=1)
+        assert result['status'] == 'sent' and result['alerts'] == 2
+        assert not h.redis.keys('notify:sending:*')
+
+        # Out of retries, the alerts go back for the channel's next digest
+        for alert_id in (4, 5, 6):
+            alerting.notify_channel('slack', _alert(alert_id))
+        h.dispatcher.fail = True
+        result = h.flush(h.flushes[1], retries=alerting.flush_notification_digest.max_retries)
+        assert result['status'] == 'failed' and result['requeued'] == 2
+        assert [json.loads(item)['id'] for item in h.redis.lrange('notify:pending:slack', 0, -1)] == [5, 6]
+
+        h.dispatcher.fail = False
+        alerting.notify_channel('slack', _alert(7))
+        alerting.notify_channel('slack', _alert(8))
+        result = h.flush(h.flushes[2])
+        assert result['status'] == 'sent' and result['alerts'] == 3
+        assert h.dispatcher.sent[-1][1]['text'] == '3 device alerts'
+
+
+def test_late_flush_leaves_newer_window_alone():
+    """A flush for a window that already closed doesn't drain the next window's alerts"""
+    with DigestHarness() as h:
+        alerting.notify_channel('slack', _alert(1))
+        alerting.notify_channel('slack', _alert(2))
+        stale = h.flushes[0]
+        # The window outlives the flush countdown
+        assert h.redis.ttl('notify:window:slack') > 60
+
+        # Simulate the window key expiring before its flush ran, and a new window opening
+        h.redis.delete('notify:window:slack')
+        alerting.notify_channel('slack', _alert(3))
+        alerting.notify_channel('slack', _alert(4))
+        assert len(h.flushes) == 2
+
+        assert h.flush(stale)['status'] == 'empty'
+        assert len(h.redis.lrange('notify:pending:slack', 0, -1)) == 2
+
+        result = h.flush(h.flushes[1])
+        assert result['alerts'] == 2
+        assert not h.redis.keys('notify:pending:*')
+
+
+if __name__ == '__main__':
+    test_window_coalesces_into_one_digest()
+    test_failed_send_keeps_alerts()
+    test_late_flush_leaves_newer_window_alone()
+    print("✓ Notification digests OK")
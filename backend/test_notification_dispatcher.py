@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Notification Dispatcher Test
+
+Delivers through a local SMTP sink and a stub webhook server to check that
+connections are reused, transient failures are retried with backoff inside
+the retry budget, the circuit breaker opens and recovers through half-open
+(also when the trial call is rejected outright), and each channel is rate limited on its own.
+"""
+
+import socketserver
+import threading
+import time
+from email.mime.text import MIMEText
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.services.alerting import EmailChannel, NotificationDispatcher, SlackChannel
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Just enough of an SMTP server to accept messages and count connections"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250 sink')
+            elif command.startswith('DATA'):
+                self.reply('354 end with .')
+                data = []
+                while True:
+                    line = self.rfile.readline()
+                    if line in (b'.\r\n', b''):
+                        break
+                    data.append(line)
+                self.server.messages.append(b''.join(data).decode())
+                self.reply('250 queued')
+            elif command.startswith('QUIT'):
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+class WebhookStub(ThreadingHTTPServer):
+    """Webhook answering with the queued status codes (200 once they run out)"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.statuses = []
+        self.requests = 0
+        self.connections = set()
+        super().__init__(('127.0.0.1', 0), WebhookHandler)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/hook'
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.requests += 1
+        self.server.connections.add(self.client_address)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = b'ok' if status == 200 else b'error'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Servers:
+    """Start the SMTP sink and the webhook stub for one test"""
+
+    def __enter__(self):
+        self.smtp = SMTPSink()
+        self.webhook = WebhookStub()
+        for server in (self.smtp, self.webhook):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def dispatcher(self, **options):
+        email = EmailChannel('127.0.0.1', self.smtp.server_address[1], use_tls=False, require_auth=False)
+        slack = SlackChannel(self.webhook.url)
+        options.setdefault('backoff_seconds', 0.01)
+        return NotificationDispatcher([email, slack], **options)
+
+    def __exit__(self, *exc):
+        for server in (self.smtp, self.webhook):
+            server.shutdown()
+            server.server_close()
+
+
+def _message(number):
+    msg = MIMEText(f'alert {number}')
+    msg['From'] = 'alerts@example.com'
+    msg['To'] = 'admin@example.com'
+    msg['Subject'] = f'Alert {number}'
+    return msg
+
+
+def test_connections_are_reused():
+    """Several sends go over one SMTP session and one keep-alive HTTP connection"""
+    with Servers() as servers:
+        dispatcher = servers.dispatcher()
+        try:
+            for number in range(3):
+                assert dispatcher.send('email', _message(number))['status'] == 'sent'
+                assert dispatcher.send('slack', {'text': f'alert {number}'})['status'] == 'sent'
+        finally:
+            dispatcher.close()
+        assert len(servers.smtp.messages) == 3 and servers.smtp.connections == 1
+        assert servers.webhook.requests == 3 and len(servers.webhook.connections) == 1
+
+
+def test_retries_with_backoff():
+    """Transient errors are retried with growing delays; permanent ones and a spent budget stop early"""
+    with Servers() as servers:
+        dispatcher = servers.dispatcher(max_retries=3, backoff_seconds=0.05)
+        try:
+            servers.webhook.statuses = [500, 429]
+            started = time.monotonic()
+            result = dispatcher.send('slack', {'text': 'retry'})
+            # Two backoffs of at least half of 0.05s and 0.1s
+            assert time.monotonic() - started >= 0.075
+            assert result['status'] == 'sent' and result['attempts'] == 3
+
+            servers.webhook.statuses = [400]
+            result = dispatcher.send('slack', {'text': 'rejected'})
+            assert result['status'] == 'failed' and 'HTTP 400' in result['error']
+            assert servers.webhook.requests == 4
+        finally:
+            dispatcher.close()
+
+        dispatcher = servers.dispatcher(max_retries=3, backoff_seconds=5, retry_budget_seconds=1)
+        try:
+            servers.webhook.statuses = [503]
+            started = time.monotonic()
+            result = dispatcher.send('slack', {'text': 'budget'})
+            assert time.monotonic() - started < 1
+            assert result['status'] == 'failed' and 'retry budget' in result['error']
+            assert servers.webhook.requests == 5
+        finally:
+            dispatcher.close()
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Repeated failures open the breaker; after the reset timeout one trial call closes it"""
+    with Servers() as servers:
+        dispatcher = servers.dispatcher(max_retries=0, failure_threshold=2, reset_timeout=0.2)
+        try:
+            servers.webhook.statuses = [500, 500]
+            for _ in range(2):
+                assert dispatcher.send('slack', {'text': 'down'})['status'] == 'failed'
+            assert dispatcher.breakers['slack'].state == 'open'
+
+            result = dispatcher.send('slack', {'text': 'fail fast'})
+            assert result == {'status': 'failed', 'error': 'slack circuit open', 'circuit': 'open'}
+            assert servers.webhook.requests == 2
+            # The other channel is unaffected
+            assert dispatcher.send('email', _message(1))['status'] == 'sent'
+
+            time.sleep(0.25)
+            assert dispatcher.breakers['slack'].state == 'half_open'
+
+            servers.webhook.statuses = [500]
+            assert dispatcher.send('slack', {'text': 'trial fails'})['status'] == 'failed'
+            assert dispatcher.breakers['slack'].state == 'open'
+
+            time.sleep(0.25)
+            assert dispatcher.send('slack', {'text': 'trial succeeds'})['status'] == 'sent'
+            assert dispatcher.breakers['slack'].state == 'closed'
+        finally:
+            dispatcher.close()
+
+
+def test_permanent_error_during_half_open():
+    """A permanent error on the half-open trial closes the breaker instead of wedging it"""
+    with Servers() as servers:
+        dispatcher = servers.dispatcher(max_retries=0, failure_threshold=1, reset_timeout=0.2)
+        try:
+            servers.webhook.statuses = [500]
+            assert dispatcher.send('slack', {'text': 'down'})['status'] == 'failed'
+            assert dispatcher.breakers['slack'].state == 'open'
+
+            time.sleep(0.25)
+            servers.webhook.statuses = [400]
+            result = dispatcher.send('slack', {'text': 'rejected'})
+            assert result['status'] == 'failed' and 'HTTP 400' in result['error']
+            assert dispatcher.breakers['slack'].state == 'closed'
+            assert dispatcher.send('slack', {'text': 'after'})['status'] == 'sent'
+            assert servers.webhook.requests == 3
+        finally:
+            dispatcher.close()
+
+
+def test_rate_limit_per_channel():
+    """Sends beyond a channel's burst wait for tokens; other channels don't"""
+    with Servers() as servers:
+        dispatcher = servers.dispatcher(rate_limits={'slack': 10})
+        try:
+            started = time.monotonic()
+            for number in range(15):
+                dispatcher.send('slack', {'text': f'alert {number}'})
+            # A burst of 10, then five more at 10 per second
+            assert time.monotonic() - started >= 0.4
+
+            started = time.monotonic()
+            for number in range(15):
+                dispatcher.send('email', _message(number))
+            assert time.monotonic() - started < 0.4
+        finally:
+            dispatcher.close()
+        assert servers.webhook.requests == 15 and len(servers.smtp.messages) == 15
+
+
+if __name__ == '__main__':
+    test_connections_are_reused()
+    test_retries_with_backoff()
+    test_circuit_breaker_opens_and_recovers()
+    test_permanent_error_during_half_open()
+    test_rate_limit_per_channel()
+    print("✓ Notification dispatcher OK")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Notification Outbox Test
+
+The drainer commits its claim on a batch before publishing it, so a batch
+is never published twice; batches that fail to publish and stale claims go
+back to pending. A poll that opens an alert publishes a drain once the
+alert is committed instead of waiting for beat.
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+from sqlalchemy import create_engine, text
+from app import create_app, db
+from app.config import Config
+from app.models import Device, NotificationOutbox
+from app.services import poller
+import app.services.alerting as alerting
+
+
+def _make_app(database_url):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        TESTING = True
+        REDIS_URL = None
+        NOTIFY_OUTBOX_BATCH_SIZE = 3
+        NOTIFY_OUTBOX_CLAIM_TIMEOUT_SECONDS = 300
+    return create_app(TestConfig)
+
+
+def _statuses():
+    return [entry.status for entry in NotificationOutbox.query.order_by(NotificationOutbox.id)]
+
+
+def test_claims_are_committed_before_publishing():
+    """A published batch is already claimed in the database; nothing is published twice"""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app = _make_app(f'sqlite:///{path}')
+    # A separate connection sees only what the drainer has committed
+    observer = create_engine(f'sqlite:///{path}')
+    published = []
+
+    def publish(alert_ids):
+        with observer.connect() as conn:
+            rows = conn.execute(text('SELECT alert_id, status FROM notification_outbox')).all()
+        claimed = {alert_id for alert_id, status in rows if status == 'claimed'}
+        assert set(alert_ids) <= claimed
+        published.append(alert_ids)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            for alert_id in range(1, 8):
+                alerting.enqueue_notification(alert_id)
+            db.session.commit()
+
+            with mock.patch.object(alerting.send_alert_notifications, 'delay', side_effect=publish):
+                assert alerting.drain_notification_outbox.run() == {'dispatched': 7}
+                assert published == [[1, 2, 3], [4, 5, 6], [7]]
+                assert set(_statuses()) == {'dispatched'}
+
+                assert alerting.drain_notification_outbox.run() == {'dispatched': 0}
+                assert len(published) == 3
+            db.session.remove()
+    finally:
+        observer.dispose()
+        with app.app_context():
+            db.engine.dispose()
+        os.remove(path)
+
+
+def test_failed_publish_releases_the_batch():
+    """A batch whose publish fails goes back to pending and is sent by the next run"""
+    app = _make_app('sqlite://')
+    with app.app_context():
+        db.create_all()
+        for alert_id in range(1, 5):
+            alerting.enqueue_notification(alert_id)
+        db.session.commit()
+
+        published = []
+        def publish(alert_ids):
+            if alert_ids == [4]:
+                raise ConnectionError('broker unavailable')
+            published.append(alert_ids)
+
+        with mock.patch.object(alerting.send_alert_notifications, 'delay', side_effect=publish):
+            result = alerting.drain_notification_outbox.run()
+        assert result['dispatched'] == 3 and 'broker unavailable' in result['error']
+        assert _statuses() == ['dispatched'] * 3 + ['pending']
+
+        with mock.patch.object(alerting.send_alert_notifications, 'delay', side_effect=published.append):
+            assert alerting.drain_notification_outbox.run() == {'dispatched': 1}
+        assert published == [[1, 2, 3], [4]]
+        assert [entry.attempts for entry in NotificationOutbox.query.order_by(NotificationOutbox.id)] == [1, 1, 1, 2]
+
+
+def test_stale_claims_are_released():
+    """Claims older than the claim timeout are drained again; fresh ones are left to their drainer"""
+    app = _make_app('sqlite://')
+    now = datetime.utcnow()
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            NotificationOutbox(alert_id=1, status='claimed', attempts=1, dispatched_at=now - timedelta(minutes=10)),
+            NotificationOutbox(alert_id=2, status='claimed', attempts=1, dispatched_at=now - timedelta(seconds=10)),
+        ])
+        db.session.commit()
+
+        published = []
+        with mock.patch.object(alerting.send_alert_notifications, 'delay', side_effect=published.append):
+            assert alerting.drain_notification_outbox.run() == {'dispatched': 1}
+        assert published == [[1]]
+        assert _statuses() == ['dispatched', 'claimed']
+
+
+def test_poll_publishes_a_drain():
+    """A poll that queues a notification publishes a drain after committing; repeats don't"""
+    app = _make_app('sqlite://')
+    with app.app_context():
+        db.create_all()
+        db.session.add(Device(name='switch', ip_address='10.0.0.1', status='online'))
+        db.session.commit()
+
+        def drain():
+            # Published after the commit: the entry is already there
+            assert NotificationOutbox.query.count() == 1
+
+        with mock.patch.object(poller, 'ping_host', return_value=False), \
+                mock.patch.object(alerting.drain_notification_outbox, 'delay', side_effect=drain) as delay:
+            assert poller.poll_device_task.run(1)['notification_queued']
+            assert delay.call_count == 1
+            assert not poller.poll_device_task.run(1)['notification_queued']
+            assert delay.call_count == 1
+
+        # Without a broker the new entry stays pending for beat
+        db.session.execute(text('UPDATE alert SET acknowledged = 1'))
+        db.session.commit()
+        with mock.patch.object(poller, 'ping_host', side_effect=[True, False]), \
+                mock.patch.object(alerting.drain_notification_outbox, 'delay', side_effect=ConnectionError):
+            poller.poll_device_task.run(1)
+            assert poller.poll_device_task.run(1)['notification_queued']
+        assert _statuses() == ['pending', 'pending']
+
+
+if __name__ == '__main__':
+    test_claims_are_committed_before_publishing()
+    test_failed_publish_releases_the_batch()
+    test_stale_claims_are_released()
+    test_poll_publishes_a_drain()
+    print("✓ Notification outbox OK")
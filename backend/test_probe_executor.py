@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Probe Executor Test
+
+The fallback executor runs one probe per key at a time, shares in-flight
+probes, serves fresh results without probing again and refuses new probes
+when its queue is full, which the poll endpoints turn into a 503 with
+Retry-After.
+"""
+
+import threading
+import time
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.config import Config
+from app.models import Camera, Device, User
+from app.services import poller, probes
+from app.services.probes import ProbeExecutor, ProbeQueueFull
+
+
+def _make_app():
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        TESTING = True
+        REDIS_URL = None
+        RATELIMIT_ENABLED = False
+    return create_app(TestConfig)
+
+
+class BlockingProbe:
+    """Probe function that counts its calls and waits until released"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, target_id):
+        self.calls.append(target_id)
+        self.release.wait(5)
+        return {'id': target_id, 'status': 'online'}
+
+
+def test_in_flight_probes_are_shared():
+    """A second submit for a queued key shares its run; the result is then served fresh"""
+    app = _make_app()
+    executor = ProbeExecutor(app, workers=2, max_queue=10, fresh_seconds=0.3)
+    probe = BlockingProbe()
+    try:
+        status, future = executor.submit(('device', 1), probe, 1)
+        assert status == 'queued'
+        status, shared = executor.submit(('device', 1), probe, 1)
+        assert status == 'in_flight' and shared is future
+
+        probe.release.set()
+        assert future.result(5) == {'id': 1, 'status': 'online'}
+        assert probe.calls == [1]
+
+        assert executor.submit(('device', 1), probe, 1) == ('fresh', {'id': 1, 'status': 'online'})
+        time.sleep(0.35)
+        status, future = executor.submit(('device', 1), probe, 1)
+        assert status == 'queued'
+        future.result(5)
+        assert probe.calls == [1, 1]
+    finally:
+        executor.shutdown()
+
+
+def test_failed_probes_are_not_cached():
+    """A probe that raises frees its key and leaves no fresh result behind"""
+    app = _make_app()
+    executor = ProbeExecutor(app, workers=1, max_queue=10)
+
+    def failing(target_id):
+        raise IOError('unreachable')
+
+    try:
+        status, future = executor.submit(('camera', 3), failing, 3)
+        assert isinstance(future.exception(5), IOError)
+        assert executor.get_fresh(('camera', 3)) is None and not executor.in_flight
+        assert executor.submit(('camera', 3), failing, 3)[0] == 'queued'
+    finally:
+        executor.shutdown()
+
+
+def test_full_queue_is_refused():
+    """Probes beyond max_queue raise ProbeQueueFull; shared keys still join their run"""
+    app = _make_app()
+    executor = ProbeExecutor(app, workers=1, max_queue=2)
+    probe = BlockingProbe()
+    try:
+        executor.submit(('device', 1), probe, 1)
+        executor.submit(('device', 2), probe, 2)
+        assert executor.submit(('device', 1), probe, 1)[0] == 'in_flight'
+        try:
+            executor.submit(('device', 3), probe, 3)
+            raise AssertionError('expected ProbeQueueFull')
+        except ProbeQueueFull:
+            pass
+    finally:
+        probe.release.set()
+        executor.shutdown()
+
+
+def test_endpoints_return_503_when_full():
+    """Without Celery, poll and camera test endpoints queue, share, then answer 503 with Retry-After"""
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='ops', email='ops@example.com', password_hash='-', role='operator')
+        db.session.add(user)
+        db.session.add_all([Device(name=f'device-{i}', ip_address=f'10.0.0.{i}') for i in (1, 2)])
+        db.session.add(Camera(name='camera', ip_address='10.0.1.1', rtsp_url='rtsp://10.0.1.1/live'))
+        db.session.commit()
+        token = create_access_token(identity=str(user.id), additional_claims={'role': 'operator'})
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    probe = BlockingProbe()
+    executor = ProbeExecutor(app, workers=1, max_queue=1)
+    no_broker = ConnectionError('broker unavailable')
+    previous, probes._executor = probes._executor, executor
+    try:
+        with mock.patch('app.get_celery_app', side_effect=no_broker), \
+                mock.patch.object(poller, 'poll_device_sync', probe), \
+                mock.patch.object(poller, 'test_camera_sync', probe):
+            response = client.post('/api/devices/1/poll', headers=headers)
+            assert response.status_code == 202 and response.get_json()['shared'] is False
+            response = client.post('/api/devices/1/poll', headers=headers)
+            assert response.status_code == 202 and response.get_json()['shared'] is True
+
+            for url in ('/api/devices/2/poll', '/api/cameras/1/test'):
+                response = client.post(url, headers=headers)
+                assert response.status_code == 503 and response.headers['Retry-After'] == '5'
+
+            running = executor.in_flight[('device', 1)]
+            probe.release.set()
+            running.result(5)
+            response = client.post('/api/devices/1/poll', headers=headers)
+            assert response.status_code == 200
+            assert response.get_json()['result'] == {'id': 1, 'status': 'online'}
+            assert probe.calls == [1]
+    finally:
+        probe.release.set()
+        probes._executor = previous
+        executor.shutdown()
+
+
+if __name__ == '__main__':
+    test_in_flight_probes_are_shared()
+    test_failed_probes_are_not_cached()
+    test_full_queue_is_refused()
+    test_endpoints_return_503_when_full()
+    print("✓ Probe executor OK")
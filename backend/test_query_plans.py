@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Query Plan Regression Check
+
+Seeds a scratch SQLite database and checks that every hot query keeps an
+index-backed plan. Run `flask queries explain` for the full-size dataset or
+against a scratch PostgreSQL database.
+"""
+
+import os
+import tempfile
+from sqlalchemy import create_engine, text
+from app.query_plans import seed, check_query_plans
+
+SCALE = 0.1
+
+
+def _seeded_engine():
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    engine = create_engine(f'sqlite:///{path}')
+    seed(engine, SCALE)
+    return engine, path
+
+
+def test_hot_query_plans():
+    """Every hot query uses its index and avoids full scans"""
+    engine, path = _seeded_engine()
+    try:
+        results = check_query_plans(engine)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+    for result in results:
+        status = 'FAIL' if result['problems'] else 'ok'
+        print(f"{status:4}  {result['query']}: {'; '.join(result['problems']) or ' / '.join(result['plan'])}")
+    failed = [result['query'] for result in results if result['problems']]
+    assert not failed, f"Query plans regressed: {', '.join(failed)}"
+
+
+def test_missing_index_is_detected():
+    """Dropping an index turns its queries into reported full scans"""
+    engine, path = _seeded_engine()
+    try:
+        with engine.begin() as conn:
+            conn.execute(text('DROP INDEX ix_device_ip_address'))
+        results = {result['query']: result for result in check_query_plans(engine)}
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+    problems = results['device duplicate ip']['problems']
+    print(f"device duplicate ip without its index: {problems}")
+    assert any('full scan of device' in problem for problem in problems)
+
+
+if __name__ == '__main__':
+    test_hot_query_plans()
+    test_missing_index_is_detected()
+    print("✓ Query plans OK")
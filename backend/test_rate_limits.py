@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Rate Limit Test
+
+The sliding-window Lua script and the local fallback counters agree on what
+a client may take, the fallback is used while Redis is failing, and the
+shared probe budget is only charged for requests that pass the role check.
+"""
+
+from unittest import mock
+import fakeredis
+import redis
+from flask_jwt_extended import create_access_token
+from app import create_app, db, limiter
+from app import ratelimit
+from app import user_cache
+from app.config import Config
+from app.models import Camera, Device, User
+from app.ratelimit import LocalCounters, SlidingWindowCounter
+from app.services import bulk
+
+WINDOW_START = 60 * 1000
+
+
+class FailingRedis:
+    """Client whose every command fails, counting the attempts"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def register_script(self, source):
+        def run(keys, args):
+            self.calls += 1
+            raise redis.ConnectionError('connection refused')
+        return run
+
+    def mget(self, *keys):
+        self.calls += 1
+        raise redis.ConnectionError('connection refused')
+
+
+def _check_sliding_window(counter, client):
+    with mock.patch.object(ratelimit.time, 'time', return_value=WINDOW_START + 1):
+        assert [counter.acquire(client, 'ip', 5, 60) for _ in range(6)] == [True] * 5 + [False]
+        assert counter.get_window(client, 'ip', 60)[::2] == (0, 5)
+
+    # Half way through the next window the previous one still weighs 2.5
+    with mock.patch.object(ratelimit.time, 'time', return_value=WINDOW_START + 90):
+        assert [counter.acquire(client, 'ip', 5, 60) for _ in range(3)] == [True, True, False]
+        assert counter.get_window(client, 'ip', 60) == (5, 30, 2, 90)
+        assert not counter.acquire(client, 'other', 5, 60, amount=6)
+        assert counter.acquire(client, 'other', 5, 60, amount=5)
+
+    # Two windows later nothing is left of either
+    with mock.patch.object(ratelimit.time, 'time', return_value=WINDOW_START + 180):
+        assert counter.acquire(client, 'ip', 5, 60, amount=5)
+
+
+def test_lua_script():
+    """The script weighs the previous window and never takes past the limit"""
+    client = fakeredis.FakeRedis()
+    _check_sliding_window(SlidingWindowCounter(), client)
+    with mock.patch.object(ratelimit.time, 'time', return_value=WINDOW_START + 180):
+        assert client.ttl(f'ip/{WINDOW_START // 60 + 3}') == 120
+
+
+def test_local_fallback():
+    """Redis errors switch to local counters, which give the same answers, for REDIS_RETRY_SECONDS"""
+    counter = SlidingWindowCounter()
+    client = FailingRedis()
+    _check_sliding_window(counter, client)
+    assert client.calls == 1
+
+    with mock.patch.object(ratelimit.time, 'monotonic', return_value=counter.down_until + 1):
+        counter.acquire(client, 'ip', 5, 60)
+    assert client.calls == 2
+
+
+def test_local_counters_are_bounded():
+    """The least recently used key is evicted once max_keys is reached"""
+    counters = LocalCounters(max_keys=2)
+    counters.incr('a', 60)
+    counters.incr('b', 60)
+    counters.incr('a', 60)
+    counters.incr('c', 60)
+    assert (counters.get('a'), counters.get('b'), counters.get('c')) == (2, 0, 1)
+    counters.clear('a')
+    assert counters.get('a') == 0 and counters.reset() == 1
+
+
+def test_probe_budget_is_charged_after_role_check():
+    """Anonymous and viewer requests don't use the budget; bulk polls cost one per device"""
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        TESTING = True
+        REDIS_URL = None
+        RATELIMIT_ENABLED = True
+        RATELIMIT_STORAGE_URI = 'sliding+redis://127.0.0.1:6379/0'
+        PROBE_RATE_LIMIT = '3 per minute'
+    app = create_app(TestConfig)
+    limiter.storage.client = fakeredis.FakeRedis()
+    # Users cached by earlier tests may share these ids
+    user_cache._users.clear()
+    with app.app_context():
+        db.create_all()
+        users = [User(username=role, email=f'{role}@example.com', password_hash='-', role=role)
+                 for role in ('viewer', 'operator')]
+        db.session.add_all(users)
+        db.session.add_all([Device(name=f'device-{i}', ip_address=f'10.0.0.{i}') for i in (1, 2)])
+        db.session.add(Camera(name='camera', ip_address='10.0.1.1', rtsp_url='rtsp://10.0.1.1/live'))
+        db.session.commit()
+        headers = {
+            user.role: {'Authorization': 'Bearer ' + create_access_token(
+                identity=str(user.id), additional_claims={'role': user.role})}
+            for user in users
+        }
+    client = app.test_client()
+
+    for _ in range(5):
+        assert client.post('/api/devices/1/poll').status_code == 401
+        assert client.post('/api/cameras/1/test', headers=headers['viewer']).status_code == 403
+        assert client.post('/api/devices/bulk', json={'action': 'poll', 'ids': [1]},
+                           headers=headers['viewer']).status_code == 403
+
+    with mock.patch.object(bulk, 'enqueue_bulk_poll', return_value='job-1'):
+        for ids in ([1, 2], [1]):
+            response = client.post('/api/devices/bulk', json={'action': 'poll', 'ids': ids},
+                                   headers=headers['operator'])
+            assert response.status_code == 202
+        response = client.post('/api/devices/bulk', json={'action': 'poll', 'ids': [2]}, headers=headers['operator'])
+        assert response.status_code == 429 and 'Retry-After' in response.headers
+    assert client.post('/api/cameras/1/test', headers=headers['operator']).status_code == 429
+
+
+if __name__ == '__main__':
+    test_lua_script()
+    test_local_fallback()
+    test_local_counters_are_bounded()
+    test_probe_budget_is_charged_after_role_check()
+    print("✓ Rate limits OK")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Replica Routing Test
+
+Plain SELECTs in replica_reads views go to the read replica; writes, locking
+reads, reads after a write in the same request and every other view use the
+primary. A write sets the db_primary_until cookie so that client keeps
+reading from the primary for DB_REPLICA_LAG_SECONDS, and list requests for
+tables changed within that time read from the primary as well. Uses two
+SQLite files with different device names to tell them apart.
+"""
+
+import os
+import tempfile
+import time
+import fakeredis
+from flask import g
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert, select
+from app import create_app, db
+from app import cache
+from app import user_cache
+from app.config import Config
+from app.db_routing import PRIMARY_UNTIL_COOKIE, REPLICA_BIND, prefer_primary_since
+from app.models import Device, User
+
+REDIS_URL = 'redis://replica-routing-test:6379/0'
+
+
+class Databases:
+    """A primary and a replica database file, each holding device-1 under its own name"""
+
+    def __init__(self):
+        self.paths = []
+        for _ in range(2):
+            fd, path = tempfile.mkstemp(suffix='.db')
+            os.close(fd)
+            self.paths.append(path)
+
+    def make_app(self, replica=True, redis_url=None):
+        primary_path, replica_path = self.paths
+
+        class TestConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{primary_path}'
+            DATABASE_REPLICA_URL = f'sqlite:///{replica_path}' if replica else None
+            DB_REPLICA_LAG_SECONDS = 5
+            TESTING = True
+            REDIS_URL = redis_url
+            RATELIMIT_ENABLED = False
+            SQLITE_WRITE_QUEUE = False
+        return create_app(TestConfig)
+
+    def seed(self, app):
+        with app.app_context():
+            db.create_all()
+            user = User(username='ops', email='ops@example.com', password_hash='-', role='operator')
+            db.session.add(user)
+            db.session.add(Device(name='primary', ip_address='10.0.0.1'))
+            db.session.commit()
+            replica = db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                db.metadata.create_all(replica)
+                with replica.begin() as connection:
+                    connection.execute(insert(Device), [{'name': 'replica', 'ip_address': '10.0.0.1'}])
+            return {'Authorization': 'Bearer ' + create_access_token(
+                identity=str(user.id), additional_claims={'role': 'operator'})}
+
+    def close(self, *apps):
+        for app in apps:
+            with app.app_context():
+                for engine in db.engines.values():
+                    engine.dispose()
+        for path in self.paths:
+            os.remove(path)
+        # db keeps a metadata per bind key it has seen; other apps have no replica bind
+        db.metadatas.pop(REPLICA_BIND, None)
+
+
+def _names(response):
+    return [device['name'] for device in response.get_json()['devices']]
+
+
+def test_reads_use_the_replica():
+    """Listing views read from the replica; other views read from the primary"""
+    databases = Databases()
+    app = databases.make_app()
+    user_cache._users.clear()
+    headers = databases.seed(app)
+    client = app.test_client()
+    try:
+        assert _names(client.get('/api/devices/?limit=10', headers=headers)) == ['replica']
+        assert client.get('/api/devices/1', headers=headers).get_json()['name'] == 'primary'
+    finally:
+        databases.close(app)
+
+
+def test_writers_stay_on_the_primary():
+    """A write sets the stickiness cookie; the client reads from the primary until it expires"""
+    databases = Databases()
+    app = databases.make_app()
+    user_cache._users.clear()
+    headers = databases.seed(app)
+    client = app.test_client()
+    try:
+        response = client.put('/api/devices/1', json={'vendor': 'cisco'}, headers=headers)
+        assert response.status_code == 200
+        cookie = response.headers['Set-Cookie']
+        assert cookie.startswith(f'{PRIMARY_UNTIL_COOKIE}=') and 'Max-Age=5' in cookie
+        assert 'HttpOnly' in cookie and 'SameSite=Lax' in cookie
+        assert 0 < float(client.get_cookie(PRIMARY_UNTIL_COOKIE).value) - time.time() <= 5
+
+        assert _names(client.get('/api/devices/?limit=10', headers=headers)) == ['primary']
+
+        # Reads don't set the cookie; an expired or garbled one is ignored
+        assert 'Set-Cookie' not in client.get('/api/devices/1', headers=headers).headers
+        for value in (str(int(time.time()) - 1), 'garbage'):
+            client.set_cookie(PRIMARY_UNTIL_COOKIE, value)
+            assert _names(client.get('/api/devices/?limit=10', headers=headers)) == ['replica']
+    finally:
+        databases.close(app)
+
+
+def test_no_cookie_without_a_replica():
+    """Without DATABASE_REPLICA_URL writes set no cookie and everything reads the primary"""
+    databases = Databases()
+    app = databases.make_app(replica=False)
+    user_cache._users.clear()
+    headers = databases.seed(app)
+    client = app.test_client()
+    try:
+        response = client.put('/api/devices/1', json={'vendor': 'cisco'}, headers=headers)
+        assert response.status_code == 200 and 'Set-Cookie' not in response.headers
+        assert _names(client.get('/api/devices/?limit=10', headers=headers)) == ['primary']
+    finally:
+        databases.close(app)
+
+
+def test_session_routing():
+    """Within a replica_reads request, locking reads and reads after a write go to the primary"""
+    databases = Databases()
+    app = databases.make_app()
+    databases.seed(app)
+    query = select(Device.name)
+    try:
+        with app.test_request_context('/api/devices/'):
+            g.db_read_replica = True
+            assert db.session.execute(query).scalar() == 'replica'
+            assert db.session.execute(query.with_for_update()).scalar() == 'primary'
+            assert db.session.execute(query).scalar() == 'replica'
+
+            db.session.get(Device, 1).vendor = 'cisco'
+            db.session.flush()
+            assert g.db_wrote
+            assert db.session.execute(query).scalar() == 'primary'
+            db.session.rollback()
+
+        with app.test_request_context('/api/devices/'):
+            g.db_read_replica = True
+            prefer_primary_since(time.time() - 60)
+            assert db.session.execute(query).scalar() == 'replica'
+            prefer_primary_since(time.time() - 1)
+            assert db.session.execute(query).scalar() == 'primary'
+
+        # Outside a request everything uses the primary
+        with app.app_context():
+            assert db.session.execute(query).scalar() == 'primary'
+    finally:
+        databases.close(app)
+
+
+def test_recent_changes_read_from_the_primary():
+    """A listing that misses its ETag reads the primary while its tables changed recently"""
+    databases = Databases()
+    app = databases.make_app(redis_url=REDIS_URL)
+    cache._clients[REDIS_URL] = fakeredis.FakeRedis(decode_responses=True)
+    cache._down_until = 0.0
+    user_cache._users.clear()
+    headers = databases.seed(app)
+    client = app.test_client()
+    try:
+        assert _names(client.get('/api/devices/?limit=10', headers=headers)) == ['primary']
+        cache._clients[REDIS_URL].hset('table-changed-at', 'device', time.time() - 60)
+        assert _names(client.get('/api/devices/?limit=10', headers=headers)) == ['replica']
+    finally:
+        databases.close(app)
+
+
+if __name__ == '__main__':
+    test_reads_use_the_replica()
+    test_writers_stay_on_the_primary()
+    test_no_cookie_without_a_replica()
+    test_session_routing()
+    test_recent_changes_read_from_the_primary()
+    print("✓ Replica routing OK")
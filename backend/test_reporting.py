@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Reporting Rollup Test
+
+The report endpoints only read the rollups; the rollup task fills in days
+that have none, never rebuilds a rolled-up day whose alerts may have been
+purged, and only records status snapshots for today.
+"""
+
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.config import Config
+from app.models import Alert, AlertDailyRollup, Device, StatusSnapshot
+from app.services.reporting import build_daily_rollups, build_missing_rollups, get_rollup_days_to_build
+
+
+def _make_app():
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        TESTING = True
+        REDIS_URL = None
+        RATELIMIT_ENABLED = False
+        REPORT_ROLLUP_BACKFILL_DAYS = 31
+        ALERT_RETENTION_ENABLED = True
+        ALERT_RETENTION_ACKNOWLEDGED_DAYS = 10
+        ALERT_RETENTION_UNACKNOWLEDGED_DAYS = 20
+    return create_app(TestConfig)
+
+
+def _seed(today, days_ago):
+    device = Device(name='switch', ip_address='10.0.0.1', status='online')
+    db.session.add(device)
+    db.session.flush()
+    for days in days_ago:
+        created_at = datetime(today.year, today.month, today.day, 12) - timedelta(days=days)
+        db.session.add(Alert(device_id=device.id, severity='high', message=f'{days} days ago',
+                             created_at=created_at, acknowledged=True))
+    db.session.commit()
+    return device
+
+
+def _rollup_counts():
+    return {day: count for day, count in db.session.query(AlertDailyRollup.day, AlertDailyRollup.alert_count)}
+
+
+def test_report_get_is_read_only():
+    """GET /api/reports/daily for a day without a rollup writes nothing"""
+    app = _make_app()
+    today = datetime.utcnow().date()
+    yesterday = today - timedelta(days=1)
+    with app.app_context():
+        db.create_all()
+        _seed(today, [1, 1])
+        token = create_access_token(identity='1', additional_claims={'role': 'viewer'})
+
+    response = app.test_client().get(f'/api/reports/daily?date={yesterday.isoformat()}',
+                                     headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert response.get_json()['days'] == [
+        {'date': yesterday.isoformat(), 'alerts': {}, 'occurrences': {}, 'devices': {}, 'cameras': {}}
+    ]
+    with app.app_context():
+        assert AlertDailyRollup.query.count() == 0 and StatusSnapshot.query.count() == 0
+
+
+def test_rollups_only_fill_missing_days():
+    """Rolled-up days are never rebuilt, even after their alerts are purged"""
+    app = _make_app()
+    today = datetime.utcnow().date()
+    with app.app_context():
+        db.create_all()
+        _seed(today, [5, 3, 3, 1])
+
+        # Acknowledged alerts are kept 10 days: older days may be partly purged
+        days = get_rollup_days_to_build(today)
+        assert days[0] == today - timedelta(days=9) and days[-1] == today - timedelta(days=1)
+
+        assert build_missing_rollups(today) == days
+        expected = {today - timedelta(days=5): 1, today - timedelta(days=3): 2, today - timedelta(days=1): 1}
+        assert _rollup_counts() == expected
+
+        # Purging the alerts behind a rollup leaves the rollup alone
+        Alert.query.filter(Alert.message == '3 days ago').delete()
+        db.session.commit()
+        assert build_missing_rollups(today) == []
+        assert _rollup_counts() == expected
+
+        # The next day only the new day is rolled up
+        tomorrow = today + timedelta(days=1)
+        assert build_missing_rollups(tomorrow) == [today]
+        assert _rollup_counts() == expected
+
+
+def test_snapshots_are_only_taken_for_today():
+    """The rollup task records the current status under today's date"""
+    app = _make_app()
+    today = datetime.utcnow().date()
+    with app.app_context():
+        db.create_all()
+        _seed(today, [1])
+        result = build_daily_rollups.run()
+        assert result['snapshot'] == today.isoformat()
+        assert {snapshot.day for snapshot in StatusSnapshot.query} == {today}
+        assert {(s.kind, s.status, s.count) for s in StatusSnapshot.query} == {('device', 'online', 1)}
+
+        # A second run keeps the existing snapshot and rollups
+        taken_at = StatusSnapshot.query.first().taken_at
+        assert build_daily_rollups.run()['days'] == []
+        assert StatusSnapshot.query.first().taken_at == taken_at
+
+
+if __name__ == '__main__':
+    test_report_get_is_read_only()
+    test_rollups_only_fill_missing_days()
+    test_snapshots_are_only_taken_for_today()
+    print("✓ Reporting rollups OK")
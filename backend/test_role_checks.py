@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Role Check Test
+
+A token's role claim is only trusted while the process is subscribed to
+role changes and caught up on them. A user demoted in another process loses
+access once the change is published, and while Redis is unreachable role
+checks read the user row instead of trusting the claim.
+"""
+
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import time
+import fakeredis
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app import cache
+from app import user_cache
+from app.config import Config
+from app.models import User
+
+
+def _make_app(database_url, redis_url):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        TESTING = True
+        REDIS_URL = redis_url
+        RATELIMIT_ENABLED = False
+        USER_CACHE_TTL_SECONDS = 60
+    return create_app(TestConfig)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _create_users():
+    # Users cached by earlier tests may share these ids
+    user_cache._users.clear()
+    users = [User(username=name, email=f'{name}@example.com', password_hash='-', role='admin')
+             for name in ('root', 'alice')]
+    db.session.add_all(users)
+    db.session.commit()
+    return {user.username: {'Authorization': 'Bearer ' + create_access_token(
+        identity=str(user.id), additional_claims={'role': 'admin'})} for user in users}
+
+
+def _other_process(database_url, redis_url, headers, conn):
+    """Serve role checks in a separate process, reporting status codes over conn"""
+    app = _make_app(database_url, redis_url)
+    client = app.test_client()
+    with app.app_context():
+        user_cache.claims_trusted()
+    while True:
+        command = conn.recv()
+        if command == 'stop':
+            break
+        if command == 'trusted':
+            with app.app_context():
+                conn.send(user_cache.claims_trusted())
+        else:
+            conn.send(client.get('/api/auth/users', headers=headers).status_code)
+    conn.close()
+
+
+def _wait_for(conn, command, expected, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        conn.send(command)
+        value = conn.recv()
+        if value == expected or time.monotonic() > deadline:
+            return value
+        time.sleep(0.05)
+
+
+def test_demotion_reaches_other_processes():
+    """Demoting a user in one process makes another process reject the user's old token"""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    database_url = f'sqlite:///{path}'
+    port = _free_port()
+    redis_url = f'redis://127.0.0.1:{port}/0'
+    server = fakeredis.TcpFakeServer(('127.0.0.1', port), server_type='redis')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    app = _make_app(database_url, redis_url)
+    with app.app_context():
+        db.create_all()
+        headers = _create_users()
+        alice_id = User.query.filter_by(username='alice').one().id
+
+    parent_conn, child_conn = multiprocessing.Pipe()
+    child = multiprocessing.get_context('fork').Process(
+        target=_other_process, args=(database_url, redis_url, headers['alice'], child_conn), daemon=True
+    )
+    child.start()
+    try:
+        assert _wait_for(parent_conn, 'trusted', True) is True
+        parent_conn.send('check')
+        assert parent_conn.recv() == 200
+
+        response = app.test_client().put(f'/api/auth/users/{alice_id}', json={'role': 'viewer'},
+                                         headers=headers['root'])
+        assert response.status_code == 200
+        assert _wait_for(parent_conn, 'check', 403, timeout=3) == 403
+    finally:
+        parent_conn.send('stop')
+        child.join(5)
+        server.shutdown()
+        server.server_close()
+        with app.app_context():
+            db.engine.dispose()
+        os.remove(path)
+
+
+def test_demotion_while_redis_is_down():
+    """Without a working subscription the claim is ignored and the user row decides"""
+    # Nothing listens on this port, so the listener never catches up
+    app = _make_app('sqlite://', f'redis://127.0.0.1:{_free_port()}/0')
+    client = app.test_client()
+    try:
+        with app.app_context():
+            db.create_all()
+            headers = _create_users()
+            assert not user_cache.claims_trusted()
+            assert client.get('/api/auth/users', headers=headers['alice']).status_code == 200
+
+            # Another process demoted alice but could not publish the change
+            alice = User.query.filter_by(username='alice').one()
+            alice.role = 'viewer'
+            db.session.commit()
+            user_cache._users.clear()
+            assert client.get('/api/auth/users', headers=headers['alice']).status_code == 403
+
+            # A demotion here while Redis is down is kept for the listener to publish
+            response = client.put(f'/api/auth/users/{alice.id}', json={'role': 'operator'}, headers=headers['root'])
+            assert response.status_code == 200
+            assert user_cache._unpublished and user_cache._unpublished[-1][0] == alice.id
+            assert not user_cache.claims_trusted()
+            assert client.get('/api/auth/users', headers=headers['alice']).status_code == 403
+    finally:
+        user_cache._unpublished.clear()
+        cache._down_until = 0.0
+
+
+if __name__ == '__main__':
+    test_demotion_reaches_other_processes()
+    test_demotion_while_redis_is_down()
+    print("✓ Role checks OK")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Serializer Test
+
+Device, camera and alert serializers give the same dicts for model
+instances and listing rows, in field-selection order, with dates as ISO
+8601. The endpoints return those shapes, and the orjson and stdlib JSON
+providers encode them the same way.
+"""
+
+import json
+from datetime import date, datetime
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app import json_provider
+from app.config import Config
+from app.models import Alert, Camera, Device, User
+from app.routes.devices import device_listing
+from app.serializers import alert_serializer, camera_serializer, device_serializer
+
+SEEN = datetime(2024, 3, 1, 12, 30, 15, 250000)
+
+DEVICE = {'id': 1, 'name': 'core-1', 'ip_address': '10.0.0.1', 'vendor': 'cisco', 'device_type': 'switch',
+          'snmp_community': 'public', 'last_seen': '2024-03-01T12:30:15.250000', 'status': 'online',
+          'meta': {'rack': 4, 'tags': ['core']}}
+CAMERA = {'id': 1, 'name': 'lobby', 'ip_address': '10.0.1.1', 'rtsp_url': 'rtsp://10.0.1.1/live',
+          'username': 'viewer', 'location': 'Lobby', 'status': 'unknown', 'last_snapshot': None}
+ALERT = {'id': 1, 'device_id': 1, 'severity': 'high', 'message': 'Device offline',
+         'created_at': '2024-03-01T12:30:15.250000', 'acknowledged': False, 'acknowledged_at': None,
+         'occurrences': 3, 'last_seen_at': '2024-03-01T12:30:15.250000'}
+
+
+def _setup(**config):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        TESTING = True
+        REDIS_URL = None
+        RATELIMIT_ENABLED = False
+    for name, value in config.items():
+        setattr(TestConfig, name, value)
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='ops', email='ops@example.com', password_hash='-', role='operator')
+        db.session.add(user)
+        db.session.add(Device(name='core-1', ip_address='10.0.0.1', vendor='cisco', device_type='switch',
+                              last_seen=SEEN, status='online', meta={'rack': 4, 'tags': ['core']}))
+        db.session.add(Camera(name='lobby', ip_address='10.0.1.1', rtsp_url='rtsp://10.0.1.1/live',
+                              username='viewer', password='secret', location='Lobby'))
+        db.session.commit()
+        db.session.add(Alert(device_id=1, severity='high', message='Device offline', created_at=SEEN,
+                             occurrences=3, last_seen_at=SEEN))
+        db.session.commit()
+        token = create_access_token(identity=str(user.id), additional_claims={'role': 'operator'})
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    return app, lambda url: client.get(url, headers=headers)
+
+
+def test_model_instances():
+    """Instances dump every field in declaration order, secrets excluded"""
+    app, get = _setup()
+    with app.app_context():
+        device = device_serializer.dump(db.session.get(Device, 1))
+        assert device == DEVICE and list(device) == list(DEVICE)
+        assert camera_serializer.dump(db.session.get(Camera, 1)) == CAMERA
+        assert alert_serializer.dump_many(Alert.query.all()) == [ALERT]
+
+
+def test_rows_and_field_selection():
+    """Listing rows dump like instances; selections keep their order and reuse one dumper"""
+    app, get = _setup()
+    with app.test_request_context('/api/devices/'):
+        names = ['status', 'last_seen', 'name']
+        row = db.session.execute(device_listing.build_query(names)).one()
+        dumped = device_serializer.dump(row, names)
+        assert dumped == {name: DEVICE[name] for name in names} and list(dumped) == names
+        assert device_serializer.dump(row, ['last_seen']) == {'last_seen': DEVICE['last_seen']}
+
+        row = db.session.execute(device_listing.build_query(list(device_serializer.fields))).one()
+        assert device_serializer.dump(row) == DEVICE
+
+        device = db.session.get(Device, 1)
+        device.last_seen = None
+        assert device_serializer.dump(device, ['last_seen']) == {'last_seen': None}
+    assert device_serializer.dumper(names) is device_serializer.dumper(tuple(names))
+
+
+def test_endpoint_shapes():
+    """Detail, list and listing endpoints return the serializer shapes"""
+    app, get = _setup()
+    assert get('/api/devices/1').get_json() == DEVICE
+    assert get('/api/devices/?limit=10').get_json()['devices'] == [DEVICE]
+    assert get('/api/devices/?fields=name,last_seen').get_json() == [
+        {'name': 'core-1', 'last_seen': DEVICE['last_seen']}
+    ]
+    assert get('/api/cameras/1').get_json() == CAMERA
+    assert get('/api/alerts/1').get_json() == dict(ALERT, device_name='core-1')
+    assert get('/api/alerts/').get_json()['alerts'] == [dict(ALERT, device_name='core-1')]
+
+    # Alerts of deleted devices have no device name
+    with app.app_context():
+        db.session.get(Alert, 1).device_id = None
+        db.session.commit()
+    assert get('/api/alerts/1').get_json()['device_name'] is None
+
+
+def test_json_providers_agree():
+    """orjson and the stdlib provider encode dates, non-string keys and nesting alike"""
+    value = {'day': date(2024, 3, 1), 'at': SEEN, 'counts': {1: 'one', 2: 'two'}, 'device': DEVICE,
+             'text': 'café ✓', 'none': None}
+    expected = {'day': '2024-03-01', 'at': '2024-03-01T12:30:15.250000', 'counts': {'1': 'one', '2': 'two'},
+                'device': DEVICE, 'text': 'café ✓', 'none': None}
+    for choice, provider in (('orjson', json_provider.OrjsonProvider), ('stdlib', json_provider.JSONProvider)):
+        app, get = _setup(JSON_PROVIDER=choice)
+        assert type(app.json) is provider
+        assert json.loads(app.json.dumps(value)) == expected
+        with app.app_context():
+            response = app.json.response(value)
+        assert response.mimetype == 'application/json' and json.loads(response.get_data()) == expected
+        assert get('/api/devices/1').get_json() == DEVICE
+
+
+if __name__ == '__main__':
+    test_model_instances()
+    test_rows_and_field_selection()
+    test_endpoint_shapes()
+    test_json_providers_agree()
+    print("✓ Serializers OK")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Server Profile Check
+
+Checks the gunicorn settings of each server profile, then boots the threaded
+profile on a scratch database and serves a request from a forked worker.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from app.server import PROFILES, default_workers, gunicorn_settings
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CONFIG = {
+    'SERVER_PROFILE': 'sync',
+    'SERVER_BIND': '127.0.0.1:5000',
+    'SERVER_WORKERS': 0,
+    'SERVER_THREADS': 8,
+    'SERVER_TIMEOUT_SECONDS': 60,
+    'SERVER_GRACEFUL_TIMEOUT_SECONDS': 40,
+    'SERVER_KEEPALIVE_SECONDS': 5,
+    'SERVER_MAX_REQUESTS': 1000,
+    'SERVER_MAX_REQUESTS_JITTER': 100,
+}
+
+
+def test_profile_settings():
+    """Sync runs 2n+1 single-threaded workers, threaded one multi-threaded worker per CPU"""
+    assert default_workers('sync', cpus=4) == 9
+    assert default_workers('threaded', cpus=4) == 4
+
+    sync = gunicorn_settings(CONFIG)
+    assert sync['worker_class'] == 'sync' and sync['threads'] == 1
+    threaded = gunicorn_settings(CONFIG, 'threaded')
+    assert threaded['worker_class'] == 'gthread' and threaded['threads'] == 8
+    for profile in PROFILES:
+        settings = gunicorn_settings(dict(CONFIG, SERVER_WORKERS=3), profile)
+        assert settings['workers'] == 3
+        assert settings['preload_app'] is True
+        assert settings['max_requests'] == 1000 and settings['max_requests_jitter'] == 100
+        # Long polls wait up to 30 seconds and must not be killed as hung workers
+        assert settings['timeout'] > 30
+
+    try:
+        gunicorn_settings(CONFIG, 'eventlet')
+        assert False, 'unknown profile accepted'
+    except ValueError:
+        pass
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_threaded_profile_serves():
+    """The launcher preloads the app and its forked workers answer requests"""
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as cwd:
+        env = dict(
+            os.environ, PYTHONPATH=BACKEND_DIR, PYTHONWARNINGS='ignore',
+            DATABASE_URL=f"sqlite:///{os.path.join(cwd, 'server.db')}"
+        )
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'app.server', '--profile', 'threaded', '--workers', '2',
+             '--bind', f'127.0.0.1:{port}', '--init-db'],
+            cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        try:
+            status = None
+            deadline = time.monotonic() + 30
+            while status is None and time.monotonic() < deadline:
+                try:
+                    status = urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=5).status
+                except OSError:
+                    time.sleep(0.5)
+        finally:
+            server.terminate()
+            output = server.communicate(timeout=30)[0]
+
+    print(f"GET /health -> {status}")
+    assert status == 200, output[-2000:]
+    assert 'Using worker: gthread' in output
+    assert output.count('started with fresh database pools') == 2
+
+
+if __name__ == '__main__':
+    test_profile_settings()
+    test_threaded_profile_serves()
+    print("✓ Server profiles OK")
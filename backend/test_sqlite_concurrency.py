@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+SQLite Concurrent Access Test
+
+Polls devices from several threads through the single-writer queue while
+another process writes to the same database file and a reader keeps
+querying it. No operation may fail with "database is locked".
+"""
+
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from sqlalchemy import text
+from app import create_app, db
+from app.config import Config
+from app.models import Device
+import app.services.poller as poller
+
+DEVICES = 200
+POLL_THREADS = 8
+
+
+def _make_app(path):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        TESTING = True
+        REDIS_URL = None
+    return create_app(TestConfig)
+
+
+def _other_process_writes(path):
+    connection = sqlite3.connect(path, timeout=10)
+    for i in range(DEVICES):
+        connection.execute('UPDATE device SET vendor = ? WHERE id = ?', (f'vendor-{i}', i + 1))
+        connection.commit()
+        time.sleep(0.002)
+    connection.close()
+
+
+def test_concurrent_polls_and_reads():
+    """Polls, reads and a second writer process share the database without lock errors"""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app = _make_app(path)
+    ping_host = poller.ping_host
+    poller.ping_host = lambda ip_address, timeout=5: int(ip_address.rsplit('.', 1)[1]) % 2 == 0
+
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Device(name=f'device-{i}', ip_address=f'10.0.{i // 250}.{i % 250}', status='online')
+                for i in range(DEVICES)
+            ])
+            db.session.commit()
+            assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+
+        errors = []
+        reads = []
+        stop = threading.Event()
+
+        def poll(device_ids):
+            with app.app_context():
+                for device_id in device_ids:
+                    result = poller.poll_device_sync(device_id)
+                    if 'error' in result:
+                        errors.append(result['error'])
+
+        def read():
+            with app.app_context():
+                while not stop.is_set():
+                    try:
+                        reads.append(Device.query.filter_by(status='offline').count())
+                    except Exception as e:
+                        errors.append(str(e))
+                    db.session.rollback()
+
+        writer = multiprocessing.Process(target=_other_process_writes, args=(path,))
+        writer.start()
+        reader = threading.Thread(target=read)
+        reader.start()
+        pollers = [
+            threading.Thread(target=poll, args=(range(start, DEVICES + 1, POLL_THREADS),))
+            for start in range(1, POLL_THREADS + 1)
+        ]
+        for thread in pollers:
+            thread.start()
+        for thread in pollers:
+            thread.join()
+        stop.set()
+        reader.join()
+        writer.join()
+
+        print(f"{DEVICES} polls, {len(reads)} reads, {len(errors)} errors")
+        assert not errors, errors[:5]
+        assert writer.exitcode == 0
+
+        with app.app_context():
+            assert Device.query.filter_by(status='offline').count() == DEVICES // 2
+    finally:
+        poller.ping_host = ping_host
+        with app.app_context():
+            db.engine.dispose()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    test_concurrent_polls_and_reads()
+    print("✓ SQLite concurrent access OK")
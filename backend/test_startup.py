@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Startup Import Check
+
+Creates the app in fresh interpreters and checks that Celery, Flask-Migrate
+and other heavy modules stay unimported until a command, task or endpoint
+needs them. `python -m benchmarks.startup` reports the timings in detail.
+"""
+
+from benchmarks.startup import measure_startup
+
+
+def test_startup_skips_heavy_imports():
+    """import app + create_app() loads none of the lazily imported dependencies"""
+    result = measure_startup(runs=1)
+    print(f"import {result['import_seconds']['median']}s, create_app {result['create_app_seconds']['median']}s")
+    assert result['status'] == 200
+    assert not result['heavy_modules'], f"Imported at startup: {', '.join(result['heavy_modules'])}"
+
+
+if __name__ == '__main__':
+    test_startup_skips_heavy_imports()
+    print("✓ Startup imports OK")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Table Version Test
+
+Each session bumps exactly the tables it wrote, also when many sessions
+commit at once. Polls that only move last_seen leave the status versions
+alone.
+Changes that couldn't reach Redis are pushed with the session's next
+commit, and the epoch is replaced so older ETags stop matching. Runs
+against fakeredis.
+"""
+
+import os
+import tempfile
+import threading
+import fakeredis
+from app import create_app, db
+from app import cache
+from app import table_versions
+from app.config import Config
+from app.models import Camera, Device
+from app.services import poller
+from app.table_versions import EPOCH_FIELD, VERSIONS_KEY, get_etag
+
+REDIS_URL = 'redis://table-versions-test:6379/0'
+
+
+def _setup(database_url='sqlite://'):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        TESTING = True
+        REDIS_URL = globals()['REDIS_URL']
+        RATELIMIT_ENABLED = False
+        SQLITE_WRITE_QUEUE = False
+    app = create_app(TestConfig)
+    client = fakeredis.FakeRedis(decode_responses=True)
+    cache._clients[REDIS_URL] = client
+    cache._down_until = 0.0
+    table_versions._missed.clear()
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Device(name=f'device-{i}', ip_address=f'10.0.0.{i}', status='online') for i in range(1, 9)])
+        db.session.add_all([Camera(name=f'camera-{i}', ip_address=f'10.0.1.{i}', rtsp_url=f'rtsp://10.0.1.{i}/live')
+                            for i in range(1, 9)])
+        db.session.commit()
+    return app, client
+
+
+def _versions(client):
+    return {name: int(value) for name, value in client.hgetall(VERSIONS_KEY).items() if name != EPOCH_FIELD}
+
+
+def test_last_seen_updates_keep_status_versions():
+    """A poll that only moves last_seen bumps the device version alone; a status change bumps both"""
+    app, client = _setup()
+    with app.app_context():
+        seen = _versions(client)
+        poller.record_device_status(1, True)
+        db.session.commit()
+        assert db.session.get(Device, 1).last_seen is not None
+        before = _versions(client)
+        assert before == dict(seen, device=seen['device'] + 1)
+
+        poller.record_device_status(1, False)
+        db.session.commit()
+        after = _versions(client)
+        assert after['device'] == before['device'] + 1 and after['device:status'] == before['device:status'] + 1
+        assert after['alert'] == before.get('alert', 0) + 1
+
+        device = db.session.get(Device, 2)
+        device.last_seen = None
+        device.vendor = 'cisco'
+        db.session.commit()
+        assert _versions(client)['device'] == after['device'] + 1
+        assert _versions(client)['device:status'] == after['device:status']
+
+
+def test_concurrent_sessions():
+    """Sessions committing at the same time each bump only their own tables, once per commit"""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app, client = _setup(f'sqlite:///{path}')
+    commits = 10
+    errors = []
+
+    def write(index):
+        model = Device if index % 2 else Camera
+        try:
+            with app.app_context():
+                for i in range(commits):
+                    db.session.get(model, index).name = f'{model.__tablename__}-{index}-{i}'
+                    db.session.commit()
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        with app.app_context():
+            before = _versions(client)
+        threads = [threading.Thread(target=write, args=(index,)) for index in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        after = _versions(client)
+        assert after['device'] - before['device'] == 4 * commits
+        assert after['camera'] - before['camera'] == 4 * commits
+        assert after.get('device:status') == before.get('device:status')
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        os.remove(path)
+
+
+def test_changes_missed_while_redis_is_down():
+    """The session pushes unpushed tables on its next commit, and the epoch is replaced"""
+    app, client = _setup()
+    with app.app_context():
+        etag = get_etag(['device', 'camera'])
+        before = _versions(client)
+
+        cache._down_until = float('inf')
+        db.session.get(Device, 1).vendor = 'cisco'
+        db.session.commit()
+        assert db.session.info['unpushed_tables'] == {'device'}
+        assert get_etag(['device', 'camera']) is None
+
+        cache._down_until = 0.0
+        new_etag = get_etag(['device', 'camera'])
+        assert new_etag != etag and new_etag.split('-')[1:] == etag.split('-')[1:]
+        assert get_etag(['device', 'camera']) == new_etag
+
+        db.session.get(Camera, 1).location = 'Lobby'
+        db.session.commit()
+        assert 'unpushed_tables' not in db.session.info
+        after = _versions(client)
+        assert after['device'] == before['device'] + 1 and after['camera'] == before['camera'] + 1
+
+
+if __name__ == '__main__':
+    test_last_seen_updates_keep_status_versions()
+    test_concurrent_sessions()
+    test_changes_missed_while_redis_is_down()
+    print("✓ Table versions OK")
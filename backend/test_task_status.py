@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Task Status Test
+
+Only operators and admins may read task results, long polls return as soon
+as results are ready and never wait past TASK_MAX_WAIT_SECONDS, and single
+tasks and bulk poll groups are described in their own shapes.
+"""
+
+import time
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.config import Config
+from app.models import User
+from app.routes import tasks
+
+
+class FakeResult:
+    """AsyncResult stand-in that becomes ready after a number of checks"""
+
+    def __init__(self, value, ready_after=0, state='SUCCESS'):
+        self.value = value
+        self.checks_left = ready_after
+        self.final_state = state
+
+    def ready(self):
+        if self.checks_left > 0:
+            self.checks_left -= 1
+            return False
+        return True
+
+    def successful(self):
+        return self.final_state == 'SUCCESS'
+
+    @property
+    def state(self):
+        return self.final_state if self.checks_left == 0 else 'PENDING'
+
+    @property
+    def result(self):
+        return self.value
+
+
+class FakeGroup:
+    def __init__(self, results):
+        self.results = results
+
+    def ready(self):
+        return all(result.ready() for result in self.results)
+
+    def failed(self):
+        return any(not result.successful() for result in self.results)
+
+    def completed_count(self):
+        return sum(1 for result in self.results if result.ready())
+
+
+def _setup(max_wait=1):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        TESTING = True
+        REDIS_URL = None
+        RATELIMIT_ENABLED = False
+        TASK_MAX_WAIT_SECONDS = max_wait
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        users = [User(username=role, email=f'{role}@example.com', password_hash='-', role=role)
+                 for role in ('viewer', 'operator', 'admin')]
+        db.session.add_all(users)
+        db.session.commit()
+        headers = {
+            user.role: {'Authorization': 'Bearer ' + create_access_token(
+                identity=str(user.id), additional_claims={'role': user.role})}
+            for user in users
+        }
+    client = app.test_client()
+    return lambda url, role='operator': client.get(url, headers=headers[role])
+
+
+def test_results_need_operator():
+    """Viewers can't read task results; operators and admins can"""
+    get = _setup()
+    results = {'poll-1': FakeResult({'device_id': 1, 'status': 'online'})}
+    with mock.patch.object(tasks, '_load_result', side_effect=results.get):
+        assert get('/api/tasks/poll-1', 'viewer').status_code == 403
+        assert get('/api/tasks/?ids=poll-1', 'viewer').status_code == 403
+        for role in ('operator', 'admin'):
+            response = get('/api/tasks/poll-1', role)
+            assert response.status_code == 200
+            assert response.get_json() == {'task_id': 'poll-1', 'type': 'task', 'state': 'SUCCESS', 'ready': True,
+                                           'result': {'device_id': 1, 'status': 'online'}}
+
+
+def test_long_poll_is_capped():
+    """wait= returns once results are ready, and never waits past TASK_MAX_WAIT_SECONDS"""
+    get = _setup(max_wait=1)
+    results = {'slow': FakeResult(None, ready_after=10 ** 6), 'quick': FakeResult('done', ready_after=1)}
+    with mock.patch.object(tasks, '_load_result', side_effect=results.get):
+        started = time.monotonic()
+        body = get('/api/tasks/slow?wait=30').get_json()
+        assert 0.9 <= time.monotonic() - started < 2
+        assert body['state'] == 'PENDING' and body['ready'] is False and body['result'] is None
+
+        started = time.monotonic()
+        body = get('/api/tasks/quick?wait=30').get_json()
+        assert time.monotonic() - started < 0.9
+        assert body['ready'] is True and body['result'] == 'done'
+
+        assert get('/api/tasks/?ids=' + ','.join(['quick'] * 101)).status_code == 400
+        assert get('/api/tasks/?ids=').status_code == 400
+
+
+def test_group_results():
+    """Bulk poll groups report completed chunks, then every chunk's results"""
+    get = _setup()
+    group = FakeGroup([FakeResult([{'device_id': 1}]), FakeResult(ValueError('timed out'), state='FAILURE')])
+    with mock.patch.object(tasks, '_load_result', return_value=group):
+        body = get('/api/tasks/job-1').get_json()
+    assert body == {'task_id': 'job-1', 'type': 'group', 'state': 'FAILURE', 'ready': True, 'completed': 2,
+                    'total': 2, 'result': [[{'device_id': 1}], 'timed out']}
+
+
+if __name__ == '__main__':
+    test_results_need_operator()
+    test_long_poll_is_capped()
+    test_group_results()
+    print("✓ Task status OK")
@@ -52,7 +52,11 @@
     async updateDevice(id, payload) { return request(`/devices/${id}`, { method: 'PUT', body: JSON.stringify(payload) }); },
     async deleteDevice(id) { return request(`/devices/${id}`, { method: 'DELETE' }); },
     async pollDevice(id) { return request(`/devices/${id}/poll`, { method: 'POST' }); },
+    async bulkDevices(action, payload = {}) { return request('/devices/bulk', { method: 'POST', body: JSON.stringify({ action, ...payload }) }); },
     async devicesStatus() { return request('/devices/status'); },
+    // Background tasks; wait long-polls for up to that many seconds
+    async getTask(id, wait = 0) { return request(`/tasks/${id}?wait=${wait}`); },
+    async getTasks(ids, wait = 0) { return request(`/tasks/?ids=${ids.join(',')}&wait=${wait}`); },
     // Cameras
     async listCameras() { return request('/cameras/'); },
     async getCamera(id) { return request(`/cameras/${id}`); },